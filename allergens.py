@@ -0,0 +1,223 @@
+# allergens.py
+from collections import deque
+from ingredients import item_words
+
+# Words that reveal each allergy offered in the UI, including common Indian
+# names, dishes and ingredients made from the allergen
+ALLERGEN_SYNONYMS = {
+    "Peanuts": [
+        "peanut", "peanuts", "groundnut", "groundnuts", "monkey nuts", "arachis", "moongphali", "mungfali",
+    ],
+    "Tree nuts": [
+        "almond", "almonds", "cashew", "cashews", "walnut", "walnuts", "pecan", "pecans", "pistachio",
+        "pistachios", "hazelnut", "hazelnuts", "macadamia", "macadamias", "brazil nut", "brazil nuts",
+        "pine nut", "pine nuts", "chestnut", "chestnuts", "praline", "marzipan", "nutella", "kaju", "badam",
+        "akhrot", "pista", "nut", "nuts", "nut butter",
+    ],
+    "Milk": [
+        "milk", "butter", "buttermilk", "ghee", "cheese", "cheeses", "paneer", "cream", "curd", "curds",
+        "yogurt", "yoghurt", "yogurts", "dahi", "whey", "casein", "lassi", "raita", "kheer", "khoa", "khoya",
+        "malai", "mozzarella", "parmesan", "cheddar", "feta", "ricotta", "mascarpone", "halloumi",
+        "custard", "ice cream", "milk powder", "condensed milk", "lactose", "half-and-half", "kefir",
+    ],
+    "Eggs": [
+        "egg", "eggs", "egg white", "egg whites", "egg yolk", "egg yolks", "omelette", "omelet", "omelettes",
+        "mayonnaise", "mayo", "meringue", "frittata", "albumin", "custard",
+    ],
+    "Fish": [
+        "fish", "salmon", "tuna", "cod", "tilapia", "sardine", "sardines", "mackerel", "anchovy",
+        "anchovies", "trout", "halibut", "haddock", "pomfret", "rohu", "hilsa", "surmai", "bangda",
+        "pollock", "catfish", "snapper", "herring", "swordfish", "seabass", "sea bass", "fish sauce",
+    ],
+    "Shellfish": [
+        "shellfish", "shrimp", "shrimps", "prawn", "prawns", "crab", "crabs", "lobster", "lobsters",
+        "crayfish", "scallop", "scallops", "clam", "clams", "mussel", "mussels", "oyster", "oysters",
+        "squid", "calamari", "octopus", "krill", "jhinga", "oyster sauce",
+    ],
+    "Wheat": [
+        "wheat", "whole wheat", "flour", "atta", "maida", "sooji", "suji", "semolina", "rava", "couscous",
+        "bulgur", "seitan", "spelt", "farro", "durum", "bread", "breads", "breadcrumbs", "pasta",
+        "spaghetti", "noodles", "roti", "rotis", "chapati", "chapatis", "naan", "paratha", "parathas",
+        "puri", "poori", "tortilla", "tortillas", "cracker", "crackers", "croutons", "pita", "bagel",
+        "bun", "buns", "dalia", "vermicelli", "seviyan",
+    ],
+    "Soy": [
+        "soy", "soya", "soybean", "soybeans", "tofu", "tempeh", "edamame", "miso", "soy sauce", "tamari",
+        "shoyu", "natto", "textured vegetable protein", "tvp", "soya chunks",
+    ],
+    "Sesame": [
+        "sesame", "sesame seeds", "sesame oil", "tahini", "til seeds", "til oil", "til ladoo", "gingelly",
+        "benne", "hummus", "za'atar", "gomasio",
+    ],
+}
+
+# Phrases in which a synonym does not mean the allergen, e.g. "almond milk"
+# is not dairy (its "almond" is still a tree nut)
+ALLERGEN_EXEMPTIONS = {
+    "Peanuts": ["peanut-free"],
+    "Tree nuts": ["nut-free", "tree nut-free", "water chestnut", "water chestnuts"],
+    "Milk": [
+        "dairy-free", "milk-free", "coconut milk", "almond milk", "oat milk", "soy milk", "soya milk",
+        "rice milk", "cashew milk", "plant milk", "plant-based milk", "non-dairy milk", "dairy-free milk",
+        "coconut cream", "coconut yogurt", "soy yogurt", "dairy-free yogurt", "vegan yogurt", "vegan butter",
+        "vegan cheese", "dairy-free cheese", "peanut butter", "almond butter", "cashew butter", "nut butter",
+        "seed butter", "sunflower seed butter", "apple butter", "cocoa butter", "cream of tartar",
+        "coconut milk powder", "cashew cream", "cashew cheese", "almond cream", "oat cream", "soy cream",
+        "vegan cream", "coconut curd", "vegan curd", "peanut curd",
+    ],
+    "Eggs": ["egg-free", "eggless", "egg replacer", "flax egg", "chia egg", "vegan mayo", "vegan mayonnaise"],
+    "Fish": ["fish-free"],
+    "Shellfish": ["shellfish-free"],
+    "Wheat": [
+        "wheat-free", "gluten-free", "rice flour", "almond flour", "chickpea flour", "coconut flour",
+        "oat flour", "gram flour", "besan flour", "corn flour", "tapioca flour", "potato flour", "millet flour",
+        "ragi flour", "jowar flour", "bajra flour", "gluten-free bread", "gluten-free pasta", "rice noodles",
+        "rice pasta", "chickpea pasta", "corn tortilla", "corn tortillas", "rice crackers", "lettuce bun",
+        "buckwheat flour", "kuttu flour", "kuttu atta", "millet flour", "sorghum flour", "amaranth flour",
+        "rajgira flour", "rajgira atta", "singhara atta", "quinoa flour", "ragi atta", "jowar atta", "bajra atta",
+        "makki atta", "rice atta", "ragi roti", "ragi rotis", "jowar roti", "jowar rotis", "bajra roti",
+        "bajra rotis", "makki roti", "makki ki roti", "rice roti", "akki roti", "millet roti", "millet rotis",
+        "rice bread", "millet bread", "buckwheat noodles", "soba noodles", "glass noodles",
+    ],
+    "Soy": ["soy-free", "soya-free"],
+    "Sesame": ["sesame-free"],
+}
+
+# Meats ruled out by vegetarian diets (fish and shellfish come from their allergen lists)
+MEAT_WORDS = [
+    "chicken", "turkey", "beef", "steak", "pork", "ham", "bacon", "sausage", "sausages", "lamb", "mutton",
+    "goat", "keema", "meat", "meatballs", "duck", "venison", "salami", "pepperoni", "jerky", "gelatin",
+]
+
+# Allergies and extra words each dietary preference rules out; the other
+# preferences (Keto, Low-carb, ...) do not forbid any item outright
+DIET_RESTRICTIONS = {
+    "Vegetarian": (["Fish", "Shellfish"], MEAT_WORDS),
+    "Vegan": (["Fish", "Shellfish", "Milk", "Eggs"], MEAT_WORDS + ["honey"]),
+    "Pescatarian": ([], MEAT_WORDS),
+    "Gluten-free": (["Wheat"], ["barley", "rye"]),
+    "Dairy-free": (["Milk"], []),
+}
+
+
+def _is_word_char(char):
+    return char.isalnum()
+
+
+class AllergenScanner:
+    """
+    Aho-Corasick automaton over every allergen synonym and exemption
+
+    Compiled once; a scan is one pass over the text, however many
+    synonyms there are. Matches must start and end on word boundaries so
+    "egg" does not match "eggplant" and "nut" does not match "nutmeg".
+    """
+
+    def __init__(self, synonyms, exemptions):
+        self._goto = [{}]
+        self._fail = [0]
+        # (pattern length, allergen, is_exemption) for patterns ending at each state
+        self._out = [[]]
+        for allergen, words in synonyms.items():
+            for word in words:
+                self._add(word, (len(word), allergen, False))
+        for allergen, words in exemptions.items():
+            for word in words:
+                self._add(word, (len(word), allergen, True))
+        self._build_links()
+
+    def _add(self, pattern, output):
+        state = 0
+        for char in pattern.lower():
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append(output)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text, allergies):
+        """
+        Find the allergens a text mentions
+
+        Parameters:
+        text (str): Recipe or item text to check
+        allergies (list): Allergies to look for, as offered in the UI
+
+        Returns:
+        dict: Allergy -> sorted list of the words found for it; empty if the text is safe
+        """
+        wanted = set(allergies or ())
+        if not wanted or not text:
+            return {}
+        text = text.lower()
+        matches = []
+        exempt = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, allergen, is_exemption in self._out[state]:
+                start = end - length
+                if allergen not in wanted:
+                    continue
+                if (start > 0 and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                    continue
+                (exempt if is_exemption else matches).append((start, end, allergen))
+
+        # A match is exempt if an exemption for the same allergen contains it:
+        # sweep by start, tracking the furthest end of exemptions begun so far
+        exempt.sort()
+        reach = {}
+        next_exempt = 0
+        found = {}
+        for start, end, allergen in sorted(matches):
+            while next_exempt < len(exempt) and exempt[next_exempt][0] <= start:
+                _, high, other = exempt[next_exempt]
+                reach[other] = max(reach.get(other, 0), high)
+                next_exempt += 1
+            if reach.get(allergen, 0) < end:
+                found.setdefault(allergen, set()).add(text[start:end])
+        return {allergen: sorted(words) for allergen, words in found.items()}
+
+
+_scanner = AllergenScanner(ALLERGEN_SYNONYMS, ALLERGEN_EXEMPTIONS)
+
+
+def scan_allergens(text, allergies):
+    """Allergy -> words found, for the given allergies; see AllergenScanner.scan"""
+    return _scanner.scan(text, allergies)
+
+
+def unsafe_items(items, allergies):
+    """Catalog items whose names mention one of the allergies"""
+    return {item for item in items if scan_allergens(item.replace("_", " "), allergies)}
+
+
+def diet_unsafe_items(items, dietary_preferences):
+    """Catalog items whose names a dietary preference rules out, e.g. "beef_steak" for Vegetarian"""
+    allergies, words = set(), set()
+    for preference in dietary_preferences or []:
+        preference_allergies, preference_words = DIET_RESTRICTIONS.get(preference, ([], []))
+        allergies.update(preference_allergies)
+        words.update(preference_words)
+    return unsafe_items(items, sorted(allergies)) | {item for item in items if words & set(item_words(item))}
+
+
+def allergen_warning(found):
+    """Short user-facing description of scan_allergens results"""
+    return "; ".join(f"{allergy}: {', '.join(words)}" for allergy, words in found.items())
@@ -0,0 +1,107 @@
+# assets.py
+import hashlib
+import io
+import os
+import re
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STYLE_SOURCE = os.path.join(ROOT, "assets", "styles.css")
+# Served by Streamlit at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_URL = "app/static"
+
+BACKGROUND_SOURCE_URL = "https://images.unsplash.com/photo-1498837167922-ddd27525d352?q=80&w=2940&auto=format&fit=crop"
+# Used until the local images have been built
+BACKGROUND_FALLBACK_URL = "https://images.unsplash.com/photo-1498837167922-ddd27525d352?q=70&w=1280&auto=format&fit=crop"
+BACKGROUND_WIDTHS = [768, 1280, 1920]
+BACKGROUND_QUALITY = 70
+BACKGROUND_OVERLAY = "linear-gradient(rgba(0, 0, 0, 0.7), rgba(0, 0, 0, 0.7))"
+
+
+def minify_css(css):
+    """Strip comments and whitespace that the browser does not need"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def content_hash(data):
+    """Short content hash used to version static URLs"""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def background_path(width):
+    return os.path.join(STATIC_DIR, f"background-{width}.webp")
+
+
+def build_backgrounds(source=None):
+    """
+    Write compressed WebP copies of the background photo for each screen width
+
+    Parameters:
+    source (bytes): Original image; downloaded from BACKGROUND_SOURCE_URL if not given
+
+    Returns:
+    list: Paths of the written images
+    """
+    from PIL import Image
+
+    if source is None:
+        with urllib.request.urlopen(BACKGROUND_SOURCE_URL, timeout=30) as response:
+            source = response.read()
+    image = Image.open(io.BytesIO(source)).convert("RGB")
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    paths = []
+    for width in BACKGROUND_WIDTHS:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+        resized.save(background_path(width), "WEBP", quality=BACKGROUND_QUALITY, method=6)
+        paths.append(background_path(width))
+    return paths
+
+
+def background_css():
+    """
+    Background rules that load the smallest local image that covers the screen
+
+    The URLs carry a content hash as ?v=, which makes Streamlit's static
+    file handler send far-future cache headers, so the image is only
+    downloaded again after it changes.
+    """
+    available = [width for width in BACKGROUND_WIDTHS if os.path.exists(background_path(width))]
+    if not available:
+        return f'.stApp{{background-image:{BACKGROUND_OVERLAY},url("{BACKGROUND_FALLBACK_URL}")}}'
+
+    rules = []
+    for i, width in enumerate(available):
+        with open(background_path(width), "rb") as f:
+            version = content_hash(f.read())
+        rule = f'.stApp{{background-image:{BACKGROUND_OVERLAY},url("{STATIC_URL}/background-{width}.webp?v={version}")}}'
+        if i > 0:
+            # Larger images only for screens wider than the previous size
+            rule = f"@media (min-width:{available[i - 1] + 1}px){{{rule}}}"
+        rules.append(rule)
+    return "".join(rules)
+
+
+def build_stylesheet():
+    """
+    Minified app stylesheet and its content hash
+
+    Returns:
+    tuple: (css, version)
+    """
+    with open(STYLE_SOURCE) as f:
+        css = minify_css(f.read()) + background_css()
+    return css, content_hash(css.encode())
+
+
+if __name__ == "__main__":
+    # Build step: bundle the background images so pages never hotlink them
+    for path in build_backgrounds():
+        print(f"{path}: {os.path.getsize(path) // 1024} KB")
+    css, version = build_stylesheet()
+    print(f"stylesheet {version}: {len(css)} bytes")
@@ -2,117 +2,81 @@
 import google.generativeai as genai
 import json
 import streamlit as st
+from llm import generate_content, DeadlineExceeded
+from food_db import normalize_catalog
+from prompts import CATALOG_SYSTEM_INSTRUCTION, catalog_categories
 
-# This function will use Gemini to generate food items dynamically
-def generate_food_items(meal_type, dietary_preferences=None, allergies=None):
+def parse_json_response(text):
+    """Parse the JSON object in a model response, ignoring any surrounding text"""
+    json_text = text
+    # Find the start and end of JSON
+    start_idx = json_text.find('{')
+    end_idx = json_text.rfind('}') + 1
+    if start_idx >= 0 and end_idx > start_idx:
+        json_text = json_text[start_idx:end_idx]
+    return json.loads(json_text)
+
+# Catalogs for several meal types from a single Gemini request
+def generate_food_items_batch(meal_types, dietary_preferences=None, allergies=None, deadline=None):
     """
-    Generate food items for a specific meal type using Gemini API
+    Generate food items for several meal types with one Gemini API call
     
     Parameters:
-    meal_type (str): 'breakfast', 'lunch', or 'dinner'
+    meal_types (list): Meal types to generate catalogs for ('breakfast', 'lunch', 'dinner', 'snack')
     dietary_preferences (list): List of dietary preferences (vegan, vegetarian, etc.)
     allergies (list): List of food allergies to avoid
+    deadline (float): Optional time.monotonic() value the answer is needed by
     
     Returns:
-    dict: Nested dictionary of food categories and items with calorie values
+    dict: Meal type -> nested dictionary of food categories and items with calorie values
+
+    Raises:
+    DeadlineExceeded: No answer arrived before the deadline
+    Exception: The API is not configured, or no model gave a usable answer.
+    Nothing is returned in those cases, so st.cache_data never caches a
+    fallback; callers use offline.default_catalogs instead.
     """
+    meal_types = list(dict.fromkeys(meal_types))
     
-    # Get API key from Streamlit secrets
     try:
         api_key = st.secrets["gemini_apikey"]
         genai.configure(api_key=api_key)
     except Exception as e:
         st.error(f"Error configuring Gemini API: {e}")
-        # Return default food items if API fails
-        return get_default_food_items(meal_type)
+        raise
     
-    # Construct prompt for Gemini
     preferences_str = ", ".join(dietary_preferences) if dietary_preferences else "none"
     allergies_str = ", ".join(allergies) if allergies else "none"
     
     prompt = f"""
-    Generate a detailed, realistic food database for {meal_type} meal planning.
+    Generate food databases for these meals: {", ".join(meal_types)}, with these categories:{catalog_categories(meal_types)}
     
     Dietary preferences to consider: {preferences_str}
     Allergies to avoid: {allergies_str}
-    
-    Create a JSON structure with the following format:
-    {{
-        "category_name": {{
-            "food_item": calorie_value,
-            "food_item2": calorie_value,
-            ...
-        }},
-        ...
-    }}
-    
-    For {meal_type}, include these categories:
-    """
-    
-    # Add specific categories based on meal type
-    if meal_type == "breakfast":
-        prompt += """
-        - protein (eggs, yogurt, etc.)
-        - whole_grains (bread, oatmeal, etc.)
-        - fruits
-        - vegetables
-        - healthy_fats (nuts, seeds, etc.)
-        - dairy or dairy alternatives
-        - other (condiments, beverages, etc.)
-        """
-    elif meal_type == "lunch":
-        prompt += """
-        - protein (chicken, fish, tofu, etc.)
-        - whole_grains (rice, quinoa, etc.)
-        - vegetables
-        - legumes
-        - healthy_fats
-        - dairy_or_dairy_alternatives
-        - additional_toppings_condiments
-        """
-    else:  # dinner
-        prompt += """
-        - proteins
-        - grains_and_starches
-        - vegetables
-        - legumes
-        - healthy_fats
-        - dairy_or_dairy_alternatives
-        - sauces_and_condiments
-        - herbs_and_spices
-        """
-    
-    prompt += """
-    For each food item, provide a realistic calorie value as an integer.
-    Return ONLY the JSON structure with no additional text or explanation.
     """
     
     try:
-        # Call Gemini API
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
-        
-        if hasattr(response, 'text'):
-            # Parse the response text as JSON
-            try:
-                # Extract just the JSON part (in case there's any extra text)
-                json_text = response.text
-                # Find the start and end of JSON
-                start_idx = json_text.find('{')
-                end_idx = json_text.rfind('}') + 1
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_text = json_text[start_idx:end_idx]
-                
-                food_items = json.loads(json_text)
-                return food_items
-            except json.JSONDecodeError as e:
-                st.error(f"Error parsing Gemini response: {e}")
-                return get_default_food_items(meal_type)
-        else:
-            return get_default_food_items(meal_type)
+        # An answer missing a meal fails over to the next model like an error
+        response = generate_content(prompt, "catalog", deadline, system_instruction=CATALOG_SYSTEM_INSTRUCTION,
+                                    validate=_has_catalogs(meal_types))
+    except DeadlineExceeded:
+        # The caller falls back; nothing is cached
+        raise
     except Exception as e:
         st.error(f"Error calling Gemini API: {e}")
-        return get_default_food_items(meal_type)
+        raise
+
+    catalogs = parse_json_response(response.text)
+    # One key per food however the model spelled it, before it is cached
+    return {meal_type: normalize_catalog(catalogs[meal_type]) for meal_type in meal_types}
+
+def _has_catalogs(meal_types):
+    """Validator for generate_content: the answer holds a non-empty catalog for every meal type"""
+    def validate(text):
+        catalogs = parse_json_response(text)
+        return isinstance(catalogs, dict) and all(
+            isinstance(catalogs.get(meal_type), dict) and catalogs[meal_type] for meal_type in meal_types)
+    return validate
 
 # Default food items to use as fallback
 def get_default_food_items(meal_type):
@@ -224,6 +188,46 @@ def get_default_food_items(meal_type):
                 "herbs_and_spices": 0
             }
         }
+    elif meal_type == "snack":
+        return {
+            "fruits": {
+                "apple": 95,
+                "banana": 105,
+                "orange": 62,
+                "papaya_cup": 55,
+                "grapes_cup": 104
+            },
+            "nuts_and_seeds": {
+                "almonds_handful": 164,
+                "walnuts_handful": 185,
+                "pumpkin_seeds": 126,
+                "trail_mix": 173
+            },
+            "dairy_or_dairy_alternatives": {
+                "greek_yogurt": 100,
+                "buttermilk": 40,
+                "paneer_cubes": 82,
+                "soy_yogurt": 90
+            },
+            "whole_grain_snacks": {
+                "roasted_chana": 120,
+                "makhana": 106,
+                "whole_grain_crackers": 120,
+                "poha_chivda": 150,
+                "rice_cakes": 70
+            },
+            "vegetables_and_dips": {
+                "carrot_sticks": 25,
+                "cucumber_slices": 16,
+                "hummus": 70,
+                "sprouts_chaat": 80
+            },
+            "beverages": {
+                "masala_chai": 60,
+                "green_tea": 2,
+                "coconut_water": 45
+            }
+        }
     else:  # dinner
         return {
             "proteins": {
@@ -291,6 +295,6 @@ def get_default_food_items(meal_type):
 
 # For caching purposes - to avoid regenerating the same data multiple times
 @st.cache_data(ttl=3600)  # Cache for 1 hour
-def get_food_items(meal_type, dietary_preferences=None, allergies=None):
-    """Cached wrapper for generate_food_items"""
-    return generate_food_items(meal_type, dietary_preferences, allergies)
\ No newline at end of file
+def get_food_items_batch(meal_types, dietary_preferences=None, allergies=None, _deadline=None):
+    """Cached wrapper for generate_food_items_batch (the deadline is not part of the cache key)"""
+    return generate_food_items_batch(meal_types, dietary_preferences, allergies, _deadline)
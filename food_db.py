@@ -0,0 +1,305 @@
+# food_db.py
+import os
+import numpy as np
+import pandas as pd
+from allergens import ALLERGEN_SYNONYMS, scan_allergens
+from ingredients import item_words
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Nutrition table the database is built from: one row per food with calories
+# and grams of protein, carbs and fat per serving
+FOOD_SOURCE = os.path.join(ROOT, "assets", "foods.csv")
+# Built database, one .npy file per array so every process can memory-map it
+FOOD_DB = os.path.join(ROOT, "food_db")
+
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+
+# Trigram (Dice) similarity a spelling needs to be mapped to a known food name
+MIN_NAME_SIMILARITY = 0.7
+# ...and each of its words to the word in the same place of that name
+MIN_WORD_SIMILARITY = 0.5
+
+
+def food_key(name):
+    """Lookup key of a food or catalog item name, e.g. "Greek Yogurt" -> "greek_yogurt" """
+    return "_".join(item_words(name))
+
+
+def _save(path, array):
+    """Write an array next to its final path and move it into place, so readers never see half a file"""
+    partial = f"{path}.{os.getpid()}.partial"
+    with open(partial, "wb") as f:
+        np.save(f, array)
+    os.replace(partial, path)
+
+
+def build_food_db(source=FOOD_SOURCE, db_dir=FOOD_DB, chunksize=100_000):
+    """
+    Turn a nutrition table into the columnar database FoodDatabase maps
+
+    Names are stored sorted as fixed-width UTF-8 bytes so a lookup is a
+    binary search, next to a float32 (nutrient, food) array whose rows are
+    the NUTRIENTS columns. The first row wins for names that repeat.
+
+    Parameters:
+    source (str): CSV with a 'name' column and one column per NUTRIENTS entry
+    db_dir (str): Directory the database is written to
+    chunksize (int): Rows read from the CSV at a time
+
+    Returns:
+    int: Number of foods in the database
+    """
+    names = []
+    values = []
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        missing = [column for column in ("name", *NUTRIENTS) if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        chunk = chunk.dropna(subset=["name"])
+        names.extend(food_key(name) for name in chunk["name"].astype(str))
+        values.append(chunk[list(NUTRIENTS)].to_numpy(dtype=np.float32))
+
+    keys = np.array([name.encode() for name in names], dtype=bytes)
+    nutrients = np.concatenate(values) if values else np.zeros((0, len(NUTRIENTS)), dtype=np.float32)
+    keep = keys != b""
+    keys, nutrients = keys[keep], np.nan_to_num(nutrients[keep])
+    keys, first = np.unique(keys, return_index=True)
+
+    os.makedirs(db_dir, exist_ok=True)
+    _save(os.path.join(db_dir, "nutrients.npy"), np.ascontiguousarray(nutrients[first].T))
+    _save(os.path.join(db_dir, "names.npy"), keys)
+    return len(keys)
+
+
+def _trigrams(key):
+    """Character trigrams of a food key, padded so word starts and ends count"""
+    padded = f" {key.replace('_', ' ')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a, b):
+    """Trigram (Dice) similarity of two food keys or words"""
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def _stem(word):
+    """
+    Shared form of the singular and plural of a word, e.g. "berries",
+    "berry" -> "berri"; only ever compared with other stems
+    """
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "i"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")) and len(word) > 4:
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        word = word[:-1]
+    if word.endswith("ie") and len(word) > 3:
+        return word[:-2] + "i"
+    if word.endswith("y") and len(word) > 3 and word[-2] not in "aeiou":
+        return word[:-1] + "i"
+    return word
+
+
+def _stemmed(key):
+    """Food key with every word stemmed, so "egg" and "eggs" compare equal"""
+    return "_".join(_stem(word) for word in key.split("_"))
+
+
+def _same_words(key, name):
+    """Whether two keys spell the same words, word by word ("greek_yoghurt", "greek_yogurt")"""
+    words, name_words = key.split("_"), name.split("_")
+    return len(words) == len(name_words) and all(
+        _similarity(word, name_word) >= MIN_WORD_SIMILARITY for word, name_word in zip(words, name_words))
+
+
+class NameNormalizer:
+    """
+    Map the many spellings of a food to one canonical name
+
+    Names that differ only in case, spaces, hyphens or underscores share a
+    key ("Greek Yogurt", "greek_yogurt"). Other spellings of a known name
+    ("greek-yoghurt", "tomatos") are matched by character trigram similarity
+    through an inverted index built once, so a lookup scores every known
+    name with one bincount over the posting lists of its trigrams. Singular
+    and plural forms ("egg", "eggs") are matched first, by stemming every
+    word of both names. Answers are memoised. Only spelling variants are mapped: the name must have as
+    many words, each close to the word in the same place, so a longer dish
+    ("spinach dal", "brown rice pasta") never becomes its main ingredient.
+    A spelling is never mapped to a name that mentions different allergens.
+    """
+
+    def __init__(self, names, min_similarity=MIN_NAME_SIMILARITY):
+        self.names = sorted({food_key(name) for name in names} - {""})
+        self.min_similarity = min_similarity
+        self._known = {name: name for name in self.names}
+        self._stems = {}
+        for name in self.names:
+            self._stems.setdefault(_stemmed(name), name)
+        postings = {}
+        sizes = []
+        for i, name in enumerate(self.names):
+            grams = _trigrams(name)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.array(sizes)
+
+    def canonical(self, name):
+        """Canonical name of a food: a known name, or else its key; "" for names without letters or digits"""
+        key = food_key(name)
+        if key not in self._known:
+            self._known[key] = self._closest(key)
+        return self._known[key]
+
+    def _closest(self, key):
+        name = self._stems.get(_stemmed(key))
+        if name and _same_allergens(key, name):
+            return name
+        grams = _trigrams(key)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not key or not lists:
+            return key
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        similarity = 2 * shared / (self._sizes + len(grams))
+        close = np.flatnonzero(similarity >= self.min_similarity)
+        for best in close[np.argsort(-similarity[close], kind="stable")]:
+            name = self.names[best]
+            if _same_words(key, name) and _same_allergens(key, name):
+                return name
+        return key
+
+    def normalize(self, food_groups):
+        """
+        Catalog with canonical item names, keeping the first of any items that turn out to be the same food
+
+        Parameters:
+        food_groups (dict): Group -> {item: calories}, one meal type's catalog from get_food_items_batch
+
+        Returns:
+        dict: Group -> {canonical item: calories}, without groups left empty
+        """
+        return normalize_catalog(food_groups, self.canonical)
+
+
+def _same_allergens(key, name):
+    everything = list(ALLERGEN_SYNONYMS)
+    return scan_allergens(key.replace("_", " "), everything).keys() == scan_allergens(name.replace("_", " "), everything).keys()
+
+
+def normalize_catalog(food_groups, canonical=food_key):
+    """Catalog with item names mapped by `canonical`, by default only to their keys; see NameNormalizer.normalize"""
+    seen = set()
+    normalized = {}
+    for group, foods in food_groups.items():
+        for item, calories in foods.items():
+            name = canonical(item)
+            if name and name not in seen:
+                seen.add(name)
+                normalized.setdefault(group, {})[name] = calories
+    return normalized
+
+
+class FoodDatabase:
+    """
+    Calories and macros per serving for every food of the nutrition table
+
+    The arrays are memory-mapped read-only, so opening the database costs
+    the same for ten foods or a hundred thousand, and every worker process
+    shares the same pages of the OS cache instead of holding its own copy.
+    Lookups for a whole catalog or plan are one vectorized binary search.
+    """
+
+    def __init__(self, db_dir=FOOD_DB):
+        self.names = np.load(os.path.join(db_dir, "names.npy"), mmap_mode="r")
+        self.nutrients = np.load(os.path.join(db_dir, "nutrients.npy"), mmap_mode="r")
+        self._normalizer = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, items):
+        """
+        Rows of the database for a list of item names
+
+        Returns:
+        numpy.ndarray: Row index per item, -1 for items the database does not have
+        """
+        if not len(items) or not len(self.names):
+            return np.full(len(items), -1)
+        keys = np.array([food_key(item).encode() for item in items], dtype=bytes)
+        rows = np.minimum(np.searchsorted(self.names, keys), len(self.names) - 1)
+        return np.where(self.names[rows] == keys, rows, -1)
+
+    @property
+    def normalizer(self):
+        """NameNormalizer over the database's food names, built on first use"""
+        if self._normalizer is None:
+            self._normalizer = NameNormalizer(name.decode() for name in self.names)
+        return self._normalizer
+
+    def calibrate(self, food_groups):
+        """
+        Catalog with database calories for the items the database knows
+
+        Calories guessed by the AI are kept for the rest.
+
+        Parameters:
+        food_groups (dict): Group -> {item: calories}, one meal type's catalog from get_food_items_batch
+
+        Returns:
+        dict: The same catalog with calories per serving from the database where known
+        """
+        items = [item for foods in food_groups.values() for item in foods]
+        rows = self.lookup(items)
+        db_calories = np.asarray(self.nutrients[0])[np.maximum(rows, 0)]
+        known = {item: round(float(value)) for item, row, value in zip(items, rows, db_calories) if row >= 0}
+        return {
+            group: {item: known.get(item, calories) for item, calories in foods.items()}
+            for group, foods in food_groups.items()
+        }
+
+    def plan_macros(self, day_plan):
+        """
+        Nutrient totals of every meal of a plan, from one lookup for the whole day
+
+        Parameters:
+        day_plan (dict): Meal name -> (selected_items, total_calories, servings), as returned by solve_day
+
+        Returns:
+        dict: Meal name -> ({nutrient: total}, items the database does not have)
+        """
+        meals = list(day_plan)
+        items = [item for meal in meals for item in day_plan[meal][0]]
+        servings = np.array([day_plan[meal][2][item] for meal in meals for item in day_plan[meal][0]], dtype=float)
+        meal_index = np.repeat(np.arange(len(meals)), [len(day_plan[meal][0]) for meal in meals])
+        rows = self.lookup(items)
+        known = rows >= 0
+
+        totals = np.zeros((len(NUTRIENTS), len(meals)))
+        np.add.at(totals.T, meal_index[known], (np.asarray(self.nutrients[:, rows[known]]) * servings[known]).T)
+        missing = {meal: [] for meal in meals}
+        for item, m in zip(np.array(items, dtype=object)[~known], meal_index[~known]):
+            missing[meals[m]].append(item)
+        return {
+            meal: ({nutrient: round(float(totals[n, m]), 1) for n, nutrient in enumerate(NUTRIENTS)}, missing[meal])
+            for m, meal in enumerate(meals)
+        }
+
+
+def open_food_db(db_dir=FOOD_DB, source=FOOD_SOURCE):
+    """The local food database, built from `source` first if needed; None if neither exists"""
+    if not os.path.exists(os.path.join(db_dir, "names.npy")):
+        if not os.path.exists(source):
+            return None
+        build_food_db(source, db_dir)
+    return FoodDatabase(db_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Build step: python food_db.py [FOODS.csv], e.g. from a full nutrition export
+    count = build_food_db(sys.argv[1] if len(sys.argv) > 1 else FOOD_SOURCE)
+    print(f"{FOOD_DB}: {count} foods")
@@ -0,0 +1,244 @@
+# history.py
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import time
+import zlib
+from recipe_model import Recipe
+
+HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plan_history.sqlite3")
+# Retention: newest plans kept per user, and the age after which plans are dropped
+MAX_PLANS_PER_USER = 20
+MAX_PLAN_AGE_DAYS = 90
+# Shared links stay valid this long after they were last shared
+MAX_SHARED_PLAN_AGE_DAYS = 365
+# Random bytes in a visitor token, the part of the history key only that browser session holds
+VISITOR_TOKEN_BYTES = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    profile_hash TEXT NOT NULL,
+    created REAL NOT NULL,
+    label TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_by_user ON plans (user, created DESC);
+CREATE INDEX IF NOT EXISTS plans_by_profile ON plans (user, profile_hash, created DESC);
+CREATE TABLE IF NOT EXISTS shared_plans (
+    key TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+"""
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def visitor_token():
+    """New random visitor token"""
+    return secrets.token_urlsafe(VISITOR_TOKEN_BYTES)
+
+
+def user_key(token, name):
+    """
+    Key plans are stored under: the visitor's token plus their name, ignoring
+    case and surrounding spaces, so typing someone's name shows nothing of theirs
+    """
+    return f'{token}:{" ".join(name.split()).lower()}'
+
+
+def profile_hash(profile):
+    """Stable hash of the inputs a plan was generated from"""
+    encoded = json.dumps(profile, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def encode_plan(plan):
+    """Compact on-disk form of a plan: zlib-compressed JSON with recipes as dicts"""
+    stored = dict(plan)
+    stored.pop("id", None)
+    stored["recipes"] = {
+        slot: {"recipe": recipe["recipe"].to_dict()} if "recipe" in recipe else recipe
+        for slot, recipe in plan["recipes"].items()
+    }
+    # numpy scalars and arrays from the solver become plain numbers and lists
+    encoded = json.dumps(stored, separators=(",", ":"), default=_plain)
+    return zlib.compress(encoded.encode(), 9)
+
+
+def _plain(value):
+    return value.tolist()
+
+
+def _same_meals(plan, stored):
+    """True if both plans chose the same items for the same meals"""
+    return json.loads(json.dumps(plan["day_plan"], default=_plain)) == json.loads(json.dumps(stored["day_plan"]))
+
+
+def _merged_payload(plan, stored_payload):
+    """Payload of `plan` keeping recipes that were only generated into the stored copy"""
+    stored = decode_plan(stored_payload)
+    return encode_plan({**plan, "recipes": {**stored["recipes"], **plan["recipes"]}})
+
+
+def decode_plan(payload):
+    """Inverse of encode_plan, rebuilding Recipe records and tuples"""
+    plan = json.loads(zlib.decompress(payload))
+    plan["recipes"] = {
+        slot: {"recipe": Recipe.from_dict(recipe["recipe"])} if "recipe" in recipe else recipe
+        for slot, recipe in plan["recipes"].items()
+    }
+    # Plans saved before serving sizes were added had one serving of each item
+    plan["day_plan"] = {slot: (meal[0], meal[1], meal[2] if len(meal) > 2 else dict.fromkeys(meal[0], 1))
+                        for slot, meal in plan["day_plan"].items()}
+    if plan.get("household"):
+        plan["household"] = tuple((member, scale) for member, scale in plan["household"])
+    return plan
+
+
+def save_plan(user, profile, plan, label, db_path=HISTORY_DB):
+    """
+    Store a generated plan and apply the retention limits for its user
+    
+    Recipes are generated meal by meal as the user opens them, so saving the
+    same meals again updates the stored plan instead of adding a new one.
+
+    Parameters:
+    user (str): History key of the user, see user_key
+    profile (dict): Inputs the plan was generated from, see profile_hash
+    plan (dict): Everything needed to render the plan again
+    label (str): Short description shown in the history list
+    db_path (str): SQLite database file
+
+    Returns:
+    int: Id of the stored plan
+    """
+    key = profile_hash(profile)
+    payload = encode_plan(plan)
+    now = time.time()
+    connection = _connect(db_path)
+    try:
+        with connection:
+            # Reruns render the same cached plan again; store it only once
+            latest = connection.execute(
+                "SELECT id, payload FROM plans WHERE user = ? AND profile_hash = ? ORDER BY created DESC LIMIT 1",
+                (user, key),
+            ).fetchone()
+            if latest and _same_meals(plan, json.loads(zlib.decompress(latest[1]))):
+                payload = _merged_payload(plan, latest[1])
+                if payload != latest[1]:
+                    connection.execute("UPDATE plans SET payload = ? WHERE id = ?", (payload, latest[0]))
+                return latest[0]
+            plan_id = connection.execute(
+                "INSERT INTO plans (user, profile_hash, created, label, payload) VALUES (?, ?, ?, ?, ?)",
+                (user, key, now, label, payload),
+            ).lastrowid
+            connection.execute("DELETE FROM plans WHERE created < ?", (now - MAX_PLAN_AGE_DAYS * 86400,))
+            connection.execute(
+                "DELETE FROM plans WHERE user = ? AND id NOT IN "
+                "(SELECT id FROM plans WHERE user = ? ORDER BY created DESC LIMIT ?)",
+                (user, user, MAX_PLANS_PER_USER),
+            )
+    finally:
+        connection.close()
+    return plan_id
+
+
+def list_plans(user, db_path=HISTORY_DB):
+    """Newest-first (id, created, profile_hash, label) rows for a user, without payloads"""
+    if not os.path.exists(db_path):
+        return []
+    connection = _connect(db_path)
+    try:
+        return connection.execute(
+            "SELECT id, created, profile_hash, label FROM plans WHERE user = ? ORDER BY created DESC",
+            (user,),
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def load_plan(plan_id, user, db_path=HISTORY_DB):
+    """A stored plan of this user, ready to render, or None if it is gone"""
+    if not os.path.exists(db_path):
+        return None
+    connection = _connect(db_path)
+    try:
+        row = connection.execute(
+            "SELECT payload FROM plans WHERE id = ? AND user = ?", (plan_id, user)
+        ).fetchone()
+    finally:
+        connection.close()
+    if not row:
+        return None
+    plan = decode_plan(row[0])
+    plan["id"] = plan_id
+    return plan
+
+
+def update_plan(plan_id, user, plan, db_path=HISTORY_DB):
+    """Store recipes generated after a saved plan was reopened"""
+    connection = _connect(db_path)
+    try:
+        with connection:
+            row = connection.execute(
+                "SELECT payload FROM plans WHERE id = ? AND user = ?", (plan_id, user)
+            ).fetchone()
+            if row:
+                payload = _merged_payload(plan, row[0])
+                if payload != row[0]:
+                    connection.execute("UPDATE plans SET payload = ? WHERE id = ?", (payload, plan_id))
+    finally:
+        connection.close()
+
+
+def share_plan(plan, db_path=HISTORY_DB):
+    """
+    Store a snapshot of a plan under the hash of its contents, for a permalink
+
+    The same plan always gets the same key, so sharing it again reuses the
+    stored copy. A plan with more recipes generated is a new snapshot.
+
+    Parameters:
+    plan (dict): Everything needed to render the plan again
+    db_path (str): SQLite database file
+
+    Returns:
+    str: Key of the shared plan, used as ?plan= in the link
+    """
+    payload = encode_plan(plan)
+    key = hashlib.sha256(payload).hexdigest()[:16]
+    now = time.time()
+    connection = _connect(db_path)
+    try:
+        with connection:
+            connection.execute(
+                "INSERT INTO shared_plans (key, created, payload) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET created = excluded.created",
+                (key, now, payload),
+            )
+            connection.execute("DELETE FROM shared_plans WHERE created < ?", (now - MAX_SHARED_PLAN_AGE_DAYS * 86400,))
+    finally:
+        connection.close()
+    return key
+
+
+def load_shared_plan(key, db_path=HISTORY_DB):
+    """A shared plan ready to render, or None if the link is unknown or expired"""
+    if not os.path.exists(db_path):
+        return None
+    connection = _connect(db_path)
+    try:
+        row = connection.execute("SELECT payload FROM shared_plans WHERE key = ?", (key,)).fetchone()
+    finally:
+        connection.close()
+    return decode_plan(row[0]) if row else None
@@ -0,0 +1,56 @@
+# household.py
+import numpy as np
+from nutrition import calculate_bmr_batch
+
+MAX_HOUSEHOLD_SIZE = 6
+
+
+def household_needs(members):
+    """
+    Daily calorie needs for every household member in one vectorized pass
+
+    Parameters:
+    members (list): Dicts with 'weight' (kg), 'height' (cm), 'age', 'gender',
+                    'activity' and an optional 'adjustment' (calorie deficit or
+                    surplus, negative for weight loss)
+
+    Returns:
+    numpy.ndarray: Daily calories per member, same order as `members`
+    """
+    needs = calculate_bmr_batch(
+        [member["weight"] for member in members],
+        [member["height"] for member in members],
+        [member["age"] for member in members],
+        [member["gender"] for member in members],
+        [member["activity"] for member in members],
+    )
+    adjustments = np.array([member.get("adjustment", 0) for member in members], dtype=float)
+    return np.round(needs + adjustments, 2)
+
+
+def shared_allergies(members, allergies=None):
+    """Union of everyone's allergies, keeping first-seen order"""
+    combined = list(allergies or [])
+    for member in members:
+        combined.extend(member.get("allergies", []))
+    return list(dict.fromkeys(combined))
+
+
+def portion_scales(needs):
+    """
+    Portion multiplier per member for one shared set of ingredients
+
+    The plan is solved once for the household's average needs; each member
+    eats that plan scaled by their own needs relative to the average.
+
+    Parameters:
+    needs (array-like): Daily calories per member
+
+    Returns:
+    tuple: (plan_calories, scales) - the per-portion calorie target to solve for
+           and a numpy array of multipliers rounded to 0.05
+    """
+    needs = np.asarray(needs, dtype=float)
+    plan_calories = float(needs.mean())
+    scales = np.round(needs / plan_calories * 20) / 20
+    return round(plan_calories, 2), scales
@@ -0,0 +1,66 @@
+# ingredients.py
+import re
+
+
+def item_words(item):
+    """Lower-case words of an item name or search text, e.g. "Greek_Yogurt" -> ["greek", "yogurt"]"""
+    return re.findall(r"[a-z0-9]+", item.lower())
+
+
+def display_name(item):
+    """Readable form of a catalog item name"""
+    return " ".join(item_words(item)).capitalize()
+
+
+def catalog_items(catalogs):
+    """Every item name in a {meal: {group: {item: calories}}} mapping"""
+    return sorted({item for food_groups in catalogs.values() for foods in food_groups.values() for item in foods})
+
+
+def parse_terms(text):
+    """Comma-separated search terms typed by the user"""
+    return [term.strip() for term in (text or "").split(",") if term.strip()]
+
+
+class IngredientIndex:
+    """
+    Prefix index over the words of catalog item names
+
+    Every prefix of every word maps to the items containing that word, a
+    trie flattened into one dict, so a lookup is a hash probe per typed
+    word however many items the catalog has. Built once per catalog.
+    """
+
+    def __init__(self, items):
+        self.items = sorted(set(items))
+        self._prefixes = {}
+        for item in self.items:
+            for word in item_words(item):
+                for end in range(1, len(word) + 1):
+                    self._prefixes.setdefault(word[:end], set()).add(item)
+
+    def search(self, query, limit=None):
+        """
+        Items with a word starting with each word of the query
+
+        Parameters:
+        query (str): Text as typed, e.g. "mush" or "greek yog"
+        limit (int): Maximum number of results
+
+        Returns:
+        list: Matching items, shortest names first
+        """
+        words = item_words(query)
+        if not words:
+            return []
+        matches = set.intersection(*(self._prefixes.get(word, set()) for word in words))
+        return sorted(matches, key=lambda item: (len(item), item))[:limit]
+
+    def best(self, query):
+        """The closest single item for a must-include term, or None"""
+        matches = self.search(query, limit=1)
+        return matches[0] if matches else None
+
+    def matching(self, terms):
+        """Every item matched by any of the terms, for must-exclude"""
+        return {item for term in terms for item in self.search(term)}
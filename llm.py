@@ -0,0 +1,462 @@
+# llm.py
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import google.generativeai as genai
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+# Second provider; used once configure_anthropic has been given a key
+ANTHROPIC_MODEL = "claude-haiku-4-5"
+# Anthropic requires an output limit; used when the call does not set one
+ANTHROPIC_MAX_TOKENS = 4096
+
+# Models tried for each route, preferred first; routing moves down the list
+# while a model is slow, failing or close to its quota
+ROUTE_MODELS = {
+    "catalog": ["gemini-1.5-flash-8b", "gemini-1.5-flash", ANTHROPIC_MODEL],
+    "recipe": [DEFAULT_MODEL, "gemini-1.5-flash-8b", ANTHROPIC_MODEL],
+    "recipe_details": [DEFAULT_MODEL, "gemini-1.5-flash-8b", ANTHROPIC_MODEL],
+}
+# Routes on the plan's critical path race the best model of each provider;
+# other routes fail over to the next model on an error or a slow answer
+RACE_ROUTES = {"catalog"}
+# Races may add at most this share of extra requests per route, and only
+# start a rival that is itself healthy
+RACE_MAX_RATIO = 0.25
+# A model is skipped while its recent p95 latency on a route is above this
+ROUTE_LATENCY_BUDGETS = {"catalog": 2.0, "recipe": 4.0, "recipe_details": 10.0}
+# ... or while more than this share of its recent calls failed or timed out
+MAX_ERROR_RATE = 0.3
+HEALTH_MIN_SAMPLES = 5
+# Telemetry older than this is forgotten, so a skipped model gets retried
+HEALTH_WINDOW_SECONDS = 300
+# Requests per minute allowed per model (Gemini API free tier); routing
+# moves on once QUOTA_HEADROOM of a limit is used
+MODEL_RPM_LIMITS = {"gemini-1.5-flash": 15, "gemini-1.5-flash-8b": 15, "gemini-1.5-pro": 2, ANTHROPIC_MODEL: 50}
+QUOTA_HEADROOM = 0.9
+# Upper bound on a single call when no plan deadline is given
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+# A hedged duplicate goes out once a call has run longer than this
+# percentile of recent latencies for its route
+HEDGE_PERCENTILE = 0.95
+# Latencies needed before the percentile is trusted
+HEDGE_MIN_SAMPLES = 20
+# Hedges may add at most this share of extra requests per route
+HEDGE_MAX_RATIO = 0.1
+
+LATENCY_WINDOW = 200
+# Per-request token and latency records kept for reporting
+REQUEST_LOG_SIZE = 100
+
+# Worker threads per pool. A call holds its worker until the provider
+# answers or its own timeout ends it, even after generate_content gave up on
+# it, so speculative requests (see background) get a pool of their own and
+# races and hedges only start while their pool has an idle worker
+POOL_WORKERS = {"foreground": 8, "background": 2}
+
+_pools = {pool: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"llm-{pool}")
+          for pool, workers in POOL_WORKERS.items()}
+_busy = dict.fromkeys(POOL_WORKERS, 0)
+_local = threading.local()
+_lock = threading.Lock()
+_latencies = {}
+_counters = {}
+_requests = deque(maxlen=REQUEST_LOG_SIZE)
+_models = {}
+_health = {}
+_model_calls = {}
+_anthropic = {"api_key": None, "client": None}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an LLM call has not answered before its deadline"""
+
+
+class Completion:
+    """Provider-neutral answer: `text` plus Gemini-style `usage_metadata`"""
+
+    __slots__ = ("text", "usage_metadata")
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def provider_of(model_name):
+    return "anthropic" if model_name.startswith("claude") else "gemini"
+
+
+def configure_anthropic(api_key):
+    """Enable Anthropic models as racing and failover candidates"""
+    with _lock:
+        if api_key != _anthropic["api_key"]:
+            _anthropic["api_key"] = api_key
+            _anthropic["client"] = None
+
+
+def _provider_available(provider):
+    return provider != "anthropic" or bool(_anthropic["api_key"])
+
+
+def _route_counters(route):
+    return _counters.setdefault(route, {"calls": 0, "races": 0, "race_wins": 0, "hedges": 0, "hedge_wins": 0,
+                                        "timeouts": 0, "errors": 0})
+
+
+def record_latency(route, seconds):
+    with _lock:
+        _latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def latency_percentile(route, percentile):
+    """Latency percentile for a route, or None until enough samples are in"""
+    with _lock:
+        samples = sorted(_latencies.get(route, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(int(percentile * len(samples)), len(samples) - 1)]
+
+
+def latency_stats():
+    """Per-route call counts and p50/p95 latencies, for display and logging"""
+    stats = {}
+    with _lock:
+        routes = set(_latencies) | set(_counters)
+        snapshot = {route: sorted(_latencies.get(route, ())) for route in routes}
+        counters = {route: dict(_route_counters(route)) for route in routes}
+    for route, samples in snapshot.items():
+        pick = lambda p: round(samples[min(int(p * len(samples)), len(samples) - 1)], 3) if samples else None
+        stats[route] = {**counters[route], "p50": pick(0.5), "p95": pick(0.95)}
+    return stats
+
+
+def _extra_allowed(route, kind, max_ratio):
+    """Count one more race or hedge of a route if it stays within `max_ratio` of its calls"""
+    with _lock:
+        counters = _route_counters(route)
+        if counters[kind] + 1 > max_ratio * counters["calls"]:
+            return False
+        counters[kind] += 1
+        return True
+
+
+def _hedge_allowed(route):
+    return _extra_allowed(route, "hedges", HEDGE_MAX_RATIO)
+
+
+def _race_allowed(route):
+    return _extra_allowed(route, "races", RACE_MAX_RATIO)
+
+
+@contextmanager
+def background():
+    """
+    Run the requests this thread makes in the background pool
+
+    For speculative work such as prefetching: a request that finds every
+    background worker busy raises DeadlineExceeded at once instead of
+    queueing, and never takes a worker from a user's request.
+    """
+    previous = getattr(_local, "pool", "foreground")
+    _local.pool = "background"
+    try:
+        yield
+    finally:
+        _local.pool = previous
+
+
+def _spare_worker(pool):
+    with _lock:
+        return _busy[pool] < POOL_WORKERS[pool]
+
+
+def _release(pool):
+    """Done callback giving a call's worker back to `pool`"""
+    busy = _busy
+
+    def done(future):
+        with _lock:
+            busy[pool] -= 1
+    return done
+
+
+def set_route_model(route, model_name):
+    """Make `model_name` the preferred model of a route, keeping the others as fallbacks"""
+    with _lock:
+        ladder = ROUTE_MODELS.get(route, [DEFAULT_MODEL])
+        ROUTE_MODELS[route] = [model_name] + [model for model in ladder if model != model_name]
+
+
+def record_health(route, model_name, seconds, ok):
+    with _lock:
+        _health.setdefault((route, model_name), deque(maxlen=LATENCY_WINDOW)).append((time.time(), seconds, ok))
+
+
+def _record_model_call(model_name):
+    with _lock:
+        _model_calls.setdefault(model_name, deque(maxlen=1000)).append(time.time())
+
+
+def model_health(route, model_name):
+    """Recent latency, error rate and quota use of one model on one route"""
+    now = time.time()
+    with _lock:
+        samples = [sample for sample in _health.get((route, model_name), ()) if now - sample[0] < HEALTH_WINDOW_SECONDS]
+        rpm = sum(1 for started in _model_calls.get(model_name, ()) if now - started < 60)
+    latencies = sorted(seconds for _, seconds, ok in samples if ok)
+    pick = lambda p: round(latencies[min(int(p * len(latencies)), len(latencies) - 1)], 3) if latencies else None
+    return {
+        "samples": len(samples),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "error_rate": round(sum(1 for *_, ok in samples if not ok) / len(samples), 3) if samples else 0.0,
+        "rpm": rpm,
+        "rpm_limit": MODEL_RPM_LIMITS.get(model_name),
+    }
+
+
+def _healthy(route, model_name):
+    health = model_health(route, model_name)
+    if health["rpm_limit"] and health["rpm"] >= QUOTA_HEADROOM * health["rpm_limit"]:
+        return False
+    if health["samples"] < HEALTH_MIN_SAMPLES:
+        return True
+    too_slow = health["p95"] is not None and health["p95"] > ROUTE_LATENCY_BUDGETS.get(route, DEFAULT_TIMEOUT_SECONDS)
+    return not too_slow and health["error_rate"] <= MAX_ERROR_RATE
+
+
+def route_candidates(route):
+    """Models of a route from configured providers: healthy ones first, each group in preference order"""
+    ladder = [model for model in ROUTE_MODELS.get(route, [DEFAULT_MODEL]) if _provider_available(provider_of(model))]
+    healthy = [model for model in ladder if _healthy(route, model)]
+    return healthy + [model for model in ladder if model not in healthy]
+
+
+def routing_stats():
+    """One row per route and model: health, quota use and whether it is selected now"""
+    rows = []
+    for route in list(ROUTE_MODELS):
+        candidates = route_candidates(route)
+        for model_name in candidates:
+            rows.append({"route": route, "provider": provider_of(model_name), "model": model_name,
+                         "selected": model_name == candidates[0], **model_health(route, model_name)})
+    return rows
+
+
+def record_usage(route, model_name, seconds, response):
+    """Log the token counts the provider reports for one request"""
+    usage = getattr(response, "usage_metadata", None)
+    entry = {
+        "route": route,
+        "model": model_name,
+        "seconds": round(seconds, 3),
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+    }
+    with _lock:
+        _requests.append(entry)
+
+
+def recent_requests():
+    """Newest-last token and latency records of recent requests"""
+    with _lock:
+        return list(_requests)
+
+
+def _model(model_name, system_instruction):
+    """Model object for a static system instruction, built once per process"""
+    key = (model_name, system_instruction)
+    with _lock:
+        if key not in _models:
+            _models[key] = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        return _models[key]
+
+
+def _call_gemini(model_name, prompt, generation_config, timeout, system_instruction=None):
+    return _model(model_name, system_instruction).generate_content(
+        prompt, generation_config=generation_config, request_options={"timeout": timeout}
+    )
+
+
+def _anthropic_client():
+    with _lock:
+        if _anthropic["client"] is None:
+            # Optional dependency, only needed once an Anthropic key is configured
+            import anthropic
+            _anthropic["client"] = anthropic.Anthropic(api_key=_anthropic["api_key"], max_retries=0)
+        return _anthropic["client"]
+
+
+def _call_anthropic(model_name, prompt, generation_config, timeout, system_instruction=None):
+    """Call Claude with the same arguments as Gemini, returning a Completion"""
+    generation_config = generation_config or {}
+    system = []
+    if system_instruction:
+        system.append({"type": "text", "text": system_instruction})
+    if generation_config.get("response_mime_type") == "application/json":
+        system.append({"type": "text", "text": "Respond with a single JSON object and no other text."})
+    kwargs = {"system": system} if system else {}
+    message = _anthropic_client().messages.create(
+        model=model_name,
+        max_tokens=generation_config.get("max_output_tokens", ANTHROPIC_MAX_TOKENS),
+        messages=[{"role": "user", "content": prompt}],
+        timeout=timeout,
+        **kwargs,
+    )
+    return Completion(
+        "".join(block.text for block in message.content if block.type == "text"),
+        SimpleNamespace(prompt_token_count=message.usage.input_tokens,
+                        candidates_token_count=message.usage.output_tokens),
+    )
+
+
+# Call function per provider; a local stand-in can be registered for tests
+PROVIDERS = {"gemini": _call_gemini, "anthropic": _call_anthropic}
+
+
+def _call(model_name, prompt, generation_config, timeout, system_instruction=None):
+    return PROVIDERS[provider_of(model_name)](model_name, prompt, generation_config, timeout, system_instruction)
+
+
+def _is_timeout(error):
+    """Whether a provider error is a timeout (TimeoutError, or an SDK's own timeout class)"""
+    name = type(error).__name__.lower()
+    return isinstance(error, TimeoutError) or "timeout" in name or "deadline" in name
+
+
+def generate_content(prompt, route, deadline=None, generation_config=None, model_name=None,
+                     system_instruction=None, validate=None):
+    """
+    Call the LLM with a deadline, racing or failing over between providers
+
+    Unless a model is given, candidates come from route_candidates: the
+    route's models on configured providers, healthy ones first. Routes in
+    RACE_ROUTES start the best Gemini and Anthropic candidates together
+    when the rival is healthy (within the RACE_MAX_RATIO quota). In any
+    route, an error or invalid answer moves on to the next candidate,
+    and a call still running after the route's observed p95 latency gets
+    one hedge on the next candidate (within the HEDGE_MAX_RATIO quota).
+    Races and hedges start only while the pool has an idle worker. The
+    first valid answer wins; the others are cancelled, or abandoned if
+    already in flight, and their own timeouts end them by the deadline.
+
+    Parameters:
+    prompt (str): Prompt text
+    route (str): Name the latency statistics are kept under ('catalog', 'recipe', ...)
+    deadline (float): time.monotonic() value by which an answer is needed
+    generation_config (dict): Gemini generation config (JSON mode, max_output_tokens)
+    model_name (str): Model to call; disables racing and failover
+    system_instruction (str): Static instructions shared by every request of the route
+    validate (callable): Raises or returns False for an unusable answer text
+
+    Returns:
+    The Gemini response object or a Completion, both with a `text` attribute
+
+    Raises:
+    DeadlineExceeded: No answer arrived before the deadline, or no
+    background worker was free (see background)
+    """
+    if deadline is None:
+        deadline = time.monotonic() + DEFAULT_TIMEOUT_SECONDS
+    with _lock:
+        _route_counters(route)["calls"] += 1
+
+    def remaining():
+        return deadline - time.monotonic()
+
+    if remaining() <= 0:
+        with _lock:
+            _route_counters(route)["timeouts"] += 1
+        raise DeadlineExceeded(f"No time left for {route} request")
+
+    pool = getattr(_local, "pool", "foreground")
+    if pool == "background" and not _spare_worker(pool):
+        with _lock:
+            _route_counters(route)["timeouts"] += 1
+        raise DeadlineExceeded(f"No background worker free for {route} request")
+
+    candidates = [model_name] if model_name else route_candidates(route)
+    queue = list(candidates)
+    started = time.monotonic()
+    pending = set()
+    attempts = {}
+
+    def submit(model):
+        _record_model_call(model)
+        with _lock:
+            _busy[pool] += 1
+        future = _pools[pool].submit(_call, model, prompt, generation_config, remaining(), system_instruction)
+        future.add_done_callback(_release(pool))
+        attempts[future] = (model, time.monotonic())
+        pending.add(future)
+        return future
+
+    def next_model():
+        return queue.pop(0) if queue else None
+
+    primary = next_model()
+    submit(primary)
+    # Futures whose win is counted as a race or hedge win
+    extra = {}
+    if route in RACE_ROUTES and not model_name:
+        rival = next((model for model in queue if provider_of(model) != provider_of(primary)), None)
+        if rival and _healthy(route, rival) and _spare_worker(pool) and _race_allowed(route):
+            queue.remove(rival)
+            extra[submit(rival)] = "race_wins"
+    hedge_after = latency_percentile(route, HEDGE_PERCENTILE)
+    hedged = False
+    error = None
+
+    try:
+        while pending and remaining() > 0:
+            wait_for = remaining()
+            if not hedged and hedge_after is not None:
+                wait_for = min(wait_for, max(started + hedge_after - time.monotonic(), 0))
+            done, not_done = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            pending.intersection_update(not_done)
+
+            for future in done:
+                model, submitted = attempts[future]
+                try:
+                    response = future.result()
+                    if validate and validate(response.text) is False:
+                        raise ValueError(f"{model} returned an unusable answer")
+                except Exception as e:
+                    error = e
+                    record_health(route, model, time.monotonic() - submitted, False)
+                    # Fail over to the next candidate while there is time
+                    fallback = next_model()
+                    if fallback and remaining() > 0:
+                        submit(fallback)
+                    continue
+                record_latency(route, time.monotonic() - started)
+                record_health(route, model, time.monotonic() - submitted, True)
+                record_usage(route, model, time.monotonic() - started, response)
+                if future in extra:
+                    with _lock:
+                        _route_counters(route)[extra[future]] += 1
+                return response
+
+            if not done and not hedged and hedge_after is not None and remaining() > 0:
+                hedged = True
+                if _spare_worker(pool) and _hedge_allowed(route):
+                    extra[submit(next_model() or primary)] = "hedge_wins"
+    finally:
+        for future in pending:
+            future.cancel()
+
+    for future in pending:
+        model, submitted = attempts[future]
+        record_health(route, model, time.monotonic() - submitted, False)
+    # An SDK timeout at the deadline is a missed deadline too, so callers
+    # fall back without caching an error
+    failed = error is not None and not pending and remaining() > 0 and not _is_timeout(error)
+    with _lock:
+        _route_counters(route)["errors" if failed else "timeouts"] += 1
+    if failed:
+        raise error
+    raise DeadlineExceeded(f"{route} request did not finish before the deadline") from error
@@ -0,0 +1,193 @@
+# nutrition.py
+import numpy as np
+import pandas as pd
+
+# Multipliers applied to the Mifflin-St Jeor BMR for each activity level
+ACTIVITY_FACTORS = {
+    "Sedentary": 1.2,
+    "Lightly Active": 1.375,
+    "Moderately Active": 1.55,
+    "Very Active": 1.725,
+    "Extremely Active": 1.9
+}
+
+# Sign applied to the calorie adjustment for each weight goal
+GOAL_SIGNS = {"Maintain": 0, "Lose": -1, "Gain": 1}
+DEFAULT_GOAL_ADJUSTMENT = 500
+
+# Columns expected in user exports scored by score_file
+USER_COLUMNS = ["weight", "height", "age", "gender", "activity"]
+
+
+# Calculate BMR with activity factor
+def calculate_bmr(weight, height, age, gender, activity):
+    # Base BMR calculation
+    if gender == "Male":
+        bmr = 9.99 * weight + 6.25 * height - 4.92 * age + 5
+    else:
+        bmr = 9.99 * weight + 6.25 * height - 4.92 * age - 161
+
+    # Apply activity factor
+    return bmr * ACTIVITY_FACTORS[activity]
+
+
+def basal_metabolic_rate_batch(weight, height, age, gender):
+    """Mifflin-St Jeor BMR (before activity) for arrays of people"""
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    age = np.asarray(age, dtype=float)
+    gender = np.asarray(gender)
+    return 9.99 * weight + 6.25 * height - 4.92 * age + np.where(gender == "Male", 5, -161)
+
+
+def activity_factors(activity):
+    """Activity multiplier per person, looking up each distinct level once"""
+    levels, index = np.unique(np.asarray(activity), return_inverse=True)
+    factors = np.array([ACTIVITY_FACTORS[level] for level in levels], dtype=float)
+    return factors[index.reshape(np.shape(activity))]
+
+
+def calculate_bmr_batch(weight, height, age, gender, activity):
+    """
+    Vectorized calculate_bmr for many people at once
+
+    Parameters:
+    weight (array-like): Weights in kg
+    height (array-like): Heights in cm
+    age (array-like): Ages in years
+    gender (array-like): 'Male' or 'Female' per person
+    activity (array-like): Activity level per person, a key of ACTIVITY_FACTORS
+
+    Returns:
+    numpy.ndarray: Activity-adjusted daily calorie needs, same order as the inputs
+    """
+    return basal_metabolic_rate_batch(weight, height, age, gender) * activity_factors(activity)
+
+
+def calculate_target(weight, height, age, gender, activity, goal="Maintain", adjustment=DEFAULT_GOAL_ADJUSTMENT):
+    """Daily calorie target after the weight goal, as shown in the planner"""
+    return round(calculate_bmr(weight, height, age, gender, activity), 2) + GOAL_SIGNS[goal] * adjustment
+
+
+def energy_needs(weight, height, age, gender, activity, goal=None, adjustment=None):
+    """
+    Columnar BMR, activity-adjusted TDEE and goal-adjusted targets
+
+    Matches calculate_bmr and calculate_target element by element.
+
+    Parameters:
+    weight, height, age, gender, activity (array-like): As for calculate_bmr_batch
+    goal (array-like): Optional 'Maintain', 'Lose' or 'Gain' per person
+    adjustment (array-like): Optional calorie deficit/surplus per person,
+                             DEFAULT_GOAL_ADJUSTMENT where missing
+
+    Returns:
+    dict: 'bmr', 'tdee' and 'target' arrays
+    """
+    bmr = basal_metabolic_rate_batch(weight, height, age, gender)
+    tdee = bmr * activity_factors(activity)
+
+    target = np.array(np.round(tdee, 2))
+    # np.round scales by 100 first, so a value just above or below a half
+    # cent can round the other way from round(); redo those near-ties the
+    # way calculate_target does
+    scaled = tdee * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    target[ties] = [round(float(value), 2) for value in tdee[ties]]
+    if goal is not None:
+        goal = pd.Series(np.asarray(goal, dtype=object).ravel()).fillna("Maintain")
+        signs = goal.map(GOAL_SIGNS).to_numpy(dtype=float).reshape(target.shape)
+        if np.isnan(signs).any():
+            raise KeyError(f"Unknown weight goal in {sorted(set(goal) - set(GOAL_SIGNS))}")
+        if adjustment is None:
+            adjustment = np.full(target.shape, DEFAULT_GOAL_ADJUSTMENT, dtype=float)
+        else:
+            adjustment = np.asarray(adjustment, dtype=float)
+            adjustment = np.where(np.isnan(adjustment), DEFAULT_GOAL_ADJUSTMENT, adjustment)
+        target = target + signs * adjustment
+
+    return {"bmr": bmr, "tdee": tdee, "target": target}
+
+
+def score_frame(users):
+    """
+    Add 'bmr', 'tdee' and 'target' columns to a table of users
+
+    Parameters:
+    users (pandas.DataFrame): Must contain USER_COLUMNS; 'goal' and
+                              'adjustment' columns are used when present
+
+    Returns:
+    pandas.DataFrame: Copy of `users` with the three score columns appended
+    """
+    missing = [column for column in USER_COLUMNS if column not in users.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    needs = energy_needs(
+        users["weight"].to_numpy(),
+        users["height"].to_numpy(),
+        users["age"].to_numpy(),
+        users["gender"].to_numpy(),
+        users["activity"].to_numpy(),
+        users["goal"].to_numpy() if "goal" in users.columns else None,
+        users["adjustment"].to_numpy() if "adjustment" in users.columns else None,
+    )
+    return users.assign(**needs)
+
+
+def iter_user_chunks(path, chunksize=100_000):
+    """Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file"""
+    if str(path).endswith(".parquet"):
+        # Imported here so the planner, which never reads Parquet, does not load it
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def iter_scored_chunks(path, chunksize=100_000):
+    """
+    Lazily score a user export chunk by chunk so memory stays bounded
+
+    Nothing is read until the generator is consumed.
+
+    Parameters:
+    path (str): CSV or Parquet file of users
+    chunksize (int): Rows held in memory at a time
+
+    Returns:
+    generator: Scored DataFrame chunks, see score_frame
+    """
+    for chunk in iter_user_chunks(path, chunksize):
+        yield score_frame(chunk)
+
+
+def score_file(path, output_path, chunksize=100_000):
+    """
+    Score a user export into a CSV file, one chunk in memory at a time
+
+    Parameters:
+    path (str): CSV or Parquet file of users
+    output_path (str): CSV file the scored rows are written to
+    chunksize (int): Rows held in memory at a time
+
+    Returns:
+    int: Number of users scored
+    """
+    rows = 0
+    for i, scored in enumerate(iter_scored_chunks(path, chunksize)):
+        scored.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(scored)
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python nutrition.py USERS.csv|USERS.parquet SCORED.csv")
+    rows = score_file(sys.argv[1], sys.argv[2])
+    print(f"Scored {rows} users into {sys.argv[2]}")
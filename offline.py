@@ -0,0 +1,196 @@
+# offline.py
+import threading
+import time
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+from data import get_default_food_items
+from allergens import diet_unsafe_items
+from recipe_model import Recipe, Ingredient, Timings, Nutrition
+
+# A complete plan must be on screen within this many seconds
+PLAN_SLA_SECONDS = 3.0
+# Share of the SLA the catalog request may use before falling back
+CATALOG_SHARE = 0.5
+# Time kept back at the end of the SLA for solving and rendering
+RENDER_MARGIN_SECONDS = 0.3
+# Time a request that missed the SLA may keep running in the background to
+# fill the cache for the next rerun
+BACKGROUND_SECONDS = 20.0
+
+# Dish style and (prep, cook) minutes for template recipes
+MEAL_STYLES = {
+    "breakfast": ("Power Bowl", 10, 15),
+    "lunch": ("Thali", 15, 30),
+    "dinner": ("Masala Plate", 15, 30),
+    "snack": ("Chaat", 5, 5),
+}
+
+# Step templates keyed by a word found in the catalog group name, in cooking order
+GROUP_STEPS = [
+    ("grain", "Cook the {items} until tender, then keep warm."),
+    ("starch", "Cook the {items} until tender, then keep warm."),
+    ("legume", "Simmer the {items} with turmeric and a pinch of salt until soft."),
+    ("protein", "Heat a little oil, splutter cumin seeds, add ginger-garlic paste and cook the {items} with turmeric and garam masala until done."),
+    ("vegetable", "Saute the {items} with mustard seeds and curry leaves for 4-5 minutes."),
+    ("fruit", "Wash and slice the {items}."),
+    ("dairy", "Serve the {items} on the side."),
+    ("fat", "Add the {items} just before serving."),
+    ("nut", "Sprinkle the {items} over the top."),
+    ("sauce", "Finish with the {items}."),
+    ("condiment", "Finish with the {items}."),
+    ("herb", "Season with the {items}."),
+]
+
+TEMPLATE_TIPS = [
+    "Dry-roast whole spices for 30 seconds before grinding for a deeper aroma.",
+    "A squeeze of lemon and fresh coriander at the end brightens any Indian dish.",
+]
+
+TEMPLATE_VARIATIONS = [
+    "Swap the main ingredient for chana or rajma for a different protein.",
+    "Add a pinch of chaat masala for a tangier, street-style finish.",
+]
+
+
+def _label(item):
+    return item.replace("_", " ").replace("-", " ")
+
+
+def _plural(unit, quantity):
+    """`unit` as written after `quantity`: "1 serving", "2 servings", "0.5 servings" """
+    return unit if quantity == 1 else f"{unit}s"
+
+
+def _catalog_index(catalog):
+    """Map item -> (group, calories) for a catalog"""
+    index = {}
+    for group, foods in (catalog or {}).items():
+        for item, calories in foods.items():
+            index.setdefault(item, (group, calories))
+    return index
+
+
+def compose_recipe(food_items, meal_type, name, catalog=None, household=None, servings=None):
+    """
+    Build a recipe from the selected items with fixed rules, no LLM involved
+
+    Parameters:
+    food_items (list): Items chosen by the solver
+    meal_type (str): 'breakfast', 'lunch', 'dinner' or 'snack'
+    name (str): User's name for personalization
+    catalog (dict): The catalog the items came from, used for groups and calories
+    household (tuple): Optional (member_name, portion_multiplier) pairs
+    servings (tuple): Serving size of each food item, one each by default
+
+    Returns:
+    dict: {"recipe": Recipe}, the same shape generate_recipe returns
+    """
+    index = _catalog_index(catalog)
+    portions = dict(zip(food_items, servings or [1] * len(food_items)))
+    style, prep, cook = MEAL_STYLES.get(meal_type, MEAL_STYLES["dinner"])
+    hero = max(food_items, key=lambda item: index.get(item, ("", 0))[1], default=meal_type)
+
+    steps = ["Gather and wash all ingredients; chop anything that needs cooking into bite-sized pieces."]
+    used = set()
+    for keyword, template in GROUP_STEPS:
+        items = [item for item in food_items
+                 if item not in used and keyword in index.get(item, ("",))[0].lower()]
+        if items:
+            steps.append(template.format(items=", ".join(_label(item) for item in items)))
+            used.update(items)
+    leftover = [item for item in food_items if item not in used]
+    if leftover:
+        steps.append(f"Prepare the {', '.join(_label(item) for item in leftover)} and add to the plate.")
+    steps.append("Plate everything together, garnish with fresh coriander and enjoy warm.")
+
+    people = 1
+    portion_guide = []
+    if household:
+        people = len(household)
+        portion_guide = [f"{member}: {scale:.2f} {_plural('portion', scale)}" for member, scale in household]
+
+    calories = sum(index[item][1] * portions[item] for item in food_items if item in index)
+    recipe = Recipe(
+        title=f"{_label(hero).title()} {style}",
+        introduction=f"Hi {name}! Here is a quick {meal_type} built from your planned ingredients.",
+        timings=Timings(prep, cook),
+        servings=people,
+        ingredients=[Ingredient(_label(item), people * portions[item], _plural("serving", people * portions[item]))
+                     for item in food_items],
+        steps=steps,
+        nutrition=Nutrition(calories=round(calories) or None),
+        tips=list(TEMPLATE_TIPS),
+        variations=list(TEMPLATE_VARIATIONS),
+        portion_guide=portion_guide,
+    )
+    return {"recipe": recipe}
+
+
+def compose_recipes_batch(meals, name, catalogs=None, household=None):
+    """Template recipes for every meal slot; `catalogs` maps slot name -> catalog"""
+    catalogs = catalogs or {}
+    return {
+        slot: compose_recipe(food_items, meal_type, name, catalogs.get(slot), household, servings)
+        for slot, (meal_type, food_items, servings) in meals.items()
+    }
+
+
+def default_catalogs(meal_types, dietary_preferences=None):
+    """Local catalogs for each meal type, without the items the dietary preferences rule out"""
+    catalogs = {}
+    for meal_type in meal_types:
+        food_groups = get_default_food_items(meal_type)
+        ruled_out = diet_unsafe_items([item for foods in food_groups.values() for item in foods], dietary_preferences)
+        catalogs[meal_type] = {
+            group: {item: calories for item, calories in foods.items() if item not in ruled_out}
+            for group, foods in food_groups.items()
+        }
+        catalogs[meal_type] = {group: foods for group, foods in catalogs[meal_type].items() if foods}
+    return catalogs
+
+
+def fill_missing_recipes(recipes, meals, name, catalogs=None, household=None):
+    """Replace failed recipes with template ones so every tab has content"""
+    filled = dict(recipes)
+    for slot, (meal_type, food_items, servings) in meals.items():
+        if "recipe" not in filled.get(slot, {}):
+            filled[slot] = compose_recipe(food_items, meal_type, name, (catalogs or {}).get(slot), household, servings)
+    return filled
+
+
+def run_with_deadline(fn, timeout, fallback, *args, **kwargs):
+    """
+    Run `fn` in a worker thread and give up after `timeout` seconds
+
+    A call that misses the deadline keeps running in the background, so a
+    cached function still fills its cache for the next rerun. Give `fn` its
+    own, longer deadline (see background_deadline) for that: one that ends
+    with `timeout` stops the request just as the fallback is shown.
+
+    Returns:
+    tuple: (result, degraded) - `fallback()` and True if fn failed or was too slow
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["value"] = fn(*args, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+    thread.join(max(timeout, 0))
+    if "value" in outcome:
+        return outcome["value"], False
+    return fallback(), True
+
+
+def remaining(deadline):
+    """Seconds left before a time.monotonic() deadline"""
+    return deadline - time.monotonic()
+
+
+def background_deadline():
+    """time.monotonic() deadline for a request allowed to finish after the SLA"""
+    return time.monotonic() + BACKGROUND_SECONDS
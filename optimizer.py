@@ -0,0 +1,612 @@
+# optimizer.py
+from functools import lru_cache
+import numpy as np
+
+# Allowed share of the daily calorie target for each meal, as (low, high).
+# The midpoint of each band is the nominal split used for display and tie-breaks.
+MEAL_BANDS = {
+    "breakfast": (0.25, 0.35),
+    "lunch": (0.35, 0.45),
+    "dinner": (0.25, 0.35),
+}
+
+# How far (as a share of the day) a meal may drift from its configured share
+SHARE_TOLERANCE = 0.05
+
+# Items one meal may take from each catalog group, as (min, max), keyed by a
+# word found in the group name; the first match wins. Keeps plans balanced,
+# e.g. one or two proteins and never a plate of condiments.
+GROUP_LIMITS = [
+    ("protein", 1, 2),
+    ("grain", 1, 2),
+    ("starch", 1, 2),
+    ("vegetable", 1, 3),
+    ("legume", 0, 2),
+    ("fruit", 0, 2),
+    ("dairy", 0, 2),
+    ("fat", 0, 1),
+    ("nut", 0, 1),
+    ("seed", 0, 1),
+    ("sauce", 0, 1),
+    ("condiment", 0, 1),
+    ("herb", 0, 2),
+    ("spice", 0, 2),
+    ("beverage", 0, 1),
+    ("other", 0, 1),
+]
+DEFAULT_GROUP_LIMITS = (0, 2)
+# Meal types with their own (limits, default) instead: a snack needs no
+# particular group and takes at most one item from each
+MEAL_TYPE_GROUP_LIMITS = {"snack": ([], (0, 1))}
+
+# Re-solves solve_varied may spend per meal on plates that repeat an
+# earlier meal of the same type
+MAX_VARIETY_EDITS = 2
+
+# Servings the solver may give one item, in order of preference. An item
+# counts once towards its group's limits whatever its serving, so a meal can
+# reach its target with a double helping instead of another item.
+SERVING_SIZES = (1, 1.5, 2, 0.5)
+
+# Default meal slots for days with 3 to 6 meals: (name, meal_type, share of daily calories)
+MEAL_SLOT_PRESETS = {
+    3: [("Breakfast", "breakfast", 0.30), ("Lunch", "lunch", 0.40), ("Dinner", "dinner", 0.30)],
+    4: [("Breakfast", "breakfast", 0.25), ("Lunch", "lunch", 0.35), ("Evening Snack", "snack", 0.10),
+        ("Dinner", "dinner", 0.30)],
+    5: [("Breakfast", "breakfast", 0.25), ("Morning Snack", "snack", 0.10), ("Lunch", "lunch", 0.30),
+        ("Evening Snack", "snack", 0.10), ("Dinner", "dinner", 0.25)],
+    6: [("Breakfast", "breakfast", 0.20), ("Morning Snack", "snack", 0.10), ("Lunch", "lunch", 0.30),
+        ("Evening Snack", "snack", 0.10), ("Dinner", "dinner", 0.20), ("Bedtime Snack", "snack", 0.10)],
+}
+
+
+def meal_targets(daily_calories, bands=None):
+    """Nominal calorie target per meal (midpoint of each band)"""
+    bands = bands or MEAL_BANDS
+    return {meal: round(daily_calories * (low + high) / 2, 2) for meal, (low, high) in bands.items()}
+
+
+def default_meal_slots(meals_per_day):
+    """Return the preset meal slots for a day with the given number of meals"""
+    return [
+        {"name": name, "meal_type": meal_type, "share": share}
+        for name, meal_type, share in MEAL_SLOT_PRESETS[meals_per_day]
+    ]
+
+
+def slot_bands(meal_slots, tolerance=SHARE_TOLERANCE):
+    """
+    Turn user-defined meal shares into calorie bands for solve_day.
+
+    Shares are normalised to sum to one, so percentages that do not add up
+    to 100 still describe the intended split.
+
+    Parameters:
+    meal_slots (list): Dicts with 'name' and 'share' keys
+    tolerance (float): Allowed drift from each share, as a share of the day
+
+    Returns:
+    dict: Slot name -> (low, high) share of the daily target
+    """
+    total = sum(slot["share"] for slot in meal_slots) or 1
+    bands = {}
+    for slot in meal_slots:
+        share = slot["share"] / total
+        bands[slot["name"]] = (max(share - tolerance, 0), share + tolerance)
+    return bands
+
+
+def group_limits(group, meal_type=None):
+    """(min, max) number of items a meal of `meal_type` may take from a catalog group"""
+    limits, default = MEAL_TYPE_GROUP_LIMITS.get(meal_type, (GROUP_LIMITS, DEFAULT_GROUP_LIMITS))
+    name = group.lower()
+    for keyword, low, high in limits:
+        if keyword in name:
+            return low, high
+    return default
+
+
+def serving_calories(calories, servings):
+    """Calories of `servings` helpings of an item, rounded like the catalog"""
+    return int(round(calories * servings))
+
+
+@lru_cache(maxsize=None)
+def _servings(calories):
+    """(servings, calories) options of one item, dropping sizes that round to nothing or repeat"""
+    options = {}
+    for servings in SERVING_SIZES:
+        options.setdefault(serving_calories(calories, servings), servings)
+    return tuple((servings, portion) for portion, servings in options.items() if portion > 0)
+
+
+def _flatten(food_groups, skip=()):
+    """Flatten a catalog into (calories, item, group) triples, dropping non-positive values and `skip`"""
+    items = []
+    for group, foods in food_groups.items():
+        for item, calories in foods.items():
+            calories = int(round(float(calories)))
+            if calories > 0 and item not in skip:
+                items.append((calories, item, group))
+    return items
+
+
+def _forced_items(catalogs, meals, include, exclude):
+    """
+    Place each must-include item in the first meal whose catalog offers it.
+
+    Returns:
+    list: (calories, item, group) triples per meal, in `meals` order
+    """
+    placed = set(exclude)
+    forced = []
+    for meal in meals:
+        items = []
+        for group, foods in catalogs[meal].items():
+            for item, calories in foods.items():
+                if item in include and item not in placed:
+                    items.append((max(int(round(float(calories))), 0), item, group))
+                    placed.add(item)
+        forced.append(items)
+    return forced
+
+
+def _blocks(items, forced, meal_type=None):
+    """
+    Runs of consecutive items from the same group, as (start, end, min, max).
+
+    Must-include items count towards their group's limits.
+    """
+    taken = {}
+    for _, _, group in forced:
+        taken[group] = taken.get(group, 0) + 1
+    blocks = []
+    start = 0
+    for i in range(1, len(items) + 1):
+        if i == len(items) or items[i][2] != items[start][2]:
+            group = items[start][2]
+            low, high = group_limits(group, meal_type)
+            blocks.append((start, i, min(max(low - taken.get(group, 0), 0), i - start),
+                           max(high - taken.get(group, 0), 0)))
+            start = i
+    return blocks
+
+
+def _reversed_blocks(blocks, n_items):
+    """The same blocks for the items in reverse order"""
+    return [(n_items - end, n_items - start, low, high) for start, end, low, high in reversed(blocks)]
+
+
+def _grouped_reachability(items, blocks, width):
+    """
+    Subset-sum reachability with a per-group count dimension.
+
+    Every serving size of an item is one choice of the same step, so the
+    count grows by one whichever is taken and the catalog is not copied per
+    serving. The step ORs a shifted view of all count rows at once.
+
+    Returns:
+    numpy.ndarray: bool array of shape (n_items + 1, max_count + 1, width + 1)
+    where [i, c, s] is True if calories s can be reached with the first i
+    items taking c items from the group of item i - 1, every earlier group
+    within its limits
+    """
+    counts = max((high for _, _, _, high in blocks), default=0) + 1
+    table = np.zeros((len(items) + 1, counts, width + 1), dtype=bool)
+    table[0, 0, 0] = True
+    for b, (start, end, low, high) in enumerate(blocks):
+        current = np.zeros((counts, width + 1), dtype=bool)
+        current[0] = _entry(table, blocks, b)
+        for i in range(start, end):
+            following = current.copy()
+            for _, portion in _servings(items[i][0]):
+                if portion <= width:
+                    following[1:, portion:] |= current[:-1, :width + 1 - portion]
+            following[high + 1:] = False
+            table[i + 1] = current = following
+    return table
+
+
+def _entry(table, blocks, b):
+    """Sums reachable when block b starts, with every earlier group within its limits"""
+    if b == 0:
+        return table[0, 0]
+    _, end, low, high = blocks[b - 1]
+    return table[end, low:high + 1].any(axis=0)
+
+
+def _backtrack(table, items, blocks, calories, block=None, position=None, count=None):
+    """
+    Recover (item, servings) pairs that sum exactly to `calories` from a
+    grouped reachability table, starting after the last block, or inside
+    `block` after `position` items with `count` of them taken from that
+    block's group
+    """
+    selected_items = []
+    if block is None:
+        block = len(blocks)
+    else:
+        calories = _walk_block(table, items, blocks, block, position, count, calories, selected_items)
+    for b in range(block - 1, -1, -1):
+        _, end, low, high = blocks[b]
+        count = low + int(np.flatnonzero(table[end, low:high + 1, calories])[0])
+        calories = _walk_block(table, items, blocks, b, end, count, calories, selected_items)
+    return selected_items
+
+
+def _walk_block(table, items, blocks, block, position, count, calories, selected_items):
+    """Walk back through one block to its start, collecting chosen items; returns the calories left"""
+    for i in range(position, blocks[block][0], -1):
+        before = _side(table, blocks, block, i - 1)
+        if before[count, calories]:
+            continue
+        cal, item, _ = items[i - 1]
+        servings, portion = next((servings, portion) for servings, portion in _servings(cal)
+                                 if portion <= calories and before[count - 1, calories - portion])
+        selected_items.append((item, servings))
+        calories -= portion
+        count -= 1
+    return calories
+
+
+def _meal_tables(items, forced, width, meal_type=None):
+    """Group blocks plus the prefix reachability table for one meal's free items"""
+    blocks = _blocks(items, forced, meal_type)
+    prefix = _grouped_reachability(items, blocks, width)
+    offset = sum(cal for cal, _, _ in forced)
+    if not _shifted(_entry(prefix, blocks, len(blocks)), offset, width).any():
+        # The group minimums cannot be met within the calorie range, so this
+        # meal keeps only the maximums
+        blocks = [(start, end, 0, high) for start, end, _, high in blocks]
+        prefix = _grouped_reachability(items, blocks, width)
+    return blocks, prefix
+
+
+def _shifted(reachable, offset, width):
+    """Reachable sums once `offset` calories of must-include items are on the plate"""
+    final = np.zeros(width + 1, dtype=bool)
+    if offset <= width:
+        final[offset:] = reachable[:width + 1 - offset]
+    return final
+
+
+def prepare_day(daily_calories, catalogs, bands=None, include=None, exclude=None, meal_types=None):
+    """
+    Build the DP state for a day: per meal, the free items, their group
+    limits and their forward (prefix) and backward (suffix) reachability
+    tables.
+
+    Keeping both directions lets resolve_day answer "the same day without
+    this item" or "with this item forced in" by joining the two tables
+    around the item, instead of running the DP over the catalog again.
+    Suffix tables are only needed for such edits, so a meal's is built the
+    first time one of its items is edited. Arguments are as for solve_day.
+
+    Returns:
+    dict: State for solve_prepared and resolve_day
+    """
+    bands = bands or MEAL_BANDS
+    meals = list(catalogs)
+    meal_types = meal_types or {}
+    target = int(round(daily_calories))
+
+    lows = np.array([int(target * bands[meal][0]) for meal in meals])
+    highs = np.array([int(target * bands[meal][1]) for meal in meals])
+
+    exclude = set(exclude or ())
+    forced = _forced_items(catalogs, meals, set(include or ()), exclude)
+    offsets = [sum(cal for cal, _, _ in items) for items in forced]
+    width = int(max([*highs, *offsets], default=0))
+
+    state = {
+        "target": target, "meals": meals, "lows": lows, "highs": highs, "nominal": (lows + highs) / 2,
+        "width": width, "forced": forced, "portions": [{} for _ in meals],
+        "meal_types": [meal_types.get(meal, meal) for meal in meals],
+        "items": [_flatten(catalogs[meal], exclude | {item for _, item, _ in items}) for meal, items in zip(meals, forced)],
+        "blocks": [None] * len(meals), "prefix": [None] * len(meals), "suffix": [None] * len(meals),
+    }
+    for m in range(len(meals)):
+        _ensure_tables(state, m)
+    return state
+
+
+def _ensure_width(state):
+    """Widen every table if must-include items added by hand exceed the calorie range"""
+    needed = max((sum(cal for cal, _, _ in items) for items in state["forced"]), default=0)
+    if needed > state["width"]:
+        state["width"] = needed
+        for key in ("blocks", "prefix", "suffix"):
+            state[key] = [None] * len(state["meals"])
+
+
+def _ensure_tables(state, m):
+    """Build the tables of a meal that is new or was changed by resolve_day, once they are needed"""
+    if state["prefix"][m] is None:
+        state["blocks"][m], state["prefix"][m] = _meal_tables(state["items"][m], state["forced"][m], state["width"],
+                                                              state["meal_types"][m])
+        state["suffix"][m] = None
+
+
+def _ensure_suffix(state, m):
+    """Build the suffix table of a meal the first time one of its items is edited"""
+    _ensure_tables(state, m)
+    if state["suffix"][m] is None:
+        items = state["items"][m]
+        state["suffix"][m] = _grouped_reachability(
+            items[::-1], _reversed_blocks(state["blocks"][m], len(items)), state["width"])
+
+
+def _final(state, m):
+    """Sums meal m can reach with its free items on top of its must-include items"""
+    offset = sum(cal for cal, _, _ in state["forced"][m])
+    blocks = state["blocks"][m]
+    return _shifted(_entry(state["prefix"][m], blocks, len(blocks)), offset, state["width"])
+
+
+def _allocate(state, finals):
+    """
+    Split the day's calories between meals given each meal's reachable sums.
+
+    Each meal may land anywhere inside its calorie band; the combination whose
+    total is closest to the daily target wins. Among equally close totals the
+    per-meal allocation nearest the nominal split is preferred.
+
+    Returns:
+    list: Calories per meal, in state["meals"] order
+    """
+    lows, highs, nominal = state["lows"], state["highs"], state["nominal"]
+    finals = np.array(finals)
+
+    # Reachable sums per meal, restricted to the meal's band. A meal whose
+    # catalog cannot land in the band may take anything up to its ceiling,
+    # or its smallest reachable total if even that exceeds it.
+    sums = np.arange(state["width"] + 1)
+    allowed = finals & (sums >= lows[:, None]) & (sums <= highs[:, None])
+    for m in range(len(finals)):
+        if not allowed[m].any():
+            allowed[m] = finals[m] & (sums <= highs[m])
+        if not allowed[m].any():
+            allowed[m, np.flatnonzero(finals[m])[0]] = True
+
+    # Day totals reachable by the first k meals, built by convolving the
+    # per-meal reachability vectors.
+    prefix = [allowed[0]]
+    for m in range(1, len(finals)):
+        combined = np.convolve(prefix[-1].astype(np.int64), allowed[m].astype(np.int64))
+        prefix.append(combined > 0)
+
+    totals = np.flatnonzero(prefix[-1])
+    total = int(totals[np.argmin(np.abs(totals - state["target"]))])
+
+    # Walk back from the last meal, giving each meal the feasible share
+    # closest to its nominal target.
+    shares = [0] * len(finals)
+    for m in range(len(finals) - 1, 0, -1):
+        candidates = np.flatnonzero(allowed[m][:total + 1])
+        rest = total - candidates
+        rest_ok = rest < len(prefix[m - 1])
+        candidates = candidates[rest_ok]
+        candidates = candidates[prefix[m - 1][rest[rest_ok]]]
+        share = int(candidates[np.argmin(np.abs(candidates - nominal[m]))])
+        shares[m] = share
+        total -= share
+    shares[0] = total
+    return shares
+
+
+def _plated(forced, chosen, share, portions=None):
+    """
+    (selected_items, total_calories, servings) from must-include items and chosen (item, servings) pairs
+
+    Must-include items are single servings unless `portions` gives their size.
+    """
+    servings = {item: (portions or {}).get(item, 1) for _, item, _ in forced}
+    servings.update(chosen)
+    return list(servings), share, servings
+
+
+def _meal_plan(state, m, share):
+    """(selected_items, total_calories, servings) for meal m landing on `share` calories"""
+    forced = state["forced"][m]
+    chosen = _backtrack(state["prefix"][m], state["items"][m], state["blocks"][m],
+                        share - sum(cal for cal, _, _ in forced))
+    return _plated(forced, chosen, share, state["portions"][m])
+
+
+def solve_prepared(state):
+    """Solve a day from its prepare_day state; see solve_day"""
+    if not state["meals"]:
+        return {}
+    _ensure_width(state)
+    for m in range(len(state["meals"])):
+        _ensure_tables(state, m)
+    shares = _allocate(state, [_final(state, m) for m in range(len(state["meals"]))])
+    return {meal: _meal_plan(state, m, shares[m]) for m, meal in enumerate(state["meals"])}
+
+
+def _side(table, blocks, block, position):
+    """Rows of a table just before `position`, inside `block`: count -> reachable sums"""
+    if position == blocks[block][0]:
+        rows = np.zeros_like(table[position])
+        rows[0] = _entry(table, blocks, block)
+        return rows
+    return table[position]
+
+
+def _copy_state(state):
+    return {**state, **{key: list(state[key]) for key in ("items", "forced", "portions", "blocks", "prefix", "suffix")}}
+
+
+def resolve_day(state, meal, item, keep=False):
+    """
+    Re-solve a day after one item of one meal is left out, or forced in.
+
+    The meal's reachable sums without the item come from joining its prefix
+    table before the item with its suffix table after it, for every split
+    of the item's group count that stays within the group's limits. The
+    answer costs a few convolutions of calorie-sized vectors rather than a
+    DP over the catalog. The returned state has that meal's tables marked
+    stale; they are rebuilt only if a later edit needs them.
+
+    Parameters:
+    state (dict): From prepare_day, or a previous resolve_day
+    meal (str): Meal name the edit applies to
+    item (str): Item to leave out, or to force in when keep is True
+    keep (bool): Force the item in instead of leaving it out
+
+    Returns:
+    tuple: (plan, state) with the plan as returned by solve_day
+    """
+    meals = state["meals"]
+    m = meals.index(meal)
+    _ensure_width(state)
+    for other in range(len(meals)):
+        _ensure_tables(state, other)
+    _ensure_suffix(state, m)
+    width = state["width"]
+    items, forced, blocks = state["items"][m], state["forced"][m], state["blocks"][m]
+    names = [name for _, name, _ in items]
+
+    new_state = _copy_state(state)
+    if item in names:
+        k = names.index(item)
+        new_state["items"][m] = items[:k] + items[k + 1:]
+        new_state["forced"][m] = forced + [items[k]] if keep else forced
+    elif not keep and item in [name for _, name, _ in forced]:
+        new_state["forced"][m] = [triple for triple in forced if triple[1] != item]
+    else:
+        raise ValueError(f"{item} is not available in {meal}")
+    new_state["blocks"][m] = new_state["prefix"][m] = new_state["suffix"][m] = None
+    if item not in names or blocks != _blocks(items, forced, state["meal_types"][m]):
+        # A must-include item left out, or a meal whose group minimums were
+        # dropped and may hold again after the edit: rebuild this meal
+        return solve_prepared(new_state), new_state
+
+    # Sums reachable without item k: one part from the items before it, the
+    # rest from the items after it, with the group count split between them
+    prefix, suffix = state["prefix"][m], state["suffix"][m]
+    block = next(b for b, (start, end, _, _) in enumerate(blocks) if start <= k < end)
+    reversed_blocks = _reversed_blocks(blocks, len(items))
+    reverse_block = len(blocks) - 1 - block
+    before = _side(prefix, blocks, block, k)
+    after = _side(suffix, reversed_blocks, reverse_block, len(items) - 1 - k)
+    _, _, low, high = blocks[block]
+    pairs = [(c1, c2) for c1 in range(len(before)) for c2 in range(len(after))
+             if low <= c1 + c2 + keep <= high and before[c1].any() and after[c2].any()]
+    joined = np.zeros(width + 1, dtype=bool)
+    for c1, c2 in pairs:
+        joined |= np.convolve(before[c1].astype(np.int64), after[c2].astype(np.int64))[:width + 1] > 0
+    if not joined.any():
+        # The group limits cannot be met without the item: rebuild this meal
+        return solve_prepared(new_state), new_state
+
+    finals = [_final(state, other) for other in range(len(meals))]
+    offset = sum(cal for cal, _, _ in new_state["forced"][m])
+    finals[m] = _shifted(joined, offset, width)
+    if not finals[m].any():
+        # The forced-in item does not fit the calorie range: widen and rebuild
+        return solve_prepared(new_state), new_state
+    shares = _allocate(new_state, finals)
+
+    # Split the meal's free calories between the two sides of the item
+    free = shares[m] - offset
+    for c1, c2 in pairs:
+        splits = np.flatnonzero(before[c1][:free + 1] & after[c2][free - np.arange(free + 1)])
+        if len(splits):
+            split = int(splits[0])
+            break
+    chosen = (_backtrack(prefix, items, blocks, split, block, k, c1)
+              + _backtrack(suffix, items[::-1], reversed_blocks, free - split, reverse_block, len(items) - 1 - k, c2))
+    plan = {meals[other]: _meal_plan(state, other, shares[other]) for other in range(len(meals)) if other != m}
+    plan[meal] = _plated(new_state["forced"][m], chosen, shares[m], new_state["portions"][m])
+    return {name: plan[name] for name in meals}, new_state
+
+
+def keep_swap(state, meal, item, replacement, servings=1):
+    """
+    State after `item` was swapped for `replacement` by hand, without solving
+
+    Later resolve_day calls keep `servings` of the replacement in and the
+    item out; the meal's tables are rebuilt when next needed.
+    """
+    m = state["meals"].index(meal)
+    items, forced = state["items"][m], state["forced"][m]
+    calories, _, group = next(triple for triple in items + forced if triple[1] == replacement)
+    kept = (serving_calories(calories, servings), replacement, group)
+    state = _copy_state(state)
+    state["portions"][m] = {**state["portions"][m], replacement: servings}
+    state["items"][m] = [triple for triple in items if triple[1] not in (item, replacement)]
+    state["forced"][m] = [triple for triple in forced if triple[1] not in (item, replacement)] + [kept]
+    state["blocks"][m] = state["prefix"][m] = state["suffix"][m] = None
+    return state
+
+
+def _repeated_meal(state, plan):
+    """First meal whose items are exactly those of an earlier meal of the same type, or None"""
+    seen = {}
+    for meal, meal_type in zip(state["meals"], state["meal_types"]):
+        items = frozenset(plan[meal][0])
+        if items in seen.setdefault(meal_type, set()):
+            return meal
+        seen[meal_type].add(items)
+    return None
+
+
+def solve_varied(state):
+    """
+    Solve a day from its prepare_day state, then re-solve meals that repeat
+    an earlier meal of the same type (e.g. two identical snacks) without
+    their largest free item, up to MAX_VARIETY_EDITS times per meal
+
+    Returns:
+    tuple: (plan, state), the state as resolve_day leaves it so later edits build on it
+    """
+    plan = solve_prepared(state)
+    edits = {}
+    meal = _repeated_meal(state, plan)
+    while meal and edits.get(meal, 0) < MAX_VARIETY_EDITS:
+        edits[meal] = edits.get(meal, 0) + 1
+        m = state["meals"].index(meal)
+        free = {item: calories for calories, item, _ in state["items"][m]}
+        candidates = [item for item in plan[meal][0] if item in free]
+        if not candidates:
+            break
+        plan, state = resolve_day(state, meal, max(candidates, key=free.get))
+        meal = _repeated_meal(state, plan)
+    return plan, state
+
+
+def solve_day(daily_calories, catalogs, bands=None, include=None, exclude=None, meal_types=None):
+    """
+    Jointly choose items for every meal of the day in one pass.
+
+    Each meal may land anywhere inside its calorie band; the combination whose
+    total is closest to the daily target wins. Among equally close totals the
+    per-meal allocation nearest the nominal split is preferred. Every meal
+    takes between the minimum and maximum number of items GROUP_LIMITS
+    allows from each catalog group, e.g. one or two proteins and at least
+    one vegetable (snacks use MEAL_TYPE_GROUP_LIMITS: no minimums, one
+    item per group); a meal whose groups cannot meet the minimums within
+    its calorie range keeps only the maximums. Meals of the same type are
+    re-solved a few times to avoid repeating each other's exact items,
+    see solve_varied; a repeat is kept if the edits run out.
+
+    Each chosen item gets one of SERVING_SIZES, so a meal can land on its
+    target with fewer items. Must-include items are placed in the first
+    meal that offers them as a single serving and count towards its band
+    and group limits; excluded items are never chosen. Exclusion wins if an
+    item is in both.
+
+    Parameters:
+    daily_calories (float): Daily calorie target
+    catalogs (dict): Meal name -> food groups, one meal type's catalog from get_food_items_batch
+    bands (dict): Meal name -> (low, high) share of the daily target, defaults to MEAL_BANDS
+    include (iterable): Items that must be part of the day
+    exclude (iterable): Items that must not be chosen
+    meal_types (dict): Meal name -> 'breakfast', 'lunch', 'dinner' or 'snack'; defaults to the meal name
+
+    Returns:
+    dict: Meal name -> (selected_items, total_calories, servings), in
+    catalog order, with servings mapping each selected item to its serving size
+    """
+    return solve_varied(prepare_day(daily_calories, catalogs, bands, include, exclude, meal_types))[0]
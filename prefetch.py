@@ -0,0 +1,119 @@
+# prefetch.py
+import threading
+from llm import background
+from data import get_food_items_batch
+from recipe import get_recipes_batch
+
+# Inputs must stay unchanged this long before a speculative fetch starts
+SETTLE_SECONDS = 1.5
+# Head start the recipe on screen gets before the next meal's is fetched
+RECIPE_PREFETCH_DELAY_SECONDS = 0.5
+
+
+def _cache_key(meal_types, dietary_preferences, allergies):
+    return tuple(meal_types), tuple(dietary_preferences or ()), tuple(allergies or ())
+
+
+def _fetch(job):
+    """Warm the shared catalog cache unless the job went stale while waiting"""
+    if job["cancelled"].is_set():
+        return
+    meal_types, dietary_preferences, allergies = job["key"]
+    try:
+        with background():
+            job["catalogs"] = get_food_items_batch(list(meal_types), list(dietary_preferences), list(allergies))
+    except Exception:
+        # The real request on "Generate" will surface any error
+        pass
+    job["done"].set()
+
+
+def cancel_prefetch(session_state):
+    """Stop a pending speculative fetch for this session, if any"""
+    job = session_state.get("catalog_prefetch")
+    if job:
+        job["cancelled"].set()
+        job["timer"].cancel()
+
+
+def prefetch_catalogs(session_state, meal_types, dietary_preferences=None, allergies=None):
+    """
+    Speculatively fetch catalogs as soon as the inputs they depend on settle
+
+    get_food_items_batch depends only on meal types, preferences and allergies,
+    which users set long before clicking "Generate Meal Plan". Once those
+    inputs have been stable for SETTLE_SECONDS the fetch runs in the
+    background and lands in the shared st.cache_data cache, so the real call
+    is a cache hit (or waits on the in-flight computation instead of
+    starting a second request). Changing the inputs cancels a fetch that has
+    not started yet; one already in flight finishes and is simply unused.
+
+    Parameters:
+    session_state: st.session_state, where the pending job is kept
+    meal_types (list): Meal types of the configured meal slots
+    dietary_preferences (list): Selected dietary preferences
+    allergies (list): Allergies the catalog must avoid
+    """
+    key = _cache_key(meal_types, dietary_preferences, allergies)
+    job = session_state.get("catalog_prefetch")
+    if job and job["key"] == key:
+        return
+
+    cancel_prefetch(session_state)
+    job = {"key": key, "cancelled": threading.Event(), "done": threading.Event()}
+    job["timer"] = threading.Timer(SETTLE_SECONDS, _fetch, args=(job,))
+    job["timer"].daemon = True
+    job["timer"].start()
+    session_state["catalog_prefetch"] = job
+
+
+def prefetched_catalogs(session_state, meal_types, dietary_preferences=None, allergies=None):
+    """Catalogs the background fetch already got for these inputs, or None; never waits"""
+    job = session_state.get("catalog_prefetch")
+    if job and job["key"] == _cache_key(meal_types, dietary_preferences, allergies):
+        return job.get("catalogs")
+    return None
+
+
+def _fetch_recipe(job):
+    """Warm the shared recipe cache unless the user moved on to another plan"""
+    if job["cancelled"].is_set():
+        return
+    try:
+        with background():
+            get_recipes_batch(*job["args"])
+    except Exception:
+        # Opening the meal makes the real request and surfaces any error
+        pass
+    job["done"].set()
+
+
+def prefetch_recipe(session_state, meal, name, dietary_preferences=None, allergies=None, household=None):
+    """
+    Generate the recipe of the meal the user is likely to open next, in the background
+    
+    Only one meal is fetched at a time, after the visible recipe has had a
+    head start, so meals nobody opens cost nothing and the foreground
+    request never waits behind a prefetch. The arguments must match the
+    ones the plan view passes to get_recipes_batch to produce a cache hit.
+    
+    Parameters:
+    session_state: st.session_state, where the pending job is kept
+    meal (dict): {slot name: (meal_type, food_items, servings)} for one meal
+    name (str): User's name
+    dietary_preferences (list): Selected dietary preferences
+    allergies (list): Allergies the recipe must avoid
+    household (tuple): Optional (member_name, portion_multiplier) pairs
+    """
+    args = (meal, name, dietary_preferences, allergies, household)
+    job = session_state.get("recipe_prefetch")
+    if job and job["args"] == args:
+        return
+    if job:
+        job["cancelled"].set()
+        job["timer"].cancel()
+    job = {"args": args, "cancelled": threading.Event(), "done": threading.Event()}
+    job["timer"] = threading.Timer(RECIPE_PREFETCH_DELAY_SECONDS, _fetch_recipe, args=(job,))
+    job["timer"].daemon = True
+    job["timer"].start()
+    session_state["recipe_prefetch"] = job
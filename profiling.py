@@ -0,0 +1,120 @@
+# profiling.py
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+import zipfile
+from contextlib import contextmanager, nullcontext
+
+# Query parameter that turns profiling on for a session: ?profile=1
+PROFILE_QUERY_PARAM = "profile"
+# Stages reported in the summary, in the order they run
+PROFILE_STAGES = ["add_bg_and_styling", "get_food_items_batch", "solve_day", "get_recipes_batch", "create_meal_plan_markdown"]
+
+# tracemalloc is process-wide, so it stays on while any session is profiling
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+# Profiler for the script run executing on the current thread, if any
+_active = threading.local()
+
+
+def profiling_requested(query_params, session_state):
+    """True if this session asked for profiling by query parameter or admin toggle"""
+    value = str(query_params.get(PROFILE_QUERY_PARAM, "")).lower()
+    return value in ("1", "true", "yes") or bool(session_state.get("admin_profiling"))
+
+
+class RunProfiler:
+    """cProfile + tracemalloc around one script run, with named stage timings"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.stages = {}
+        self.started = None
+        self.elapsed = None
+        self.snapshot = None
+
+    def start(self):
+        global _tracing_sessions
+        with _tracing_lock:
+            if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _tracing_sessions += 1
+        _active.profiler = self
+        self.started = time.perf_counter()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile at a time per process; another
+            # session is already profiling, so keep only stages and memory
+            self.profiler = None
+        return self
+
+    def stop(self):
+        global _tracing_sessions
+        if self.profiler:
+            self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started
+        _active.profiler = None
+        self.snapshot = tracemalloc.take_snapshot()
+        with _tracing_lock:
+            _tracing_sessions -= 1
+            if _tracing_sessions == 0:
+                tracemalloc.stop()
+        return self
+
+    @contextmanager
+    def stage(self, name):
+        """Record wall time and traced memory growth for a named stage"""
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            record = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "allocated_kb": 0.0, "peak_kb": 0.0})
+            record["calls"] += 1
+            record["seconds"] += time.perf_counter() - started
+            record["allocated_kb"] += (current - before) / 1024
+            record["peak_kb"] = max(record["peak_kb"], peak / 1024)
+
+    def summary(self):
+        """Plain-text report: stage timings, top functions and top allocations"""
+        out = io.StringIO()
+        out.write(f"Script run: {self.elapsed * 1000:.1f} ms\n\n")
+        out.write(f"{'stage':<28}{'calls':>6}{'ms':>12}{'alloc KB':>12}{'peak KB':>12}\n")
+        for name in PROFILE_STAGES + sorted(set(self.stages) - set(PROFILE_STAGES)):
+            record = self.stages.get(name)
+            if record:
+                out.write(f"{name:<28}{record['calls']:>6}{record['seconds'] * 1000:>12.1f}"
+                          f"{record['allocated_kb']:>12.1f}{record['peak_kb']:>12.1f}\n")
+            else:
+                out.write(f"{name:<28}{'-':>6}\n")
+
+        if self.profiler:
+            out.write("\nTop functions by cumulative time (script thread):\n")
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(30)
+
+        out.write("\nTop allocations by line:\n")
+        for stat in self.snapshot.statistics("lineno")[:15]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def artifact(self):
+        """Zip of the raw pstats file (for snakeviz/pstats) and the summary"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            if self.profiler:
+                # Same format pstats.Stats.dump_stats writes, without a temp file
+                archive.writestr("profile.pstats", marshal.dumps(pstats.Stats(self.profiler).stats))
+            archive.writestr("summary.txt", self.summary())
+        return buffer.getvalue()
+
+
+def profile_stage(name):
+    """Time a stage of the current script run; a no-op unless it is being profiled"""
+    profiler = getattr(_active, "profiler", None)
+    return profiler.stage(name) if profiler else nullcontext()
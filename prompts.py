@@ -0,0 +1,128 @@
+# prompts.py
+from recipe_model import RECIPE_SUMMARY_JSON_FORMAT, RECIPE_DETAILS_JSON_FORMAT
+
+pre_prompt_b = "I've got a basket full of breakfast items, and I'm looking for a mouthwatering morning meal. Your challenge: create a breakfast dish using most of these ingredients and give it a catchy name. Remember, breakfast sets the tone for the day! Here's the list of items for your culinary adventure:"
+
+pre_breakfast = "For breakfast, we have a delightful dish called 'Morning Glory Omelette.' Imagine a fluffy omelette packed with earthy mushrooms, colorful bell peppers, and a sprinkle of cheese. It's a sunrise on a plate, fueling you with energy and flavor. Now, it's your turn to craft a breakfast masterpiece from the list provided."
+
+example_response_b = "This is just an example to inspire you: How about 'Sunny Start Oatmeal'? It's a hearty bowl of oatmeal infused with sweet bananas, a drizzle of honey, and a sprinkle of crunchy almonds. This nutritious breakfast will keep you fueled and focused all morning long."
+
+pre_prompt_l = "I've got a basket full of lunch ingredients, and I'm craving a delicious midday meal. Your task is to whip up a lunch dish using most of these ingredients and give it a mouthwatering name. Lunch should be both satisfying and nourishing. Here's the list of items for your culinary creativity:"
+
+pre_lunch = "For lunch, we have an enticing creation called 'Garden Fresh Quinoa Salad.' Picture a vibrant salad with crisp greens, juicy tomatoes, and protein-packed quinoa. It's a burst of flavors and a healthy choice. Now, it's your turn to craft a lunch masterpiece from the list provided."
+
+example_response_l = "This is just an example to inspire you: How about 'Mediterranean Delight Bowl'? It features a medley of roasted veggies, creamy hummus, and tender grilled chicken, all served over a bed of fluffy couscous. A Mediterranean vacation for your taste buds, packed with nutrients and flavor."
+
+pre_prompt_d = "I've got a basket full of dinner ingredients, and I'm in the mood for a delectable evening meal. Your mission: create a dinner dish using most of these ingredients and give it an enticing name. Dinner should be a culinary adventure. Here's the list of items for your evening extravaganza:"
+
+pre_dinner = "For dinner, we present a sensational dish known as 'Savory Spinach-Stuffed Chicken.' Envision tender chicken breasts stuffed with vibrant spinach and juicy tomatoes. It's a taste sensation that'll leave you craving more. Now, it's your turn to craft a dinner masterpiece from the list provided."
+
+example_response_d = "This is just an example to inspire you: How about 'Mediterranean Seafood Feast'? It's a symphony of flavors with succulent grilled seafood, roasted vegetables, and a zesty lemon herb sauce. A Mediterranean culinary journey on your plate, and it's as nutritious as it is delicious."
+
+end_text = "Remember, staying hydrated is essential for a fantastic day. Keep a glass of water nearby to stay refreshed. Get ready to savor this culinary experience, and may your taste buds dance with joy. Enjoy your meals and have a fantastic day!"
+
+negative_prompt = "Please exclude cooking instructions and limit your response to 100-150 words. I'm interested in the meal name, its ingredients, a brief description, and some nutritional insights. Let your culinary expertise shine!"
+
+# Static instructions below are sent as the system instruction of each
+# request; per-call prompts carry only the user's name, the meals'
+# categories or ingredients, preferences and allergies.
+
+# Categories requested from Gemini for each kind of meal
+MEAL_CATEGORIES = {
+    "breakfast": """
+        - protein (eggs, yogurt, etc.)
+        - whole_grains (bread, oatmeal, etc.)
+        - fruits
+        - vegetables
+        - healthy_fats (nuts, seeds, etc.)
+        - dairy or dairy alternatives
+        - other (condiments, beverages, etc.)
+        """,
+    "lunch": """
+        - protein (chicken, fish, tofu, etc.)
+        - whole_grains (rice, quinoa, etc.)
+        - vegetables
+        - legumes
+        - healthy_fats
+        - dairy_or_dairy_alternatives
+        - additional_toppings_condiments
+        """,
+    "dinner": """
+        - proteins
+        - grains_and_starches
+        - vegetables
+        - legumes
+        - healthy_fats
+        - dairy_or_dairy_alternatives
+        - sauces_and_condiments
+        - herbs_and_spices
+        """,
+    "snack": """
+        - fruits
+        - nuts_and_seeds
+        - dairy_or_dairy_alternatives
+        - whole_grain_snacks (crackers, roasted chana, etc.)
+        - vegetables_and_dips
+        - beverages
+        """,
+}
+
+# The system instruction counts towards every request's input tokens, so it
+# holds only the rules each request needs; categories go in the user turn for
+# the requested meals alone (see catalog_categories)
+CATALOG_SYSTEM_INSTRUCTION = """
+    Generate realistic food databases for meal planning, one JSON object per meal:
+    {"category_name": {"food_item": calories_as_integer, ...}, ...}
+    For several meals, return one JSON object keyed by meal.
+    Respect the dietary preferences and allergies given. Return ONLY the JSON.
+    """
+
+
+def catalog_categories(meal_types):
+    """One line of categories per meal type for a catalog prompt; other meals use the dinner categories"""
+    lines = []
+    for meal_type in meal_types:
+        categories = MEAL_CATEGORIES.get(meal_type, MEAL_CATEGORIES["dinner"])
+        names = [line.strip().lstrip("- ") for line in categories.splitlines() if line.strip()]
+        lines.append(f'\n    - {meal_type}: {"; ".join(names)}')
+    return "".join(lines)
+
+
+RECIPE_SUMMARY_SYSTEM_INSTRUCTION = f"""
+    You plan personalized Indian cuisine recipes for a meal planner. This first pass
+    is shown while the plan loads, so keep it short: no cooking steps yet.
+    
+    Generate each recipe summary as a JSON object with this structure:
+    {RECIPE_SUMMARY_JSON_FORMAT}
+    - title: A creative, appetizing name for the Indian dish, suited to the meal it is for
+    - introduction: One sentence welcoming the person named in the request and explaining the dish's benefits
+    - servings: How many people this recipe serves
+    - ingredients: Every ingredient with an exact numeric quantity and unit (including those from the given list and necessary Indian spices/extras)
+    - nutrition: Calories, protein, carbs, fat and fiber per serving as numbers
+    - portion_guide: Leave empty unless a household portion guide is requested
+    
+    When recipes for several meals are requested, return one JSON object keyed by the
+    meal names given exactly, each value being a recipe summary.
+    
+    Make the recipe realistic and executable by a home cook.
+    Ensure all main ingredients from the provided list are used in the recipe.
+    An item listed as "N servings of X" uses N standard servings of X; size quantities and nutrition to match.
+    Respect the dietary preferences and avoid the allergens given in each request.
+    """
+
+RECIPE_DETAILS_SYSTEM_INSTRUCTION = f"""
+    You write the cooking details for an Indian cuisine recipe whose title and
+    ingredients are already decided.
+    
+    Return a JSON object with this structure:
+    {RECIPE_DETAILS_JSON_FORMAT}
+    - prep_minutes, cook_minutes, total_minutes: Realistic times in minutes
+    - steps: Step-by-step cooking directions using exactly the given ingredients, be specific about Indian cooking techniques
+    - tips: 2-3 practical tips to enhance the recipe or make preparation easier with authentic Indian flavors
+    - variations: 1-2 simple variations to modify the recipe for different tastes while maintaining Indian character
+    
+    Keep the total cooking time under 15 minutes for snacks, under 40 minutes for breakfast, under 60 minutes for lunch/dinner.
+    Respect the dietary preferences and avoid the allergens given in each request.
+    Use traditional Indian spices and cooking methods where appropriate.
+    Use a warm, encouraging tone throughout.
+    """
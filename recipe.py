@@ -2,20 +2,80 @@
 import google.generativeai as genai
 import streamlit as st
 import json
+from data import parse_json_response
+from llm import generate_content, DeadlineExceeded
+from recipe_model import Recipe
+from allergens import scan_allergens, allergen_warning
+from prompts import RECIPE_SUMMARY_SYSTEM_INSTRUCTION, RECIPE_DETAILS_SYSTEM_INSTRUCTION
 
-def generate_recipe(food_items, meal_type, name, dietary_preferences=None, allergies=None):
+# Ask Gemini for JSON rather than free-form markdown
+JSON_RESPONSE = {"response_mime_type": "application/json"}
+
+# Output token budgets: the summary shown with the plan is kept short, the
+# cooking details are only generated when the user opens them
+SUMMARY_MAX_OUTPUT_TOKENS = 512
+DETAILS_MAX_OUTPUT_TOKENS = 1024
+
+
+def _json_config(max_output_tokens):
+    return {**JSON_RESPONSE, "max_output_tokens": max_output_tokens}
+
+def _ingredient_names(data):
+    """Ingredient names of a recipe, or of every recipe of a batch keyed by meal"""
+    if not isinstance(data, dict):
+        return []
+    if isinstance(data.get("ingredients"), list):
+        return [ingredient.get("name", "") if isinstance(ingredient, dict) else str(ingredient)
+                for ingredient in data["ingredients"]]
+    return [name for value in data.values() for name in _ingredient_names(value)]
+
+def _allergen_safe(allergies):
+    """
+    Answer check for generate_content: valid JSON whose ingredients contain
+    none of the allergies, so a recipe that uses one is regenerated by the
+    next model. Only ingredient names are scanned; prose such as "made
+    without eggs" is left to the warning shown with the recipe.
+    """
+    def validate(text):
+        data = parse_json_response(text)
+        found = scan_allergens("\n".join(_ingredient_names(data)), allergies)
+        if found:
+            raise ValueError(f"Recipe uses allergens ({allergen_warning(found)})")
+    return validate
+
+def _portioned(food_items, servings=None):
+    """Items as listed in a prompt, with serving sizes other than one, e.g. "oatmeal, 2 servings of milk" """
+    servings = servings or [1] * len(food_items)
+    return ", ".join(item if size == 1 else f"{size:g} servings of {item}" for item, size in zip(food_items, servings))
+
+def parse_recipe(text, meal_type):
+    """Parse a model response into a Recipe, keeping raw text if it is not valid JSON"""
+    try:
+        data = parse_json_response(text)
+        if isinstance(data, dict):
+            return Recipe.from_dict(data)
+    except json.JSONDecodeError:
+        pass
+    return Recipe(f"Your {meal_type.title()} Recipe", introduction=text.strip())
+
+def generate_recipe(food_items, meal_type, name, dietary_preferences=None, allergies=None, deadline=None, servings=None):
     """
-    Generate a detailed recipe based on selected food items using Gemini API
+    Generate a recipe summary (title, ingredients, nutrition) for the selected food items using Gemini API
+    
+    Cooking steps, tips and variations are left out; generate_recipe_details
+    adds them when the user asks for them.
     
     Parameters:
     food_items (list): List of food items to include in the recipe
-    meal_type (str): 'breakfast', 'lunch', or 'dinner'
+    meal_type (str): 'breakfast', 'lunch', 'dinner' or 'snack'
     name (str): User's name for personalization
     dietary_preferences (list): List of dietary preferences (vegan, vegetarian, etc.)
     allergies (list): List of food allergies to avoid
+    deadline (float): Optional time.monotonic() value the answer is needed by
+    servings (tuple): Serving size of each food item chosen by the solver, one each by default
     
     Returns:
-    dict: Recipe with title, ingredients, instructions, nutrition info and tips
+    dict: {"recipe": Recipe} on success, {"error": message} otherwise
     """
     
     # Get API key from Streamlit secrets
@@ -26,51 +86,164 @@ def generate_recipe(food_items, meal_type, name, dietary_preferences=None, aller
         st.error(f"Error configuring Gemini API: {e}")
         return {"error": "Failed to configure API"}
     
-    # Construct prompt for Gemini
+    # Construct prompt for Gemini; formats and style rules are in the system instruction
     preferences_str = ", ".join(dietary_preferences) if dietary_preferences else "none"
     allergies_str = ", ".join(allergies) if allergies else "none"
-    food_items_str = ", ".join(food_items)
+    food_items_str = _portioned(food_items, servings)
     
     prompt = f"""
-    Create a detailed, personalized Indian cuisine recipe for {name} using the following ingredients for their {meal_type}:
+    Create a personalized Indian cuisine recipe summary for {name} using the following ingredients for their {meal_type}:
     {food_items_str}
     
     Consider these dietary preferences: {preferences_str}
     Avoid these allergens: {allergies_str}
-    
-    Generate a comprehensive recipe with these sections:
-    1. Recipe Title: Create a creative, appetizing name for this Indian {meal_type} dish
-    2. Introduction: A brief, personalized welcome message to {name} explaining the dish's benefits
-    3. Preparation Time: Realistic prep time, cooking time, and total time in minutes
-    4. Servings: How many people this recipe serves
-    5. Ingredients: Detailed list with exact measurements for all ingredients (including those from the list above and add necessary Indian spices/extras)
-    6. Instructions: Step-by-step cooking directions in numbered format, be specific about Indian cooking techniques
-    7. Nutrition Information: Include calories, protein, carbs, fat, fiber per serving
-    8. Chef's Tips: 2-3 practical tips to enhance the recipe or make preparation easier with authentic Indian flavors
-    9. Variations: 1-2 simple variations to modify the recipe for different tastes while maintaining Indian character
-    
-    Format your response in markdown with clear section headers.
-    Make the recipe realistic and executable by a home cook.
-    Keep the total cooking time under 40 minutes for breakfast, under 60 minutes for lunch/dinner.
-    Ensure all main ingredients from the provided list are used in the recipe.
-    Use traditional Indian spices and cooking methods where appropriate.
-    Use a warm, encouraging tone throughout.
     """
     
     try:
         # Call Gemini API
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
+        response = generate_content(prompt, "recipe", deadline, _json_config(SUMMARY_MAX_OUTPUT_TOKENS),
+                                    system_instruction=RECIPE_SUMMARY_SYSTEM_INSTRUCTION, validate=_allergen_safe(allergies))
         
         if hasattr(response, 'text'):
-            return {"recipe": response.text}
+            return {"recipe": parse_recipe(response.text, meal_type)}
         else:
             return {"error": "Failed to generate recipe"}
+    except DeadlineExceeded:
+        # Let the caller fall back without caching the error
+        raise
     except Exception as e:
         st.error(f"Error calling Gemini API: {e}")
         return {"error": f"Failed to generate recipe: {str(e)}"}
 
+def generate_recipes_batch(meals, name, dietary_preferences=None, allergies=None, household=None, deadline=None):
+    """
+    Generate recipe summaries for several meals of a day with one Gemini API call
+    
+    Parameters:
+    meals (dict): Meal slot name -> (meal_type, food_items, servings), servings aligned with food_items
+    name (str): User's name for personalization
+    dietary_preferences (list): List of dietary preferences (vegan, vegetarian, etc.)
+    allergies (list): List of food allergies to avoid
+    household (tuple): Optional (member_name, portion_multiplier) pairs when one dish feeds a household
+    deadline (float): Optional time.monotonic() value the answers are needed by
+    
+    Returns:
+    dict: Meal slot name -> recipe dict, as returned by generate_recipe
+    """
+    try:
+        api_key = st.secrets["gemini_apikey"]
+        genai.configure(api_key=api_key)
+    except Exception as e:
+        st.error(f"Error configuring Gemini API: {e}")
+        return {slot: {"error": "Failed to configure API"} for slot in meals}
+    
+    preferences_str = ", ".join(dietary_preferences) if dietary_preferences else "none"
+    allergies_str = ", ".join(allergies) if allergies else "none"
+    
+    prompt = f"""
+    Create {len(meals)} personalized Indian cuisine recipe summaries for {name}, one for each of these meals:
+    """
+    for slot, (meal_type, food_items, servings) in meals.items():
+        prompt += f"""
+    - {slot} ({meal_type}): {_portioned(food_items, servings)}"""
+    
+    prompt += f"""
+    
+    Consider these dietary preferences: {preferences_str}
+    Avoid these allergens: {allergies_str}
+    """
+    
+    if household:
+        portions = ", ".join(f"{member} {scale:.2f}x" for member, scale in household)
+        total = sum(scale for _, scale in household)
+        prompt += f"""
+    Each dish is cooked once for a household of {len(household)}. Give ingredient quantities for the
+    whole household ({total:.2f} standard servings) and fill portion_guide with one entry per person: {portions}.
+    """
+    
+    recipes = {}
+    try:
+        response = generate_content(prompt, "recipe", deadline, _json_config(SUMMARY_MAX_OUTPUT_TOKENS * len(meals)),
+                                    system_instruction=RECIPE_SUMMARY_SYSTEM_INSTRUCTION, validate=_allergen_safe(allergies))
+        if hasattr(response, 'text'):
+            batch = parse_json_response(response.text)
+            for slot in meals:
+                if isinstance(batch, dict) and isinstance(batch.get(slot), dict):
+                    recipes[slot] = {"recipe": Recipe.from_dict(batch[slot])}
+    except json.JSONDecodeError as e:
+        st.error(f"Error parsing Gemini response: {e}")
+    except DeadlineExceeded:
+        # Let the caller fall back without caching the error
+        raise
+    except Exception as e:
+        st.error(f"Error calling Gemini API: {e}")
+        return {slot: {"error": f"Failed to generate recipe: {str(e)}"} for slot in meals}
+    
+    # Fall back to individual requests for anything the batch missed
+    for slot, (meal_type, food_items, servings) in meals.items():
+        if slot not in recipes:
+            recipes[slot] = generate_recipe(food_items, meal_type, name, dietary_preferences, allergies, deadline, servings)
+    return {slot: recipes[slot] for slot in meals}
+
+def generate_recipe_details(title, ingredients, meal_type, name, dietary_preferences=None, allergies=None, deadline=None):
+    """
+    Generate the cooking steps, timings, tips and variations for a recipe summary
+    
+    Parameters:
+    title (str): Recipe title from the summary
+    ingredients (tuple): Ingredient lines from the summary, e.g. "0.5 cup rolled oats"
+    meal_type (str): 'breakfast', 'lunch', 'dinner' or 'snack'
+    name (str): User's name for personalization
+    dietary_preferences (list): List of dietary preferences (vegan, vegetarian, etc.)
+    allergies (list): List of food allergies to avoid
+    deadline (float): Optional time.monotonic() value the answer is needed by
+    
+    Returns:
+    dict: {"details": data} for Recipe.add_details on success, {"error": message} otherwise
+    """
+    try:
+        api_key = st.secrets["gemini_apikey"]
+        genai.configure(api_key=api_key)
+    except Exception as e:
+        st.error(f"Error configuring Gemini API: {e}")
+        return {"error": "Failed to configure API"}
+    
+    preferences_str = ", ".join(dietary_preferences) if dietary_preferences else "none"
+    allergies_str = ", ".join(allergies) if allergies else "none"
+    ingredients_str = "\n    ".join(f"- {ingredient}" for ingredient in ingredients)
+    
+    prompt = f"""
+    Write the cooking details for "{title}", a {meal_type} for {name}, made with:
+    {ingredients_str}
+    
+    Consider these dietary preferences: {preferences_str}
+    Avoid these allergens: {allergies_str}
+    """
+    
+    try:
+        response = generate_content(prompt, "recipe_details", deadline, _json_config(DETAILS_MAX_OUTPUT_TOKENS),
+                                    system_instruction=RECIPE_DETAILS_SYSTEM_INSTRUCTION, validate=_allergen_safe(allergies))
+        if hasattr(response, 'text'):
+            details = parse_json_response(response.text)
+            if isinstance(details, dict):
+                return {"details": details}
+        return {"error": "Failed to generate the cooking steps"}
+    except json.JSONDecodeError as e:
+        st.error(f"Error parsing Gemini response: {e}")
+        return {"error": "Failed to generate the cooking steps"}
+    except DeadlineExceeded:
+        # Let the caller fall back without caching the error
+        raise
+    except Exception as e:
+        st.error(f"Error calling Gemini API: {e}")
+        return {"error": f"Failed to generate the cooking steps: {str(e)}"}
+
+@st.cache_data(ttl=3600)  # Cache for 1 hour
+def get_recipes_batch(meals, name, dietary_preferences=None, allergies=None, household=None, _deadline=None):
+    """Cached wrapper for generate_recipes_batch (the deadline is not part of the cache key)"""
+    return generate_recipes_batch(meals, name, dietary_preferences, allergies, household, _deadline)
+
 @st.cache_data(ttl=3600)  # Cache for 1 hour
-def get_recipe(food_items, meal_type, name, dietary_preferences=None, allergies=None):
-    """Cached wrapper for generate_recipe"""
-    return generate_recipe(food_items, meal_type, name, dietary_preferences, allergies)
\ No newline at end of file
+def get_recipe_details(title, ingredients, meal_type, name, dietary_preferences=None, allergies=None, _deadline=None):
+    """Cached wrapper for generate_recipe_details (the deadline is not part of the cache key)"""
+    return generate_recipe_details(title, ingredients, meal_type, name, dietary_preferences, allergies, _deadline)
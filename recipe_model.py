@@ -0,0 +1,239 @@
+# recipe_model.py
+from fractions import Fraction
+
+# JSON shape requested from the model for each recipe
+RECIPE_JSON_FORMAT = """
+    {
+        "title": "Creative, appetizing recipe name",
+        "introduction": "Brief, personalized welcome explaining the dish's benefits",
+        "prep_minutes": 10,
+        "cook_minutes": 20,
+        "total_minutes": 30,
+        "servings": 1,
+        "ingredients": [{"name": "rolled oats", "quantity": 0.5, "unit": "cup"}, ...],
+        "steps": ["First step", "Second step", ...],
+        "nutrition": {"calories": 450, "protein_g": 20, "carbs_g": 55, "fat_g": 15, "fiber_g": 8},
+        "tips": ["Chef's tip", ...],
+        "variations": ["Variation", ...],
+        "portion_guide": ["Person: portion", ...]
+    }
+"""
+
+# Recipes are generated in two phases: a short summary for the plan, and the
+# cooking details only once the user asks for them
+RECIPE_SUMMARY_JSON_FORMAT = """
+    {
+        "title": "Creative, appetizing recipe name",
+        "introduction": "One-sentence personalized welcome",
+        "servings": 1,
+        "ingredients": [{"name": "rolled oats", "quantity": 0.5, "unit": "cup"}, ...],
+        "nutrition": {"calories": 450, "protein_g": 20, "carbs_g": 55, "fat_g": 15, "fiber_g": 8},
+        "portion_guide": ["Person: portion", ...]
+    }
+"""
+
+RECIPE_DETAILS_JSON_FORMAT = """
+    {
+        "prep_minutes": 10,
+        "cook_minutes": 20,
+        "total_minutes": 30,
+        "steps": ["First step", "Second step", ...],
+        "tips": ["Chef's tip", ...],
+        "variations": ["Variation", ...]
+    }
+"""
+
+
+def _number(value):
+    """Best-effort number from model output ("1/2", "2 1/2", "150 kcal", 3)"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        parts = str(value).split()
+        return float(sum(Fraction(part) for part in parts[:2] if part[0].isdigit()) or Fraction(parts[0]))
+    except (ValueError, ZeroDivisionError, IndexError):
+        return None
+
+
+def _format_number(value):
+    """Render 2.0 as '2' and 0.5 as '0.5'"""
+    if value is None:
+        return ""
+    return f"{value:g}"
+
+
+def _text_list(value):
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [str(item) for item in value or [] if str(item).strip()]
+
+
+class Ingredient:
+    __slots__ = ("name", "quantity", "unit")
+
+    def __init__(self, name, quantity=None, unit=""):
+        self.name = name
+        self.quantity = quantity
+        self.unit = unit
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, str):
+            return cls(data)
+        return cls(str(data.get("name", "")), _number(data.get("quantity")), str(data.get("unit") or ""))
+
+    def to_dict(self):
+        return {"name": self.name, "quantity": self.quantity, "unit": self.unit}
+
+    def to_markdown(self):
+        return " ".join(part for part in (_format_number(self.quantity), self.unit, self.name) if part)
+
+
+class Timings:
+    __slots__ = ("prep_minutes", "cook_minutes", "total_minutes")
+
+    def __init__(self, prep_minutes=None, cook_minutes=None, total_minutes=None):
+        self.prep_minutes = prep_minutes
+        self.cook_minutes = cook_minutes
+        if total_minutes is None and prep_minutes is not None and cook_minutes is not None:
+            total_minutes = prep_minutes + cook_minutes
+        self.total_minutes = total_minutes
+
+    def to_dict(self):
+        return {"prep_minutes": self.prep_minutes, "cook_minutes": self.cook_minutes, "total_minutes": self.total_minutes}
+
+    def to_markdown(self):
+        parts = []
+        for label, minutes in (("Prep", self.prep_minutes), ("Cook", self.cook_minutes), ("Total", self.total_minutes)):
+            if minutes is not None:
+                parts.append(f"**{label}:** {_format_number(minutes)} min")
+        return " | ".join(parts)
+
+
+class Nutrition:
+    __slots__ = ("calories", "protein_g", "carbs_g", "fat_g", "fiber_g")
+
+    def __init__(self, calories=None, protein_g=None, carbs_g=None, fat_g=None, fiber_g=None):
+        self.calories = calories
+        self.protein_g = protein_g
+        self.carbs_g = carbs_g
+        self.fat_g = fat_g
+        self.fiber_g = fiber_g
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(*(_number(data.get(field)) for field in cls.__slots__))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def to_markdown(self):
+        rows = [
+            ("Calories", self.calories, "kcal"), ("Protein", self.protein_g, "g"), ("Carbs", self.carbs_g, "g"),
+            ("Fat", self.fat_g, "g"), ("Fiber", self.fiber_g, "g"),
+        ]
+        return "\n".join(f"- {label}: {_format_number(value)} {unit}" for label, value, unit in rows if value is not None)
+
+
+class Recipe:
+    """A recipe parsed once from the model's JSON and rendered from its fields"""
+
+    __slots__ = ("title", "introduction", "timings", "servings", "ingredients", "steps", "nutrition",
+                 "tips", "variations", "portion_guide")
+
+    def __init__(self, title, introduction="", timings=None, servings=None, ingredients=None, steps=None,
+                 nutrition=None, tips=None, variations=None, portion_guide=None):
+        self.title = title
+        self.introduction = introduction
+        self.timings = timings or Timings()
+        self.servings = servings
+        self.ingredients = ingredients or []
+        self.steps = steps or []
+        self.nutrition = nutrition or Nutrition()
+        self.tips = tips or []
+        self.variations = variations or []
+        self.portion_guide = portion_guide or []
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Recipe from the JSON object described by RECIPE_JSON_FORMAT"""
+        return cls(
+            title=str(data.get("title") or "Your Recipe"),
+            introduction=str(data.get("introduction") or ""),
+            timings=Timings(_number(data.get("prep_minutes")), _number(data.get("cook_minutes")),
+                            _number(data.get("total_minutes"))),
+            servings=_number(data.get("servings")),
+            ingredients=[Ingredient.from_dict(item) for item in data.get("ingredients") or []],
+            steps=_text_list(data.get("steps")),
+            nutrition=Nutrition.from_dict(data.get("nutrition")),
+            tips=_text_list(data.get("tips")),
+            variations=_text_list(data.get("variations")),
+            portion_guide=_text_list(data.get("portion_guide")),
+        )
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "introduction": self.introduction,
+            **self.timings.to_dict(),
+            "servings": self.servings,
+            "ingredients": [ingredient.to_dict() for ingredient in self.ingredients],
+            "steps": list(self.steps),
+            "nutrition": self.nutrition.to_dict(),
+            "tips": list(self.tips),
+            "variations": list(self.variations),
+            "portion_guide": list(self.portion_guide),
+        }
+
+    @property
+    def has_details(self):
+        """False until the cooking steps of a summary-only recipe are filled in"""
+        return bool(self.steps)
+
+    def add_details(self, data):
+        """Fill in timings, steps, tips and variations from RECIPE_DETAILS_JSON_FORMAT data"""
+        self.timings = Timings(_number(data.get("prep_minutes")), _number(data.get("cook_minutes")),
+                               _number(data.get("total_minutes")))
+        self.steps = _text_list(data.get("steps"))
+        self.tips = _text_list(data.get("tips"))
+        self.variations = _text_list(data.get("variations"))
+        return self
+
+    def summary_markdown(self, heading="###"):
+        """Title, introduction, ingredients, nutrition and portions as markdown"""
+        sub = heading + "#"
+        lines = [f"{heading} {self.title}"]
+        if self.introduction:
+            lines += ["", self.introduction]
+        timings = self.timings.to_markdown()
+        if timings or self.servings:
+            servings = f"**Servings:** {_format_number(self.servings)}" if self.servings else ""
+            lines += ["", " | ".join(part for part in (timings, servings) if part)]
+        if self.ingredients:
+            lines += ["", f"{sub} Ingredients"] + [f"- {item.to_markdown()}" for item in self.ingredients]
+        nutrition = self.nutrition.to_markdown()
+        if nutrition:
+            lines += ["", f"{sub} Nutrition (per serving)", nutrition]
+        if self.portion_guide:
+            lines += ["", f"{sub} Portions"] + [f"- {portion}" for portion in self.portion_guide]
+        return "\n".join(lines)
+
+    def details_markdown(self, heading="###"):
+        """Instructions, tips and variations as markdown"""
+        sub = heading + "#"
+        lines = []
+        if self.steps:
+            lines += ["", f"{sub} Instructions"] + [f"{i}. {step}" for i, step in enumerate(self.steps, 1)]
+        if self.tips:
+            lines += ["", f"{sub} Chef's Tips"] + [f"- {tip}" for tip in self.tips]
+        if self.variations:
+            lines += ["", f"{sub} Variations"] + [f"- {variation}" for variation in self.variations]
+        return "\n".join(lines[1:])
+
+    def to_markdown(self, heading="###"):
+        """Render the recipe as markdown; `heading` sets the title level"""
+        details = self.details_markdown(heading)
+        return self.summary_markdown(heading) + ("\n\n" + details if details else "")
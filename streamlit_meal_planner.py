@@ -3,11 +3,27 @@ import pandas as pd
 import google.generativeai as genai
 import random
 import time
-from data import get_food_items
-from recipe import get_recipe
+from data import get_food_items_batch
+from recipe import get_recipes_batch, get_recipe_details
+from nutrition import calculate_bmr
+from household import household_needs, shared_allergies, portion_scales, MAX_HOUSEHOLD_SIZE
+from offline import run_with_deadline, remaining, background_deadline, default_catalogs, compose_recipes_batch, fill_missing_recipes, \
+    PLAN_SLA_SECONDS, CATALOG_SHARE, RENDER_MARGIN_SECONDS
+from prefetch import prefetch_catalogs, prefetch_recipe, prefetched_catalogs
+from ingredients import IngredientIndex, catalog_items, display_name, parse_terms
+from substitution import SubstitutionIndex
+from food_db import open_food_db, normalize_catalog
+from allergens import scan_allergens, unsafe_items, diet_unsafe_items, allergen_warning
+from assets import build_stylesheet
+from history import save_plan, update_plan, list_plans, load_plan, profile_hash, share_plan, load_shared_plan, \
+    visitor_token, user_key
+from llm import configure_anthropic, latency_stats, recent_requests, routing_stats, set_route_model, DEFAULT_MODEL
+from profiling import RunProfiler, profiling_requested, profile_stage
+from optimizer import prepare_day, solve_varied, resolve_day, keep_swap, meal_targets, default_meal_slots, slot_bands, MEAL_SLOT_PRESETS
 from prompts import pre_prompt_b, pre_prompt_l, pre_prompt_d, pre_breakfast, pre_lunch, pre_dinner, end_text, \
     example_response_l, example_response_d, negative_prompt
 import base64
+import sqlite3
 
 # Import required libraries for pip installation at runtimefz
 import subprocess
@@ -26,509 +42,642 @@ GEMINI_API_KEY = st.secrets["gemini_apikey"]
 
 # Configure the Gemini API
 genai.configure(api_key=GEMINI_API_KEY)
+configure_anthropic(ANTHROPIC_API_KEY)
 
 UNITS_CM_TO_IN = 0.393701
 UNITS_KG_TO_LB = 2.20462
 UNITS_LB_TO_KG = 0.453592
 UNITS_IN_TO_CM = 2.54
 
+MEAL_ICONS = {"breakfast": "🍳", "lunch": "🥗", "dinner": "🍲", "snack": "🍎"}
+
+# Stylesheet is minified and hashed once per server process, not on every rerun
+@st.cache_resource
+def load_stylesheet():
+    return build_stylesheet()
+
+
+# Ingredient search index, built once per distinct catalog
+@st.cache_resource
+def load_ingredient_index(items):
+    return IngredientIndex(items)
+
+
+# Calorie-sorted alternatives per food group, built once per distinct catalog
+@st.cache_resource
+def load_substitution_index(food_groups):
+    return SubstitutionIndex(food_groups)
+
+
+# Memory-mapped nutrition table, opened once per process; None without one
+@st.cache_resource
+def load_food_db():
+    try:
+        return open_food_db()
+    except (OSError, ValueError) as e:
+        st.warning(f"Nutrition data is unavailable: {e}")
+        return None
+
+
+# Catalogs with one canonical name per food and known calories, before
+# anything is solved, indexed or cached under their item names
+def canonical_catalogs(catalogs):
+    food_db = load_food_db()
+    if not food_db:
+        return {meal: normalize_catalog(food_groups) for meal, food_groups in catalogs.items()}
+    return {meal: food_db.calibrate(food_db.normalizer.normalize(food_groups)) for meal, food_groups in catalogs.items()}
+
+
 # Function to set background image and styling
 def add_bg_and_styling():
-    st.markdown(
-         f"""
-         <style>
-         .stApp {{
-             background-image: linear-gradient(rgba(0, 0, 0, 0.7), rgba(0, 0, 0, 0.7)), url("https://images.unsplash.com/photo-1498837167922-ddd27525d352?q=80&w=2940&auto=format&fit=crop");
-             background-attachment: fixed;
-             background-size: cover;
-             background-position: center;
-         }}
-         
-         /* Increase overall font size */
-         body, p, li, label, .stTextInput, .stSelectbox, .stNumberInput {{
-             font-size: 18px !important;
-         }}
-         
-         h1 {{
-             font-size: 42px !important;
-         }}
-         
-         h2 {{
-             font-size: 32px !important;
-         }}
-         
-         h3 {{
-             font-size: 26px !important;
-         }}
-         
-         .stSubheader {{
-             font-size: 24px !important;
-         }}
-         
-         /* Card Styling */
-         .card {{
-             background-color: rgba(255, 255, 255, 0.95);
-             border-radius: 15px;
-             padding: 25px;
-             margin-bottom: 25px;
-             box-shadow: 0 6px 12px rgba(0, 0, 0, 0.15);
-             color: #333333;
-         }}
-         
-         /* Section Cards */
-         .section-card {{
-             background-color: rgba(255, 255, 255, 0.95);
-             border-radius: 15px;
-             padding: 20px;
-             margin-bottom: 20px;
-             box-shadow: 0 4px 8px rgba(0, 0, 0, 0.15);
-             border-left: 5px solid #3498db;
-         }}
-         
-         /* Header styling */
-         .main-header {{
-             color: #FFFFFF;
-             text-shadow: 2px 2px 4px #000000;
-             text-align: center;
-             padding: 25px;
-             margin-bottom: 25px;
-             background-color: rgba(0, 0, 0, 0.6);
-             border-radius: 15px;
-         }}
-         
-         /* Tab styling */
-         .tab-content {{
-             background-color: rgba(255, 255, 255, 0.95);
-             border-radius: 15px;
-             padding: 20px;
-             margin-top: 15px;
-             color: #333333;
-         }}
-         
-         .stTabs [data-baseweb="tab-list"] {{
-             gap: 15px;
-         }}
-         
-         .stTabs [data-baseweb="tab"] {{
-             rgb(0 0 0 / 95%) !important
-             border-radius: 8px 8px 0 0;
-             padding: 8px 20px;
-             border: none;
-             font-size: 18px !important;
-         }}
-         
-         .stTabs [aria-selected="true"] {{
-             background-color: rgba(255, 255, 255, 0.95) !important;
-             font-weight: bold;
-         }}
-         
-         /* Input fields styling for better visibility */
-         .stTextInput>div>div>input, .stNumberInput>div>div>input {{
-             background-color: #ffffff !important;
-             color: #000000 !important;
-             font-size: 18px !important;
-             border: 2px solid #3498db !important;
-             padding: 5px 10px !important;
-         }}
-         
-         /* Select and multiselect styling */
-         .stSelectbox>div>div>div, .stMultiSelect>div>div>div {{
-             background-color: #ffffff !important;
-            color: #000000 !important;
-             font-size: 18px !important;
-             border: 2px solid #3498db !important;
-         }}
-         
-         /* Labels for better visibility */
-         .stTextInput label, .stNumberInput label, .stSelectbox label, .stMultiSelect label {{
-             color: #FFFFFF !important;
-             font-weight: bold !important;
-             font-size: 20px !important;
-             text-shadow: 1px 1px 2px #000000;
-             margin-bottom: 8px !important;
-         }}
-         
-         /* Section header */
-         .section-header {{
-             background-color: #7f4545;
-             color: white;
-             padding: 15px;
-             border-radius: 10px;
-             margin-bottom: 20px;
-             font-size: 22px !important;
-             font-weight: bold;
-             text-align: center;
-         }}
-         
-         /* Info boxes */
-         .info-box {{
-             background-color: rgba(52, 152, 219, 0.2);
-             border-left: 5px solid #3498db;
-             padding: 15px;
-             border-radius: 5px;
-             margin: 15px 0;
-             font-size: 20px !important;
-         }}
-         
-         /* Success boxes */
-         .success-box {{
-             background-color: rgba(46, 204, 113, 0.2);
-             border-left: 5px solid #2ecc71;
-             padding: 15px;
-             border-radius: 5px;
-             margin: 15px 0;
-             font-size: 20px !important;
-         }}
-         
-         /* Button styling */
-         .stButton>button {{
-             background-color: #27ae60;
-             color: white;
-             font-weight: bold;
-             font-size: 20px !important;
-             padding: 12px 20px;
-             border-radius: 10px;
-             border: none;
-             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.2);
-             transition: all 0.3s;
-         }}
-         
-         .stButton>button:hover {{
-             background-color: #2ecc71;
-             box-shadow: 0 6px 10px rgba(0, 0, 0, 0.3);
-             transform: translateY(-2px);
-         }}
-         
-         /* Dataframe styling */
-         .dataframe {{
-             background-color: #ffffff !important;
-             color: #333333 !important;
-             font-size: 18px !important;
-         }}
-         
-         /* Radio buttons and checkboxes */
-         .stRadio label, .stCheckbox label {{
-             color: #FFFFFF !important;
-             font-size: 18px !important;
-             text-shadow: 1px 1px 2px #000000;
-         }}
-         
-         /* Expander */
-         .streamlit-expanderHeader {{
-             background-color: rgba(52, 152, 219, 0.2) !important;
-             color: #FFFFFF !important;
-             font-size: 20px !important;
-             font-weight: bold !important;
-             border-radius: 10px !important;
-             padding: 10px !important;
-             text-shadow: 1px 1px 2px #000000;
-         }}
-         
-         .streamlit-expanderContent {{
-             background-color: rgba(255, 255, 255, 0.9) !important;
-             border-radius: 0 0 10px 10px !important;
-             padding: 15px !important;
-             color: #333333 !important;
-         }}
-         </style>
-         """,
-         unsafe_allow_html=True
-     )
+    css, version = load_stylesheet()
+    st.markdown(f'<style id="dietmitra-{version}">{css}</style>', unsafe_allow_html=True)
 
-# Set page configuration
-st.set_page_config(page_title="AI - Meal Planner", page_icon="🍴", layout="wide")
+# The (meal_type, items, servings) a recipe is generated from, keyed by meal slot
+def planned_meal(plan, slot):
+    items, _, servings = plan["day_plan"][slot["name"]]
+    return {slot["name"]: (slot["meal_type"], tuple(items), tuple(servings[item] for item in items))}
 
-# Add background image and styling
-add_bg_and_styling()
 
-# Main header with custom styling
-st.markdown('<div class="main-header"><h1>🍽️ AI Meal Planner</h1></div>', unsafe_allow_html=True)
+# Serving size as shown next to an item, e.g. "1.5x"
+def serving_label(servings):
+    return f"{servings:g}x"
 
-st.markdown(
-    '<div class="card"><p>This is an AI-powered meal planner that creates personalized meal plans with detailed recipes based on your information, dietary preferences, and calorie needs.</p><p><em>Powered by Google Gemini</em></p></div>',
-    unsafe_allow_html=True
-)
 
-# Create two columns for user input and plan display
-col_input, col_output = st.columns([1, 2], gap="large")
+# Protein, carbs and fat of a meal on one line, each amount passed through `emphasis`
+def macro_summary(macros, emphasis="{}"):
+    return " · ".join(f'{nutrient.capitalize()} {emphasis.format(f"{macros[nutrient]:g} g")}'
+                      for nutrient in ("protein", "carbs", "fat"))
 
-with col_input:
-    # Personal Information Card
-   
-    st.markdown('<div class="section-header">Personal Information</div>', unsafe_allow_html=True)
+
+# Wait for one meal's recipe until the deadline, or show a template recipe if the AI
+# is too slow; the request itself goes on in the background to fill the cache
+def load_meal_recipe(plan, slot, deadline):
+    meal = planned_meal(plan, slot)
+    catalogs = {slot["name"]: plan["catalogs"][slot["name"]]}
+    recipes, offline = run_with_deadline(
+        get_recipes_batch, remaining(deadline),
+        lambda: compose_recipes_batch(meal, plan["name"], catalogs, plan["household"]),
+        meal, plan["name"], plan.get("dietary_preferences"), plan.get("allergies"), plan["household"],
+        _deadline=background_deadline()
+    )
+    offline = offline or "error" in recipes[slot["name"]]
+    recipes = fill_missing_recipes(recipes, meal, plan["name"], catalogs, plan["household"])
+    return recipes[slot["name"]], offline
+
+
+# Render a meal plan from its stored pieces; used for new, saved and shared plans.
+# Shared plans are read-only: nothing is generated for meals they have no recipe for.
+# `edit` holds the solver state of a new plan, which lets users swap items.
+# Returns True if recipes were generated that the stored copy does not have yet.
+def render_meal_plan(plan, recipe_deadline=None, shared=False, edit=None):
+    if recipe_deadline is None:
+        recipe_deadline = time.monotonic() + PLAN_SLA_SECONDS - RENDER_MARGIN_SECONDS
+    name = plan["name"]
+    round_bmr = plan["round_bmr"]
+    plan_calories = plan["plan_calories"]
+    meal_slots = plan["meal_slots"]
+    targets = plan["targets"]
+    day_plan = plan["day_plan"]
+    recipes = plan["recipes"]
+    household = plan["household"]
+    member_needs = plan["member_needs"]
+    slot_meal_types = {slot["name"]: slot["meal_type"] for slot in meal_slots}
+    food_db = load_food_db()
+    plan_macros = food_db.plan_macros(day_plan) if food_db else {}
+    
+    if plan["offline"]:
+        st.markdown('<div class="info-box">Our AI chef is taking longer than usual, so this plan uses our offline food list. Generate again in a moment for AI suggestions.</div>', unsafe_allow_html=True)
+    
+    if household:
+        st.markdown(f'<div class="info-box">One shared menu for {len(household)} people, solved for an average of <strong>{plan_calories}</strong> calories per person. Portions are scaled to each person\'s needs.</div>', unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame({
+            "Member": [member for member, _ in household],
+            "Daily Calories": member_needs,
+            "Portion": [f"{scale:.2f}x" for _, scale in household],
+        }), use_container_width=True, hide_index=True)
+    
+    # Only the meal on screen is rendered, so only its recipe is generated
+    st.markdown('<div class="tab-container">', unsafe_allow_html=True)
+    open_name = st.radio(
+        "Meal", [slot["name"] for slot in meal_slots], horizontal=True, label_visibility="collapsed",
+        format_func=lambda slot_name: f'{MEAL_ICONS[slot_meal_types[slot_name]]} {slot_name}',
+        key=f"open_meal_{len(meal_slots)}"
+    )
+    slot = meal_slots[[meal_slot["name"] for meal_slot in meal_slots].index(open_name)]
+    meal_items, meal_calories, meal_servings = day_plan[slot["name"]]
+    
+    recipes_changed = False
+    if slot["name"] in recipes or shared:
+        meal_recipe, recipe_offline = recipes.get(slot["name"]), False
+    else:
+        with st.spinner(f'Creating your {slot["name"].lower()} recipe...'), profile_stage("get_recipes_batch"):
+            meal_recipe, recipe_offline = load_meal_recipe(plan, slot, recipe_deadline)
+        # Offline stand-ins are not kept, so the next visit tries the AI again
+        if not recipe_offline:
+            recipes[slot["name"]] = meal_recipe
+            recipes_changed = True
+    
+    # Warm the cache for the meal most likely to be opened next
+    next_slot = next((meal_slot for meal_slot in meal_slots[meal_slots.index(slot) + 1:] + meal_slots
+                      if meal_slot["name"] not in recipes and meal_slot is not slot), None)
+    if next_slot and not shared:
+        prefetch_recipe(st.session_state, planned_meal(plan, next_slot), name, plan.get("dietary_preferences"),
+                        plan.get("allergies"), household)
+    
+    if recipe_offline:
+        st.markdown('<div class="info-box">Our AI chef is taking longer than usual, so this meal uses a quick offline recipe. Open it again in a moment for an AI recipe.</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="tab-content">', unsafe_allow_html=True)
+    st.subheader(f'{slot["name"]} Plan')
+    col_m1, col_m2 = st.columns([1, 2])
+    
+    with col_m1:
+        st.markdown(f'<div class="info-box">Target Calories: <strong>{targets[slot["name"]]}</strong></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="success-box">Total Calories: <strong>{meal_calories}</strong></div>', unsafe_allow_html=True)
+        if slot["name"] in plan_macros:
+            macros, unknown = plan_macros[slot["name"]]
+            st.markdown(f'<div class="info-box">{macro_summary(macros, "<strong>{}</strong>")}</div>', unsafe_allow_html=True)
+            if unknown:
+                st.caption("No nutrition data for " + ", ".join(map(display_name, unknown)))
+        st.dataframe(pd.DataFrame({
+            f'{slot["name"]} Items': meal_items,
+            "Servings": [serving_label(meal_servings[item]) for item in meal_items],
+        }), use_container_width=True)
+        if edit:
+            with st.expander("✏️ Change items"):
+                # Same-group swaps only update the total; nothing is solved again
+                substitutes = load_substitution_index(plan["catalogs"][slot["name"]])
+                swap_item = st.selectbox("Instead of:", meal_items, index=None, format_func=display_name,
+                                         key=f'swap_item_{slot["name"]}')
+                if swap_item:
+                    meal_index = edit["state"]["meals"].index(slot["name"])
+                    available = {item for _, item, _ in edit["state"]["items"][meal_index] + edit["state"]["forced"][meal_index]}
+                    options = substitutes.alternatives(swap_item, meal_items, meal_calories, targets[slot["name"]],
+                                                       allowed=available, servings=meal_servings[swap_item])
+                    labels = {item: f"{serving_label(size)} {display_name(item)} ({calories} cal, meal total {total})"
+                              for item, size, calories, total in options}
+                    sizes = {item: size for item, size, _, _ in options}
+                    replacement = st.selectbox("Have:", list(labels), index=None, format_func=labels.get,
+                                               key=f'replacement_{slot["name"]}')
+                    if st.button("Swap", key=f'swap_{slot["name"]}', disabled=replacement is None):
+                        edit["day_plan"] = {**edit["day_plan"], slot["name"]: substitutes.swap(
+                            edit["day_plan"][slot["name"]], swap_item, replacement, sizes[replacement])}
+                        edit["state"] = keep_swap(edit["state"], slot["name"], swap_item, replacement, sizes[replacement])
+                        st.rerun()
+                
+                # Leaving out or adding an item re-solves from the kept DP state
+                swap_out = st.selectbox("Leave out:", meal_items, index=None, format_func=display_name,
+                                        key=f'swap_out_{slot["name"]}')
+                free_items = edit["state"]["items"][edit["state"]["meals"].index(slot["name"])]
+                add_in = st.selectbox("Add:", list(dict.fromkeys(item for _, item, _ in free_items if item not in meal_items)),
+                                      index=None, format_func=display_name, key=f'add_in_{slot["name"]}')
+                if st.button("Update meal", key=f'update_meal_{slot["name"]}', disabled=not (swap_out or add_in)):
+                    for item, keep in ((swap_out, False), (add_in, True)):
+                        if item:
+                            edit["day_plan"], edit["state"] = resolve_day(edit["state"], slot["name"], item, keep)
+                    st.rerun()
+        if household:
+            st.dataframe(pd.DataFrame({
+                "Member": [member for member, _ in household],
+                "Calories": [round(meal_calories * scale) for _, scale in household],
+            }), use_container_width=True, hide_index=True)
+    
+    with col_m2:
+        if meal_recipe is None:
+            st.markdown('<div class="info-box">No recipe was generated for this meal before the plan was shared.</div>', unsafe_allow_html=True)
+        elif "error" in meal_recipe:
+            st.error(meal_recipe["error"])
+        else:
+            recipe = meal_recipe["recipe"]
+            # Checked on every render, so cached and saved recipes are covered too;
+            # the introduction is left out so "made without eggs" is not flagged
+            found_allergens = scan_allergens("\n".join([item.name for item in recipe.ingredients] + list(recipe.steps)),
+                                             plan.get("allergies"))
+            if found_allergens:
+                st.warning(f"⚠️ This recipe mentions ingredients you are allergic to ({allergen_warning(found_allergens)}). Please check it before cooking.")
+            st.markdown(recipe.summary_markdown())
+            # Cooking steps are generated only when asked for
+            if (not shared or recipe.has_details) and st.toggle("👩‍🍳 Show cooking steps, tips & variations", key=f'details_{slot["name"]}'):
+                if not recipe.has_details:
+                    with st.spinner("Writing the cooking steps..."):
+                        details = get_recipe_details(
+                            recipe.title, tuple(item.to_markdown() for item in recipe.ingredients),
+                            slot["meal_type"], name, plan.get("dietary_preferences"), plan.get("allergies")
+                        )
+                    if "error" in details:
+                        st.error(details["error"])
+                    else:
+                        recipe.add_details(details["details"])
+                        recipes_changed = True
+                st.markdown(recipe.details_markdown())
+    st.markdown('</div>', unsafe_allow_html=True)
     
-    name = st.text_input("Enter your name", placeholder="e.g., John")
-    age = st.number_input("Enter your age", min_value=1, max_value=120, step=1, value=30)
-    gender = st.radio("Gender:", ["Male", "Female"], horizontal=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Height & Weight Card
+    # Add a download button for the meal plan
    # st.markdown('<div class="section-card">', unsafe_allow_html=True)
-    st.markdown('<div class="section-header">Height & Weight</div>', unsafe_allow_html=True)
+    st.markdown('<div class="success-box" style="text-align: center; font-size: 22px !important;">Thank you for using our AI Meal Planner! Save your plan below.</div>', unsafe_allow_html=True)
     
-    unit_preference = st.radio("Preferred units:", ["Metric (kg, cm)", "Imperial (lb, ft + in)"])
-
-    if unit_preference == "Metric (kg, cm)":
-        col1, col2 = st.columns(2)
-        with col1:
-            weight = st.number_input("Weight (kg)", min_value=1.0, value=70.0)
-        with col2:
-            height = st.number_input("Height (cm)", min_value=1.0, value=170.0)
-    else:
-        col1, col2 = st.columns(2)
-        with col1:
-            weight_lb = st.number_input("Weight (lb)", min_value=1.0, value=154.0)
+    # Create a markdown export of all recipes
+    def create_meal_plan_markdown():
+        plan_md = f"# {name}'s Personalized Meal Plan\n\n"
+        plan_md += f"Daily Calorie Needs: {round_bmr} calories\n\n"
+        if household:
+            plan_md += "Household portions: " + ", ".join(f"{member} {scale:.2f}x" for member, scale in household) + "\n\n"
+        
+        for slot in meal_slots:
+            plan_md += f'## {MEAL_ICONS[slot["meal_type"]]} {slot["name"]}\n'
+            plan_md += f'Target Calories: {targets[slot["name"]]}\n\n'
+            if "recipe" in recipes.get(slot["name"], {}):
+                plan_md += recipes[slot["name"]]["recipe"].to_markdown() + "\n\n"
+            else:
+                items, _, servings = day_plan[slot["name"]]
+                plan_md += "Items: " + ", ".join(f"{item} ({serving_label(servings[item])})" for item in items) + "\n\n"
+            if slot["name"] in plan_macros:
+                plan_md += macro_summary(plan_macros[slot["name"]][0]) + "\n\n"
         
-        # Use columns to align feet and inches inputs next to each other
-        with col2:
-            height_ft = st.number_input("Height (ft)", min_value=0, value=5)
-            height_in = st.number_input("Height (in)", min_value=0.0, max_value=11.0, value=9.0)
-
-        # Convert imperial to metric
-        weight = weight_lb * UNITS_LB_TO_KG
-        height = (height_ft * 12 + height_in) * UNITS_IN_TO_CM
+        return plan_md
+    
+    with profile_stage("create_meal_plan_markdown"):
+        meal_plan_md = create_meal_plan_markdown()
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.download_button(
+            label="📥 Download Meal Plan",
+            data=meal_plan_md,
+            file_name=f"{name}_meal_plan.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
+        # Permalink to a snapshot of the plan as it is now, recipes included
+        if not shared:
+            share_clicked = st.button("🔗 Share this plan", use_container_width=True)
+            st.caption("Anyone with the link sees this plan as it is now, including your name, your allergies "
+                       "and your household members' names.")
+            if share_clicked:
+                try:
+                    share_key = share_plan(plan)
+                    st.code(st.secrets.get("app_url", "").rstrip("/") + f"/?plan={share_key}", language=None)
+                except sqlite3.Error as e:
+                    st.warning(f"Could not create a link for this plan: {e}")
     st.markdown('</div>', unsafe_allow_html=True)
+    return recipes_changed
 
-    # Dietary Preferences Card
-   # st.markdown('<div class="section-card">', unsafe_allow_html=True)
-    st.markdown('<div class="section-header">Dietary Preferences & Allergies</div>', unsafe_allow_html=True)
-    
-    dietary_preferences = st.multiselect(
-        "Select your dietary preferences:",
-        ["Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo", "Gluten-free", "Dairy-free", "Low-carb", "Mediterranean"]
-    )
 
-    allergies = st.multiselect(
-        "Select your food allergies:",
-        ["Peanuts", "Tree nuts", "Milk", "Eggs", "Fish", "Shellfish", "Wheat", "Soy", "Sesame"]
+# Set page configuration
+st.set_page_config(page_title="AI - Meal Planner", page_icon="🍴", layout="wide")
+
+# Opt-in profiling of this run (?profile=1, or the admin toggle)
+if st.secrets.get("admin_token") and st.query_params.get("admin") == st.secrets["admin_token"]:
+    st.sidebar.toggle("Profile my reruns", key="admin_profiling")
+run_profiler = RunProfiler().start() if profiling_requested(st.query_params, st.session_state) else None
+
+# Saved plans belong to a random token kept in this browser session, not to
+# the typed name, so nobody sees another person's plans by typing their name.
+# It stays out of the page address, which lands in browser history and in
+# links people copy (links from before still carry ?u=, which is dropped)
+if "visitor" not in st.session_state:
+    st.session_state["visitor"] = visitor_token()
+visitor = st.session_state["visitor"]
+if "u" in st.query_params:
+    del st.query_params["u"]
+
+try:
+    # Add background image and styling
+    with profile_stage("add_bg_and_styling"):
+        add_bg_and_styling()
+
+    # Main header with custom styling
+    st.markdown('<div class="main-header"><h1>🍽️ AI Meal Planner</h1></div>', unsafe_allow_html=True)
+
+    st.markdown(
+        '<div class="card"><p>This is an AI-powered meal planner that creates personalized meal plans with detailed recipes based on your information, dietary preferences, and calorie needs.</p><p><em>Powered by Google Gemini</em></p></div>',
+        unsafe_allow_html=True
     )
-    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Create two columns for user input and plan display
+    col_input, col_output = st.columns([1, 2], gap="large")
+
+    with col_input:
+        # Personal Information Card
+   
+        st.markdown('<div class="section-header">Personal Information</div>', unsafe_allow_html=True)
     
-    # Activity Level Card
-    #st.markdown('<div class="section-card">', unsafe_allow_html=True)
-    st.markdown('<div class="section-header">Activity Level</div>', unsafe_allow_html=True)
+        name = st.text_input("Enter your name", placeholder="e.g., John")
+        age = st.number_input("Enter your age", min_value=1, max_value=120, step=1, value=30)
+        gender = st.radio("Gender:", ["Male", "Female"], horizontal=True)
+        st.markdown('</div>', unsafe_allow_html=True)
     
-    activity_level = st.select_slider(
-        "Select your activity level:",
-        options=["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"],
-        value="Moderately Active"
-    )
+        # Height & Weight Card
+       # st.markdown('<div class="section-card">', unsafe_allow_html=True)
+        st.markdown('<div class="section-header">Height & Weight</div>', unsafe_allow_html=True)
     
-    # Calculate BMR with activity factor
-    def calculate_bmr(weight, height, age, gender, activity):
-        # Base BMR calculation
-        if gender == "Male":
-            bmr = 9.99 * weight + 6.25 * height - 4.92 * age + 5
+        unit_preference = st.radio("Preferred units:", ["Metric (kg, cm)", "Imperial (lb, ft + in)"])
+
+        if unit_preference == "Metric (kg, cm)":
+            col1, col2 = st.columns(2)
+            with col1:
+                weight = st.number_input("Weight (kg)", min_value=1.0, value=70.0)
+            with col2:
+                height = st.number_input("Height (cm)", min_value=1.0, value=170.0)
         else:
-            bmr = 9.99 * weight + 6.25 * height - 4.92 * age - 161
+            col1, col2 = st.columns(2)
+            with col1:
+                weight_lb = st.number_input("Weight (lb)", min_value=1.0, value=154.0)
         
-        # Apply activity factor
-        activity_factors = {
-            "Sedentary": 1.2,
-            "Lightly Active": 1.375,
-            "Moderately Active": 1.55,
-            "Very Active": 1.725,
-            "Extremely Active": 1.9
-        }
-        
-        return bmr * activity_factors[activity]
+            # Use columns to align feet and inches inputs next to each other
+            with col2:
+                height_ft = st.number_input("Height (ft)", min_value=0, value=5)
+                height_in = st.number_input("Height (in)", min_value=0.0, max_value=11.0, value=9.0)
 
-    bmr = calculate_bmr(weight, height, age, gender, activity_level)
-    round_bmr = round(bmr, 2)
+            # Convert imperial to metric
+            weight = weight_lb * UNITS_LB_TO_KG
+            height = (height_ft * 12 + height_in) * UNITS_IN_TO_CM
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Dietary Preferences Card
+       # st.markdown('<div class="section-card">', unsafe_allow_html=True)
+        st.markdown('<div class="section-header">Dietary Preferences & Allergies</div>', unsafe_allow_html=True)
     
-    st.markdown(f'<div class="info-box">Daily Calorie Needs: <strong>{round_bmr}</strong> calories</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+        dietary_preferences = st.multiselect(
+            "Select your dietary preferences:",
+            ["Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo", "Gluten-free", "Dairy-free", "Low-carb", "Mediterranean"]
+        )
+
+        allergies = st.multiselect(
+            "Select your food allergies:",
+            ["Peanuts", "Tree nuts", "Milk", "Eggs", "Fish", "Shellfish", "Wheat", "Soy", "Sesame"]
+        )
+        st.markdown('</div>', unsafe_allow_html=True)
     
-    # Weight Management Card
-    #st.markdown('<div class="section-card">', unsafe_allow_html=True)
-    st.markdown('<div class="section-header">Weight Management (Optional)</div>', unsafe_allow_html=True)
+        # Activity Level Card
+        #st.markdown('<div class="section-card">', unsafe_allow_html=True)
+        st.markdown('<div class="section-header">Activity Level</div>', unsafe_allow_html=True)
     
-    weight_goal = st.radio("Weight goal:", ["Maintain", "Lose", "Gain"], horizontal=True)
+        activity_level = st.select_slider(
+            "Select your activity level:",
+            options=["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"],
+            value="Moderately Active"
+        )
     
-    if weight_goal == "Lose":
-        calorie_deficit = st.slider("Calorie deficit per day:", 200, 800, 500)
-        round_bmr -= calorie_deficit
-        st.markdown(f'<div class="success-box">Adjusted calories: <strong>{round(round_bmr, 2)}</strong></div>', unsafe_allow_html=True)
-    elif weight_goal == "Gain":
-        calorie_surplus = st.slider("Calorie surplus per day:", 200, 800, 500)
-        round_bmr += calorie_surplus
-        st.markdown(f'<div class="success-box">Adjusted calories: <strong>{round(round_bmr, 2)}</strong></div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+        bmr = calculate_bmr(weight, height, age, gender, activity_level)
+        round_bmr = round(bmr, 2)
     
-    # Generate Plan Button Card
-   # st.markdown('<div class="section-card">', unsafe_allow_html=True)
-    if st.button("Generate Meal Plan", type="primary", use_container_width=True):
-        st.session_state['generate_meal_plan'] = True
-    st.markdown('</div>', unsafe_allow_html=True)
-
-def knapsack(target_calories, food_groups):
-    items = []
-    for group, foods in food_groups.items():
-        for item, calories in foods.items():
-            items.append((calories, item))
-
-    n = len(items)
-    dp = [[0 for _ in range(target_calories + 1)] for _ in range(n + 1)]
+        st.markdown(f'<div class="info-box">Daily Calorie Needs: <strong>{round_bmr}</strong> calories</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Weight Management Card
+        #st.markdown('<div class="section-card">', unsafe_allow_html=True)
+        st.markdown('<div class="section-header">Weight Management (Optional)</div>', unsafe_allow_html=True)
+    
+        weight_goal = st.radio("Weight goal:", ["Maintain", "Lose", "Gain"], horizontal=True)
+    
+        if weight_goal == "Lose":
+            calorie_deficit = st.slider("Calorie deficit per day:", 200, 800, 500)
+            round_bmr -= calorie_deficit
+            st.markdown(f'<div class="success-box">Adjusted calories: <strong>{round(round_bmr, 2)}</strong></div>', unsafe_allow_html=True)
+        elif weight_goal == "Gain":
+            calorie_surplus = st.slider("Calorie surplus per day:", 200, 800, 500)
+            round_bmr += calorie_surplus
+            st.markdown(f'<div class="success-box">Adjusted calories: <strong>{round(round_bmr, 2)}</strong></div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Household Card
+        st.markdown('<div class="section-header">Household (Optional)</div>', unsafe_allow_html=True)
+    
+        household_mode = st.toggle("Plan one menu for my household")
+        household_members = []
+        if household_mode:
+            member_count = st.number_input("Other people eating with you", min_value=1, max_value=MAX_HOUSEHOLD_SIZE - 1, value=1, step=1)
+            for i in range(int(member_count)):
+                with st.expander(f"Household member {i + 2}"):
+                    household_members.append({
+                        "name": st.text_input("Name", value=f"Member {i + 2}", key=f"member_name_{i}"),
+                        "age": st.number_input("Age", min_value=1, max_value=120, step=1, value=30, key=f"member_age_{i}"),
+                        "gender": st.radio("Gender:", ["Male", "Female"], horizontal=True, key=f"member_gender_{i}"),
+                        "weight": st.number_input("Weight (kg)", min_value=1.0, value=70.0, key=f"member_weight_{i}"),
+                        "height": st.number_input("Height (cm)", min_value=1.0, value=170.0, key=f"member_height_{i}"),
+                        "activity": st.select_slider(
+                            "Activity level:",
+                            options=["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Extremely Active"],
+                            value="Moderately Active", key=f"member_activity_{i}"
+                        ),
+                        "allergies": st.multiselect(
+                            "Food allergies:",
+                            ["Peanuts", "Tree nuts", "Milk", "Eggs", "Fish", "Shellfish", "Wheat", "Soy", "Sesame"],
+                            key=f"member_allergies_{i}"
+                        ),
+                    })
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Meals Per Day Card
+        st.markdown('<div class="section-header">Meals Per Day</div>', unsafe_allow_html=True)
+    
+        meals_per_day = st.select_slider("Number of meals:", options=list(MEAL_SLOT_PRESETS), value=3)
+        meal_slots = default_meal_slots(meals_per_day)
+    
+        with st.expander("Adjust calorie split"):
+            for slot in meal_slots:
+                share_pct = st.number_input(
+                    f'{slot["name"]} (% of daily calories)', min_value=0, max_value=100, step=5,
+                    value=int(round(slot["share"] * 100)), key=f'share_{meals_per_day}_{slot["name"]}'
+                )
+                slot["share"] = share_pct / 100
+    
+        total_share_pct = round(sum(slot["share"] for slot in meal_slots) * 100)
+        if total_share_pct != 100:
+            st.warning(f"Your split adds up to {total_share_pct}%; it will be scaled to 100%.")
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Start fetching catalogs in the background as soon as the inputs they
+        # depend on settle, so they are usually cached before the button is clicked
+        catalog_allergies = shared_allergies(household_members, allergies) if household_mode else allergies
+        prefetch_catalogs(st.session_state, list(dict.fromkeys(slot["meal_type"] for slot in meal_slots)),
+                          dietary_preferences, catalog_allergies)
+    
+        # Ingredients Card: steers the solver, so no new catalog is requested from the AI
+        st.markdown('<div class="section-header">Ingredients (Optional)</div>', unsafe_allow_html=True)
+    
+        # Suggestions come from the local catalogs and, once fetched, the AI ones
+        picker_meal_types = list(dict.fromkeys(slot["meal_type"] for slot in meal_slots))
+        picker_items = catalog_items(canonical_catalogs(default_catalogs(picker_meal_types, dietary_preferences))) + catalog_items(
+            canonical_catalogs(prefetched_catalogs(st.session_state, picker_meal_types, dietary_preferences, catalog_allergies) or {}))
+        picker_index = load_ingredient_index(tuple(sorted(set(picker_items))))
+    
+        include_terms = parse_terms(st.text_input("Must include:", placeholder="e.g., oats, spinach"))
+        if include_terms:
+            included = [picker_index.best(term) for term in include_terms]
+            st.caption("Including: " + ", ".join(display_name(item) if item else f"{term} (not in the catalog)"
+                                                 for term, item in zip(include_terms, included)))
+        exclude_terms = parse_terms(st.text_input("Leave out:", placeholder="e.g., mushroom, tofu"))
+        if exclude_terms:
+            excluded = sorted(picker_index.matching(exclude_terms))
+            st.caption("Leaving out: " + (", ".join(map(display_name, excluded)) or "nothing in the catalog so far"))
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Everything a plan depends on; saved plans are matched on its hash
+        plan_profile = {
+            "age": age, "gender": gender, "weight": round(weight, 1), "height": round(height, 1),
+            "activity": activity_level, "calories": round(round_bmr, 2), "preferences": dietary_preferences,
+            "allergies": allergies, "meal_slots": meal_slots, "household": household_members if household_mode else [],
+            "include": include_terms, "exclude": exclude_terms,
+        }
+    
+        # Generate Plan Button Card
+       # st.markdown('<div class="section-card">', unsafe_allow_html=True)
+        if st.button("Generate Meal Plan", type="primary", use_container_width=True):
+            st.session_state['generate_meal_plan'] = True
+            st.session_state.pop('saved_plan_id', None)
+            st.session_state.pop('plan_edit', None)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+        # Saved Plans Card
+        saved_plans = list_plans(user_key(visitor, name)) if name else []
+        if saved_plans:
+            st.markdown('<div class="section-header">Your Saved Plans</div>', unsafe_allow_html=True)
+            current_profile = profile_hash(plan_profile)
+            saved_plan = st.selectbox(
+                "Open a previous plan:", saved_plans,
+                format_func=lambda row: time.strftime("%d %b %Y, %H:%M", time.localtime(row[1])) + f" · {row[3]}"
+                                        + (" · current details" if row[2] == current_profile else "")
+            )
+            if st.button("Open Saved Plan", use_container_width=True):
+                st.session_state['saved_plan_id'] = saved_plan[0]
+                st.session_state['generate_meal_plan'] = False
+            st.markdown('</div>', unsafe_allow_html=True)
 
-    for i in range(1, n + 1):
-        for j in range(target_calories + 1):
-            value, _ = items[i - 1]
+    # Recipes go to the configured model (secrets: recipe_model); the router
+    # falls back to faster models while it is slow, failing or out of quota
+    if "model" not in st.session_state:
+        st.session_state["model"] = st.secrets.get("recipe_model", DEFAULT_MODEL)
+    set_route_model("recipe", st.session_state["model"])
+    set_route_model("recipe_details", st.session_state["model"])
 
-            if value > j:
-                dp[i][j] = dp[i - 1][j]
+    with col_output:
+        #st.markdown('<div class="card">', unsafe_allow_html=True)
+        if 'saved_plan_id' in st.session_state and name:
+            # Saved plans render straight from the history store, with no LLM calls
+            plan = load_plan(st.session_state['saved_plan_id'], user_key(visitor, name))
+            if plan:
+                st.markdown(f'<div class="section-header"><h2>{name}\'s Saved Meal Plan</h2></div>', unsafe_allow_html=True)
+                if render_meal_plan(plan):
+                    try:
+                        update_plan(plan["id"], user_key(visitor, name), plan)
+                    except sqlite3.Error as e:
+                        st.warning(f"Could not save this recipe to your history: {e}")
             else:
-                dp[i][j] = max(dp[i - 1][j], dp[i - 1][j - value] + value)
-
-    selected_items = []
-    j = target_calories
-    for i in range(n, 0, -1):
-        if dp[i][j] != dp[i - 1][j]:
-            _, item = items[i - 1]
-            selected_items.append(item)
-            j -= items[i - 1][0]
-
-    return selected_items, dp[n][target_calories]
-
-# Update the session state model
-if "model" not in st.session_state:
-    st.session_state["model"] = "gemini-1.5-flash"
-
-with col_output:
-    #st.markdown('<div class="card">', unsafe_allow_html=True)
-    if 'generate_meal_plan' in st.session_state and st.session_state['generate_meal_plan']:
-        if not name or age <= 0 or (unit_preference == "Metric (kg, cm)" and (not weight or not height)) or (unit_preference == "Imperial (lb, ft + in)" and (not weight_lb or (height_ft == 0 and height_in == 0))):
-            st.error("Please fill in all required information before generating a meal plan.")
-        else:
-            st.markdown(f'<div class="section-header"><h2>{name}\'s Personalized Meal Plan</h2></div>', unsafe_allow_html=True)
-            
-            with st.spinner("Generating your personalized meal plan..."):
-                # Calculate calorie distribution for each meal
-                calories_breakfast = round((round_bmr * 0.3), 2)  # 30% for breakfast
-                calories_lunch = round((round_bmr * 0.4), 2)      # 40% for lunch
-                calories_dinner = round((round_bmr * 0.3), 2)     # 30% for dinner
-                
-                # Generate dynamic food items based on user preferences and allergies
-                food_items_breakfast = get_food_items("breakfast", dietary_preferences, allergies)
-                food_items_lunch = get_food_items("lunch", dietary_preferences, allergies)
-                food_items_dinner = get_food_items("dinner", dietary_preferences, allergies)
-                
-                # Generate meal items using knapsack algorithm
-                meal_items_morning, cal_m = knapsack(int(calories_breakfast), food_items_breakfast)
-                meal_items_lunch, cal_l = knapsack(int(calories_lunch), food_items_lunch)
-                meal_items_dinner, cal_d = knapsack(int(calories_dinner), food_items_dinner)
-            
-            # Create tabs for each meal with custom styling
-            st.markdown('<div class="tab-container">', unsafe_allow_html=True)
-            breakfast_tab, lunch_tab, dinner_tab = st.tabs(["🍳 Breakfast", "🥗 Lunch", "🍲 Dinner"])
-            
-            with breakfast_tab:
-                st.markdown('<div class="tab-content">', unsafe_allow_html=True)
-                st.subheader("Breakfast Plan")
-                col_b1, col_b2 = st.columns([1, 2])
-                
-                with col_b1:
-                    st.markdown(f'<div class="info-box">Target Calories: <strong>{calories_breakfast}</strong></div>', unsafe_allow_html=True)
-                    st.markdown(f'<div class="success-box">Total Calories: <strong>{cal_m}</strong></div>', unsafe_allow_html=True)
-                    st.dataframe(pd.DataFrame({"Breakfast Items": meal_items_morning}), use_container_width=True)
-                
-                with col_b2:
-                    with st.spinner("Generating breakfast recipe..."):
-                        breakfast_recipe = get_recipe(meal_items_morning, "breakfast", name, dietary_preferences, allergies)
-                        if "error" in breakfast_recipe:
-                            st.error(breakfast_recipe["error"])
-                        else:
-                            st.markdown(breakfast_recipe["recipe"])
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with lunch_tab:
-                st.markdown('<div class="tab-content">', unsafe_allow_html=True)
-                st.subheader("Lunch Plan")
-                col_l1, col_l2 = st.columns([1, 2])
-                
-                with col_l1:
-                    st.markdown(f'<div class="info-box">Target Calories: <strong>{calories_lunch}</strong></div>', unsafe_allow_html=True)
-                    st.markdown(f'<div class="success-box">Total Calories: <strong>{cal_l}</strong></div>', unsafe_allow_html=True)
-                    st.dataframe(pd.DataFrame({"Lunch Items": meal_items_lunch}), use_container_width=True)
-                
-                with col_l2:
-                    with st.spinner("Generating lunch recipe..."):
-                        lunch_recipe = get_recipe(meal_items_lunch, "lunch", name, dietary_preferences, allergies)
-                        if "error" in lunch_recipe:
-                            st.error(lunch_recipe["error"])
-                        else:
-                            st.markdown(lunch_recipe["recipe"])
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with dinner_tab:
-                st.markdown('<div class="tab-content">', unsafe_allow_html=True)
-                st.subheader("Dinner Plan")
-                col_d1, col_d2 = st.columns([1, 2])
-                
-                with col_d1:
-                    st.markdown(f'<div class="info-box">Target Calories: <strong>{calories_dinner}</strong></div>', unsafe_allow_html=True)
-                    st.markdown(f'<div class="success-box">Total Calories: <strong>{cal_d}</strong></div>', unsafe_allow_html=True)
-                    st.dataframe(pd.DataFrame({"Dinner Items": meal_items_dinner}), use_container_width=True)
-                
-                with col_d2:
-                    with st.spinner("Generating dinner recipe..."):
-                        dinner_recipe = get_recipe(meal_items_dinner, "dinner", name, dietary_preferences, allergies)
-                        if "error" in dinner_recipe:
-                            st.error(dinner_recipe["error"])
-                        else:
-                            st.markdown(dinner_recipe["recipe"])
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+                st.error("This saved plan is no longer available. Please generate a new one.")
+        elif 'generate_meal_plan' in st.session_state and st.session_state['generate_meal_plan']:
+            if not name or age <= 0 or (unit_preference == "Metric (kg, cm)" and (not weight or not height)) or (unit_preference == "Imperial (lb, ft + in)" and (not weight_lb or (height_ft == 0 and height_in == 0))):
+                st.error("Please fill in all required information before generating a meal plan.")
+            else:
+                st.markdown(f'<div class="section-header"><h2>{name}\'s Personalized Meal Plan</h2></div>', unsafe_allow_html=True)
             
-            # Add a download button for the meal plan
-           # st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown('<div class="success-box" style="text-align: center; font-size: 22px !important;">Thank you for using our AI Meal Planner! Save your plan below.</div>', unsafe_allow_html=True)
+                # Everything below must finish within the plan SLA; slow or failing
+                # Gemini calls are replaced by the local catalog and template recipes
+                plan_deadline = time.monotonic() + PLAN_SLA_SECONDS
+                offline_mode = False
             
-            # Create a markdown export of all recipes
-            def create_meal_plan_markdown():
-                plan_md = f"# {name}'s Personalized Meal Plan\n\n"
-                plan_md += f"Daily Calorie Needs: {round_bmr} calories\n\n"
+                with st.spinner("Generating your personalized meal plan..."):
+                    # In household mode one plan is solved for the average member and
+                    # the catalog must be safe for everyone's allergies
+                    plan_calories = round_bmr
+                    plan_allergies = catalog_allergies
+                    household = None
+                    if household_mode:
+                        members = [{"name": name, "weight": weight, "height": height, "age": age, "gender": gender,
+                                    "activity": activity_level, "adjustment": round_bmr - bmr}] + household_members
+                        member_needs = household_needs(members)
+                        plan_calories, member_scales = portion_scales(member_needs)
+                        household = tuple((member["name"], float(scale)) for member, scale in zip(members, member_scales))
                 
-                plan_md += "## 🍳 Breakfast\n"
-                plan_md += f"Target Calories: {calories_breakfast}\n\n"
-                if "recipe" in breakfast_recipe:
-                    plan_md += breakfast_recipe["recipe"] + "\n\n"
+                    # Calorie band for each meal slot, from the user's split
+                    bands = slot_bands(meal_slots)
+                    targets = meal_targets(plan_calories, bands)
                 
-                plan_md += "## 🥗 Lunch\n"
-                plan_md += f"Target Calories: {calories_lunch}\n\n"
-                if "recipe" in lunch_recipe:
-                    plan_md += lunch_recipe["recipe"] + "\n\n"
+                    # Generate dynamic food items for every meal type in one request
+                    meal_types = list(dict.fromkeys(slot["meal_type"] for slot in meal_slots))
+                    catalog_deadline = min(plan_deadline, time.monotonic() + PLAN_SLA_SECONDS * CATALOG_SHARE)
+                    with profile_stage("get_food_items_batch"):
+                        catalogs, offline_mode = run_with_deadline(
+                            get_food_items_batch, remaining(catalog_deadline),
+                            lambda: default_catalogs(meal_types, dietary_preferences), meal_types, dietary_preferences, plan_allergies,
+                            _deadline=background_deadline()
+                        )
+                    # AI catalogs spell the same food many ways; calories the local
+                    # nutrition table knows replace the AI's guesses
+                    catalogs = canonical_catalogs(catalogs)
+                    slot_catalogs = {slot["name"]: catalogs[slot["meal_type"]] for slot in meal_slots}
                 
-                plan_md += "## 🍲 Dinner\n"
-                plan_md += f"Target Calories: {calories_dinner}\n\n"
-                if "recipe" in dinner_recipe:
-                    plan_md += dinner_recipe["recipe"] + "\n\n"
+                    # Must-include and leave-out terms resolve against the catalog
+                    # actually used, then constrain the solve
+                    catalog_index = load_ingredient_index(tuple(catalog_items(slot_catalogs)))
+                    include_items = [item for item in map(catalog_index.best, include_terms) if item]
+                    # AI catalogs can still slip in items the allergies or diet rule out
+                    exclude_items = (catalog_index.matching(exclude_terms) | unsafe_items(catalog_index.items, plan_allergies)
+                                     | diet_unsafe_items(catalog_index.items, dietary_preferences))
                 
-                return plan_md
+                    # Choose items for the whole day in one solve, letting each meal
+                    # move within its calorie band to hit the daily target. The
+                    # solver state is kept so swapped items re-solve incrementally.
+                    edit_key = (profile_hash(plan_profile), offline_mode)
+                    edit = st.session_state.get('plan_edit')
+                    if not edit or edit["key"] != edit_key:
+                        with profile_stage("solve_day"):
+                            day_state = prepare_day(plan_calories, slot_catalogs, bands, include_items, exclude_items,
+                                                    {slot["name"]: slot["meal_type"] for slot in meal_slots})
+                            day_plan, day_state = solve_varied(day_state)
+                            edit = {"key": edit_key, "state": day_state, "day_plan": day_plan}
+                        st.session_state['plan_edit'] = edit
+                    day_plan = edit["day_plan"]
             
-            meal_plan_md = create_meal_plan_markdown()
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.download_button(
-                    label="📥 Download Meal Plan",
-                    data=meal_plan_md,
-                    file_name=f"{name}_meal_plan.md",
-                    mime="text/markdown",
-                    use_container_width=True
-                )
-            st.markdown('</div>', unsafe_allow_html=True)
-    else:
-        st.markdown(
-            """
-            <div style="text-align: center; padding: 50px 0;">
-                <h2>Welcome to your personalized meal planner</h2>
-                <p style="font-size: 22px; color: white; text-shadow: 1px 1px 2px #000000;">Fill in your details on the left and click 'Generate Meal Plan' to get started</p>
-                <div style="font-size: 80px; padding: 30px;">🍽️</div>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
-    st.markdown('</div>', unsafe_allow_html=True)
+                plan = {
+                    "name": name, "round_bmr": round_bmr, "plan_calories": plan_calories, "meal_slots": meal_slots,
+                    "targets": targets, "catalogs": slot_catalogs, "day_plan": day_plan, "recipes": {},
+                    "household": household, "member_needs": member_needs if household else None, "offline": offline_mode,
+                    "dietary_preferences": dietary_preferences, "allergies": plan_allergies,
+                }
+                # Recipes of earlier reruns live in the saved copy; start from them
+                # so the view and a shared snapshot have every recipe made so far
+                try:
+                    plan_id = save_plan(user_key(visitor, name), plan_profile, plan, f'{len(meal_slots)} meals, {round(plan_calories)} calories'
+                                        + (f', household of {len(household)}' if household else ''))
+                    plan["recipes"] = (load_plan(plan_id, user_key(visitor, name)) or plan)["recipes"]
+                except sqlite3.Error as e:
+                    plan_id = None
+                    st.warning(f"Could not save this plan to your history: {e}")
+                if render_meal_plan(plan, plan_deadline - RENDER_MARGIN_SECONDS, edit=edit) and plan_id:
+                    try:
+                        update_plan(plan_id, user_key(visitor, name), plan)
+                    except sqlite3.Error as e:
+                        st.warning(f"Could not save this recipe to your history: {e}")
+        elif st.query_params.get("plan"):
+            # Shared links render the stored snapshot, with no solver or LLM work
+            plan = load_shared_plan(st.query_params["plan"])
+            if plan:
+                st.markdown(f'<div class="section-header"><h2>{plan["name"]}\'s Shared Meal Plan</h2></div>', unsafe_allow_html=True)
+                render_meal_plan(plan, shared=True)
+            else:
+                st.error("This shared plan link is no longer available. Fill in your details to generate your own plan.")
+        else:
+            st.markdown(
+                """
+                <div style="text-align: center; padding: 50px 0;">
+                    <h2>Welcome to your personalized meal planner</h2>
+                    <p style="font-size: 22px; color: white; text-shadow: 1px 1px 2px #000000;">Fill in your details on the left and click 'Generate Meal Plan' to get started</p>
+                    <div style="font-size: 80px; padding: 30px;">🍽️</div>
+                </div>
+                """, 
+                unsafe_allow_html=True
+            )
+        st.markdown('</div>', unsafe_allow_html=True)
+finally:
+    # Also on st.rerun() and errors: a profiler left running keeps cProfile
+    # on for this thread and tracemalloc on for the whole process
+    if run_profiler:
+        st.session_state["last_profile"] = run_profiler.stop().artifact()
+        st.session_state["last_profile_summary"] = run_profiler.summary()
 
 hide_streamlit_style = """
                     <style>
@@ -550,4 +699,20 @@ hide_streamlit_style = """
     	            }
                     </style>
                     """
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+if "last_profile" in st.session_state and profiling_requested(st.query_params, st.session_state):
+    with st.expander("⏱️ Profile of the last run"):
+        st.code(st.session_state["last_profile_summary"].split("\nTop functions")[0])
+        # Input tokens each recent request was billed for, system instruction included
+        st.dataframe(pd.DataFrame(recent_requests()), use_container_width=True, hide_index=True)
+        # Live model routing: latency, error rate and requests-per-minute quota use
+        st.dataframe(pd.DataFrame(routing_stats()), use_container_width=True, hide_index=True)
+        # Per route: calls, races, hedges, timeouts and errors, with p50/p95 latency
+        st.dataframe(pd.DataFrame.from_dict(latency_stats(), orient="index"), use_container_width=True)
+        st.download_button(
+            label="Download profile",
+            data=st.session_state["last_profile"],
+            file_name=f"dietmitra_profile_{time.strftime('%Y%m%d_%H%M%S')}.zip",
+            mime="application/zip",
+        )
\ No newline at end of file
@@ -0,0 +1,94 @@
+# substitution.py
+from bisect import bisect_left
+from optimizer import serving_calories, SERVING_SIZES
+
+
+class SubstitutionIndex:
+    """
+    Catalog items of each food group sorted by calories, for "something else
+    instead of X" lookups
+
+    Every serving size of an item is an entry of its group, so a 2x item
+    can be replaced by a double helping of something lighter. Built once
+    per catalog; finding the alternatives closest to a calorie value is a
+    binary search plus a walk outwards over the neighbours.
+    """
+
+    def __init__(self, food_groups):
+        self._groups = {}
+        self._item_group = {}
+        for group, foods in food_groups.items():
+            entries = []
+            for item, calories in foods.items():
+                calories = int(round(float(calories)))
+                portions = {serving_calories(calories, servings): servings for servings in SERVING_SIZES}
+                entries.extend((portion, item, servings) for portion, servings in portions.items() if portion > 0)
+                self._item_group.setdefault(item, (group, calories))
+            entries.sort(key=lambda entry: entry[0])
+            self._groups[group] = ([portion for portion, _, _ in entries], [entry[1:] for entry in entries])
+
+    def group_of(self, item):
+        """(group, calories) of an item, or None if the catalog does not have it"""
+        return self._item_group.get(item)
+
+    def alternatives(self, item, meal_items, meal_calories, target_calories, limit=5, allowed=None, servings=1):
+        """
+        Same-group replacements for an item, closest to keeping the meal on target
+
+        Parameters:
+        item (str): Chosen item to replace
+        meal_items (list): Items currently in the meal, which are never suggested
+        meal_calories (int): Current meal total
+        target_calories (float): Calorie target of the meal
+        limit (int): Maximum number of alternatives
+        allowed (set): Items that may be suggested, e.g. without excluded ones; any by default
+        servings (float): Serving size of the item in the meal
+
+        Returns:
+        list: (item, servings, calories, new_meal_calories) tuples, best first, one per item
+        """
+        found = self.group_of(item)
+        if not found:
+            return []
+        group, calories = found
+        calories = serving_calories(calories, servings)
+        sorted_calories, items = self._groups[group]
+        # The replacement that would land the meal exactly on target
+        ideal = calories + target_calories - meal_calories
+        taken = set(meal_items)
+        seen = set()
+
+        # Walk outwards from the insertion point, always taking the closer side
+        results = []
+        below = bisect_left(sorted_calories, ideal) - 1
+        above = below + 1
+        while len(results) < limit and (below >= 0 or above < len(items)):
+            if above >= len(items) or (below >= 0 and ideal - sorted_calories[below] <= sorted_calories[above] - ideal):
+                index, below = below, below - 1
+            else:
+                index, above = above, above + 1
+            candidate, size = items[index]
+            if candidate not in taken and candidate not in seen and (allowed is None or candidate in allowed):
+                seen.add(candidate)
+                results.append((candidate, size, sorted_calories[index], meal_calories - calories + sorted_calories[index]))
+        return results
+
+    def swap(self, meal_plan, item, replacement, replacement_servings=1):
+        """
+        Replace one item of a meal and update its total without re-solving
+
+        Parameters:
+        meal_plan (tuple): (selected_items, total_calories, servings) as returned by solve_day
+        item (str): Item to take out
+        replacement (str): Item from the same catalog to put in its place
+        replacement_servings (float): Serving size of the replacement, as suggested by alternatives
+
+        Returns:
+        tuple: The updated (selected_items, total_calories, servings)
+        """
+        items, total, servings = meal_plan
+        total += (serving_calories(self.group_of(replacement)[1], replacement_servings)
+                  - serving_calories(self.group_of(item)[1], servings[item]))
+        servings = {replacement if chosen == item else chosen: replacement_servings if chosen == item else size
+                    for chosen, size in servings.items()}
+        return [replacement if chosen == item else chosen for chosen in items], total, servings
@@ -0,0 +1,84 @@
+# test_allergens.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from allergens import AllergenScanner, diet_unsafe_items, scan_allergens, unsafe_items
+
+
+@pytest.mark.parametrize("text, allergy", [
+    ("Roast the eggplant until soft", "Eggs"),
+    ("A pinch of nutmeg", "Tree nuts"),
+    ("Garnish with buttercup petals", "Milk"),
+    ("Serve with grapenuts", "Tree nuts"),
+    ("Add the codfish", "Fish"),
+])
+def test_synonyms_only_match_whole_words(text, allergy):
+    assert scan_allergens(text, [allergy]) == {}
+
+
+def test_finds_synonyms_case_insensitively():
+    text = "Paneer Tikka with 2 EGGS, a dash of ghee and crushed peanuts."
+
+    found = scan_allergens(text, ["Milk", "Eggs", "Peanuts"])
+
+    assert found == {"Milk": ["ghee", "paneer"], "Eggs": ["eggs"], "Peanuts": ["peanuts"]}
+
+
+def test_only_the_given_allergies_are_reported():
+    assert scan_allergens("Scrambled eggs on toast", ["Fish"]) == {}
+    assert scan_allergens("Scrambled eggs on toast", []) == {}
+    assert scan_allergens("", ["Eggs"]) == {}
+
+
+@pytest.mark.parametrize("text, allergy", [
+    ("1 cup almond milk", "Milk"),
+    ("2 tbsp peanut butter", "Milk"),
+    ("coconut cream to finish", "Milk"),
+    ("rice flour for dusting", "Wheat"),
+    ("two ragi rotis", "Wheat"),
+    ("an egg-free batter", "Eggs"),
+    ("sliced water chestnuts", "Tree nuts"),
+])
+def test_exemptions_cover_the_words_they_contain(text, allergy):
+    assert scan_allergens(text, [allergy]) == {}
+
+
+def test_an_exemption_only_covers_its_own_allergen():
+    assert scan_allergens("1 cup almond milk", ["Milk", "Tree nuts"]) == {"Tree nuts": ["almond"]}
+    assert scan_allergens("peanut butter toast", ["Milk", "Peanuts", "Wheat"]) == {"Peanuts": ["peanut"]}
+
+
+def test_an_exemption_does_not_hide_other_mentions():
+    text = "Mix rice flour with wheat flour, then brush with butter and almond milk"
+
+    found = scan_allergens(text, ["Milk", "Wheat"])
+
+    assert found == {"Milk": ["butter"], "Wheat": ["flour", "wheat"]}
+
+
+def test_overlapping_patterns_in_a_custom_scanner():
+    scanner = AllergenScanner({"Nuts": ["nut", "pine nut", "nut oil"]}, {"Nuts": ["nut-free"]})
+
+    assert scanner.scan("pine nut oil", ["Nuts"]) == {"Nuts": ["nut", "nut oil", "pine nut"]}
+    assert scanner.scan("a nut-free bar", ["Nuts"]) == {}
+
+
+def test_unsafe_catalog_items():
+    items = {"egg_bhurji", "eggplant_bharta", "greek_yogurt", "almond_milk", "oat_milk"}
+
+    assert unsafe_items(items, ["Eggs"]) == {"egg_bhurji"}
+    assert unsafe_items(items, ["Milk"]) == {"greek_yogurt"}
+    assert unsafe_items(items, ["Tree nuts"]) == {"almond_milk"}
+
+
+def test_diet_unsafe_items():
+    items = {"chicken_breast", "fish_curry", "paneer_tikka", "honey", "tofu", "whole_wheat_roti", "barley"}
+
+    assert diet_unsafe_items(items, ["Vegetarian"]) == {"chicken_breast", "fish_curry"}
+    assert diet_unsafe_items(items, ["Vegan"]) == {"chicken_breast", "fish_curry", "paneer_tikka", "honey"}
+    assert diet_unsafe_items(items, ["Gluten-free"]) == {"whole_wheat_roti", "barley"}
+    assert diet_unsafe_items(items, ["Keto"]) == set()
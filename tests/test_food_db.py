@@ -0,0 +1,86 @@
+# test_food_db.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from food_db import FoodDatabase, NameNormalizer, build_food_db, food_key
+
+NAMES = ["greek_yogurt", "Spinach", "brown rice", "goat_milk", "tomatoes", "chana_masala", "peanut_butter"]
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("Greek Yogurt", "greek_yogurt"),
+    ("greek-yoghurt", "greek_yogurt"),
+    ("GREEK  yogurt", "greek_yogurt"),
+    ("spinach", "spinach"),
+    ("Brown Rice", "brown_rice"),
+    ("channa masala", "chana_masala"),
+])
+def test_spellings_map_to_the_known_name(name, canonical):
+    assert NameNormalizer(NAMES).canonical(name) == canonical
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("egg", "eggs"),
+    ("Tomato", "tomatoes"),
+    ("tomatos", "tomatoes"),
+    ("berry", "berries"),
+    ("cookies", "cookie"),
+    ("rotis", "roti"),
+    ("chickpea", "chickpeas"),
+    ("pumpkin seed", "pumpkin_seeds"),
+])
+def test_singular_and_plural_forms_map_to_the_known_name(name, canonical):
+    names = ["eggs", "tomatoes", "berries", "cookie", "roti", "chickpeas", "pumpkin_seeds", "peanut_butter"]
+
+    assert NameNormalizer(names).canonical(name) == canonical
+
+
+@pytest.mark.parametrize("name", ["spinach dal", "brown rice pasta", "greek salad", "masala chai"])
+def test_other_dishes_keep_their_own_name(name):
+    assert NameNormalizer(NAMES).canonical(name) == food_key(name)
+
+
+def test_never_maps_to_a_name_with_other_allergens():
+    # "oat milk" is not dairy, "goat milk" is
+    assert NameNormalizer(NAMES).canonical("oat milk") == "oat_milk"
+
+
+def test_names_without_letters_or_digits():
+    assert NameNormalizer(NAMES).canonical("--") == ""
+    assert NameNormalizer([]).canonical("Greek Yogurt") == "greek_yogurt"
+
+
+def test_normalize_keeps_the_first_of_the_same_food():
+    catalog = {
+        "protein": {"Greek Yogurt": 130, "Paneer": 265},
+        "dairy": {"greek-yoghurt": 100, "goat milk": 170},
+        "other": {"??": 5},
+    }
+
+    assert NameNormalizer(NAMES).normalize(catalog) == {
+        "protein": {"greek_yogurt": 130, "paneer": 265},
+        "dairy": {"goat_milk": 170},
+    }
+
+
+def test_database_lookup_and_calibration(tmp_path):
+    source = tmp_path / "foods.csv"
+    source.write_text("name,calories,protein,carbs,fat\n"
+                      "Greek Yogurt,130,15,6,4.5\n"
+                      "brown_rice,215,5,45,1.8\n"
+                      "greek_yogurt,999,0,0,0\n")
+    db_dir = str(tmp_path / "db")
+
+    assert build_food_db(str(source), db_dir) == 2
+    db = FoodDatabase(db_dir)
+
+    assert list(db.lookup(["Brown Rice", "greek_yogurt", "quinoa"]) >= 0) == [True, True, False]
+    assert db.calibrate({"grains": {"brown_rice": 180, "quinoa": 222}, "protein": {"greek_yogurt": 100}}) == {
+        "grains": {"brown_rice": 215, "quinoa": 222}, "protein": {"greek_yogurt": 130}}
+    macros, missing = db.plan_macros({"Lunch": (["brown_rice", "quinoa"], 437, {"brown_rice": 2, "quinoa": 1})})["Lunch"]
+    assert macros == {"calories": 430.0, "protein": 10.0, "carbs": 90.0, "fat": 3.6}
+    assert missing == ["quinoa"]
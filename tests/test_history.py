@@ -0,0 +1,112 @@
+# test_history.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history
+from history import MAX_PLAN_AGE_DAYS, MAX_PLANS_PER_USER, list_plans, load_plan, load_shared_plan, save_plan, \
+    share_plan, update_plan, user_key, visitor_token
+from recipe_model import Recipe
+
+
+def make_plan(items=("oatmeal", "banana"), recipes=None):
+    return {
+        "name": "Asha",
+        "day_plan": {"Breakfast": (list(items), np.int64(400), dict.fromkeys(items, 1))},
+        "recipes": recipes or {},
+    }
+
+
+def recipe(title, steps=()):
+    return {"recipe": Recipe.from_dict({"title": title, "steps": list(steps)})}
+
+
+def test_plans_are_kept_per_visitor_and_name(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    token = visitor_token()
+    save_plan(user_key(token, "Asha"), {"age": 30}, make_plan(), "3 meals", db)
+
+    assert len(list_plans(user_key(token, "  asha "), db)) == 1
+    assert list_plans(user_key(visitor_token(), "Asha"), db) == []
+
+
+def test_saving_the_same_meals_again_merges_recipes(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    first = save_plan("u:asha", {"age": 30}, make_plan(recipes={"Breakfast": recipe("Oats")}), "3 meals", db)
+
+    again = save_plan("u:asha", {"age": 30}, make_plan(recipes={"Lunch": recipe("Dal")}), "3 meals", db)
+
+    assert again == first
+    assert len(list_plans("u:asha", db)) == 1
+    stored = load_plan(first, "u:asha", db)
+    assert {slot: entry["recipe"].title for slot, entry in stored["recipes"].items()} == {"Breakfast": "Oats",
+                                                                                        "Lunch": "Dal"}
+    assert stored["day_plan"]["Breakfast"] == (["oatmeal", "banana"], 400, {"oatmeal": 1, "banana": 1})
+
+
+def test_different_meals_are_a_new_plan(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    first = save_plan("u:asha", {"age": 30}, make_plan(), "3 meals", db)
+
+    second = save_plan("u:asha", {"age": 30}, make_plan(items=("poha", "apple")), "3 meals", db)
+
+    assert second != first
+    assert [row[0] for row in list_plans("u:asha", db)] == [second, first]
+
+
+def test_update_plan_keeps_recipes_and_adds_details(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    plan_id = save_plan("u:asha", {"age": 30}, make_plan(recipes={"Breakfast": recipe("Oats")}), "3 meals", db)
+
+    update_plan(plan_id, "u:asha", make_plan(recipes={"Breakfast": recipe("Oats", ["Boil", "Serve"])}), db)
+    update_plan(plan_id, "someone:else", make_plan(recipes={"Breakfast": recipe("Other")}), db)
+
+    stored = load_plan(plan_id, "u:asha", db)
+    assert stored["recipes"]["Breakfast"]["recipe"].steps == ["Boil", "Serve"]
+    assert load_plan(plan_id, "someone:else", db) is None
+
+
+def test_keeps_the_newest_plans_per_user(tmp_path, monkeypatch):
+    db = str(tmp_path / "history.sqlite3")
+    now = [1_000_000.0]
+    monkeypatch.setattr(history.time, "time", lambda: now[0])
+    ids = []
+    for i in range(MAX_PLANS_PER_USER + 3):
+        now[0] += 60
+        ids.append(save_plan("u:asha", {"plan": i}, make_plan(items=(f"item_{i}",)), f"plan {i}", db))
+    save_plan("u:ravi", {"plan": 0}, make_plan(), "plan 0", db)
+
+    assert [row[0] for row in list_plans("u:asha", db)] == ids[::-1][:MAX_PLANS_PER_USER]
+    assert len(list_plans("u:ravi", db)) == 1
+
+
+def test_drops_plans_older_than_the_retention_age(tmp_path, monkeypatch):
+    db = str(tmp_path / "history.sqlite3")
+    now = [time.time()]
+    monkeypatch.setattr(history.time, "time", lambda: now[0])
+    old = save_plan("u:ravi", {"age": 40}, make_plan(), "old", db)
+    now[0] += (MAX_PLAN_AGE_DAYS - 1) * 86400
+    kept = save_plan("u:asha", {"age": 30}, make_plan(), "kept", db)
+    assert load_plan(old, "u:ravi", db) is not None
+
+    now[0] += 2 * 86400
+    save_plan("u:asha", {"age": 31}, make_plan(), "new", db)
+
+    assert load_plan(old, "u:ravi", db) is None
+    assert load_plan(kept, "u:asha", db) is not None
+
+
+def test_shared_plans_are_content_addressed(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    plan = make_plan(recipes={"Breakfast": recipe("Oats")})
+
+    key = share_plan(plan, db)
+
+    assert share_plan(make_plan(recipes={"Breakfast": recipe("Oats")}), db) == key
+    assert share_plan(make_plan(recipes={"Breakfast": recipe("Oats"), "Lunch": recipe("Dal")}), db) != key
+    assert load_shared_plan(key, db)["recipes"]["Breakfast"]["recipe"].title == "Oats"
+    assert load_shared_plan("unknown", db) is None
@@ -0,0 +1,48 @@
+# test_ingredients.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingredients import IngredientIndex, catalog_items, display_name, item_words, parse_terms
+
+ITEMS = ["greek_yogurt", "soy_yogurt", "mushrooms", "egg_bhurji", "eggplant_bharta", "Green-Tea", "eggs"]
+
+
+def test_item_words_and_display_names():
+    assert item_words("Greek_Yogurt") == ["greek", "yogurt"]
+    assert item_words("dairy-free  alternatives!") == ["dairy", "free", "alternatives"]
+    assert display_name("greek_yogurt") == "Greek yogurt"
+
+
+def test_search_matches_word_prefixes_shortest_first():
+    index = IngredientIndex(ITEMS)
+
+    assert index.search("yog") == ["soy_yogurt", "greek_yogurt"]
+    assert index.search("egg") == ["eggs", "egg_bhurji", "eggplant_bharta"]
+    assert index.search("green tea") == ["Green-Tea"]
+    assert index.search("gre yog") == ["greek_yogurt"]
+    assert index.search("egg", limit=2) == ["eggs", "egg_bhurji"]
+
+
+def test_search_only_matches_the_start_of_words():
+    index = IngredientIndex(ITEMS)
+
+    assert index.search("ogurt") == []
+    assert index.search("plant") == []
+    assert index.search("  ,, ") == []
+
+
+def test_best_and_matching():
+    index = IngredientIndex(ITEMS)
+
+    assert index.best("Mush") == "mushrooms"
+    assert index.best("tofu") is None
+    assert index.matching(parse_terms("egg, soy")) == {"eggs", "egg_bhurji", "eggplant_bharta", "soy_yogurt"}
+
+
+def test_parse_terms_and_catalog_items():
+    assert parse_terms(" eggs, ,greek yogurt ,") == ["eggs", "greek yogurt"]
+    assert parse_terms(None) == []
+    catalogs = {"breakfast": {"protein": {"eggs": 78}}, "lunch": {"protein": {"tofu": 144, "eggs": 78}}}
+    assert catalog_items(catalogs) == ["eggs", "tofu"]
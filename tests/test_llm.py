@@ -0,0 +1,254 @@
+# test_llm.py
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm
+from llm import Completion, DeadlineExceeded, generate_content
+
+
+def answer(text="ok", delay=0.0, calls=None):
+    """Local stand-in for a provider: answers `text` after `delay` seconds"""
+    def call(model_name, prompt, generation_config, timeout, system_instruction=None):
+        if calls is not None:
+            calls.append(model_name)
+        time.sleep(delay)
+        return Completion(f"{text} from {model_name}")
+    return call
+
+
+def failure(error, delay=0.0, calls=None):
+    """Local stand-in for a provider that raises `error` after `delay` seconds"""
+    def call(model_name, prompt, generation_config, timeout, system_instruction=None):
+        if calls is not None:
+            calls.append(model_name)
+        time.sleep(delay)
+        raise error
+    return call
+
+
+class ReadTimeout(Exception):
+    """Shaped like an HTTP client's own timeout error"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Empty telemetry, both providers configured and fixed model ladders for every test"""
+    for name in ("_latencies", "_counters", "_models", "_health", "_model_calls"):
+        monkeypatch.setattr(llm, name, {})
+    monkeypatch.setattr(llm, "_requests", llm.deque(maxlen=llm.REQUEST_LOG_SIZE))
+    monkeypatch.setattr(llm, "_anthropic", {"api_key": "test", "client": None})
+    monkeypatch.setattr(llm, "ROUTE_MODELS", {
+        "catalog": ["gemini-1.5-flash-8b", "gemini-1.5-flash", llm.ANTHROPIC_MODEL],
+        "recipe": ["gemini-1.5-flash", "gemini-1.5-flash-8b", llm.ANTHROPIC_MODEL],
+    })
+    monkeypatch.setattr(llm, "MODEL_RPM_LIMITS", {})
+    monkeypatch.setattr(llm, "PROVIDERS", dict(llm.PROVIDERS))
+    monkeypatch.setattr(llm, "_busy", dict.fromkeys(llm.POOL_WORKERS, 0))
+
+
+def counters(route):
+    return llm.latency_stats()[route]
+
+
+def test_race_returns_the_faster_provider(monkeypatch):
+    monkeypatch.setattr(llm, "RACE_MAX_RATIO", 1.0)
+    llm.PROVIDERS["gemini"] = answer(delay=0.5)
+    llm.PROVIDERS["anthropic"] = answer()
+
+    response = generate_content("prompt", "catalog", time.monotonic() + 2)
+
+    assert response.text == f"ok from {llm.ANTHROPIC_MODEL}"
+    assert counters("catalog")["races"] == 1
+    assert counters("catalog")["race_wins"] == 1
+    assert counters("catalog")["hedge_wins"] == 0
+
+
+def test_races_stay_within_their_quota(monkeypatch):
+    monkeypatch.setattr(llm, "RACE_MAX_RATIO", 0.25)
+    gemini_calls, anthropic_calls = [], []
+    llm.PROVIDERS["gemini"] = answer(calls=gemini_calls)
+    llm.PROVIDERS["anthropic"] = answer(delay=0.05, calls=anthropic_calls)
+
+    for _ in range(8):
+        generate_content("prompt", "catalog", time.monotonic() + 2)
+
+    assert len(gemini_calls) == 8
+    assert len(anthropic_calls) == counters("catalog")["races"] == 2
+
+
+def test_no_race_against_an_unhealthy_rival(monkeypatch):
+    monkeypatch.setattr(llm, "RACE_MAX_RATIO", 1.0)
+    for _ in range(llm.HEALTH_MIN_SAMPLES):
+        llm.record_health("catalog", llm.ANTHROPIC_MODEL, 0.1, False)
+    anthropic_calls = []
+    llm.PROVIDERS["gemini"] = answer()
+    llm.PROVIDERS["anthropic"] = answer(calls=anthropic_calls)
+
+    generate_content("prompt", "catalog", time.monotonic() + 2)
+
+    assert anthropic_calls == []
+    assert counters("catalog")["races"] == 0
+
+
+def test_error_fails_over_to_the_next_model():
+    calls = []
+
+    def flaky(model_name, *args):
+        calls.append(model_name)
+        if model_name == "gemini-1.5-flash":
+            raise RuntimeError("503 unavailable")
+        return Completion(f"ok from {model_name}")
+
+    llm.PROVIDERS["gemini"] = flaky
+
+    response = generate_content("prompt", "recipe", time.monotonic() + 2)
+
+    assert response.text == "ok from gemini-1.5-flash-8b"
+    assert calls == ["gemini-1.5-flash", "gemini-1.5-flash-8b"]
+    assert llm.model_health("recipe", "gemini-1.5-flash")["error_rate"] == 1.0
+    assert counters("recipe")["errors"] == 0
+
+
+def test_invalid_answer_fails_over_across_providers():
+    llm.PROVIDERS["gemini"] = answer(text="not json")
+    llm.PROVIDERS["anthropic"] = answer(text="{}")
+
+    def validate(text):
+        return text.startswith("{")
+
+    response = generate_content("prompt", "recipe", time.monotonic() + 2, validate=validate)
+
+    assert response.text == f"{{}} from {llm.ANTHROPIC_MODEL}"
+
+
+def test_every_model_failing_raises_the_last_error():
+    llm.PROVIDERS["gemini"] = failure(RuntimeError("400 bad request"))
+    llm.PROVIDERS["anthropic"] = failure(RuntimeError("400 bad request"))
+
+    with pytest.raises(RuntimeError, match="bad request"):
+        generate_content("prompt", "recipe", time.monotonic() + 2)
+    assert counters("recipe")["errors"] == 1
+
+
+def test_slow_call_is_hedged_after_the_route_p95(monkeypatch):
+    monkeypatch.setattr(llm, "HEDGE_MAX_RATIO", 1.0)
+    for _ in range(llm.HEDGE_MIN_SAMPLES):
+        llm.record_latency("recipe", 0.05)
+    release = threading.Event()
+
+    def stalled_primary(model_name, *args):
+        if model_name == "gemini-1.5-flash":
+            release.wait(1)
+        return Completion(f"ok from {model_name}")
+
+    llm.PROVIDERS["gemini"] = stalled_primary
+    try:
+        response = generate_content("prompt", "recipe", time.monotonic() + 2)
+    finally:
+        release.set()
+
+    assert response.text == "ok from gemini-1.5-flash-8b"
+    assert counters("recipe")["hedges"] == 1
+    assert counters("recipe")["hedge_wins"] == 1
+    assert counters("recipe")["race_wins"] == 0
+
+
+def test_no_hedge_before_enough_latency_samples(monkeypatch):
+    monkeypatch.setattr(llm, "HEDGE_MAX_RATIO", 1.0)
+    calls = []
+    llm.PROVIDERS["gemini"] = answer(delay=0.2, calls=calls)
+
+    generate_content("prompt", "recipe", time.monotonic() + 2)
+
+    assert calls == ["gemini-1.5-flash"]
+    assert counters("recipe")["hedges"] == 0
+
+
+def test_deadline_raises_deadline_exceeded():
+    llm.PROVIDERS["gemini"] = answer(delay=0.5)
+    llm.PROVIDERS["anthropic"] = answer(delay=0.5)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        generate_content("prompt", "recipe", time.monotonic() + 0.1)
+
+    assert time.monotonic() - started < 0.4
+    assert counters("recipe")["timeouts"] == 1
+
+
+def test_provider_timeout_is_a_missed_deadline():
+    # SDKs end a call at the timeout they are given with their own error class
+    llm.PROVIDERS["gemini"] = failure(ReadTimeout("read timed out"))
+    llm.PROVIDERS["anthropic"] = failure(ReadTimeout("read timed out"))
+
+    with pytest.raises(DeadlineExceeded):
+        generate_content("prompt", "recipe", time.monotonic() + 2)
+    assert counters("recipe")["timeouts"] == 1
+    assert counters("recipe")["errors"] == 0
+
+
+def test_no_call_without_time_left():
+    calls = []
+    llm.PROVIDERS["gemini"] = answer(calls=calls)
+
+    with pytest.raises(DeadlineExceeded):
+        generate_content("prompt", "recipe", time.monotonic() - 1)
+    assert calls == []
+
+
+def test_busy_pool_starts_no_race(monkeypatch):
+    monkeypatch.setattr(llm, "RACE_MAX_RATIO", 1.0)
+    monkeypatch.setattr(llm, "POOL_WORKERS", {"foreground": 2, "background": 1})
+    release = threading.Event()
+    llm.PROVIDERS["gemini"] = lambda model_name, *args: release.wait(1) and Completion("late")
+    try:
+        # Abandoned calls keep their workers until the provider answers
+        for _ in range(2):
+            with pytest.raises(DeadlineExceeded):
+                generate_content("prompt", "recipe", time.monotonic() + 0.05)
+        anthropic_calls = []
+        llm.PROVIDERS["anthropic"] = answer(calls=anthropic_calls)
+
+        with pytest.raises(DeadlineExceeded):
+            generate_content("prompt", "catalog", time.monotonic() + 0.1)
+    finally:
+        release.set()
+
+    assert anthropic_calls == []
+    assert counters("catalog")["races"] == 0
+
+
+def test_saturated_background_pool_leaves_foreground_requests_alone(monkeypatch):
+    monkeypatch.setattr(llm, "POOL_WORKERS", {"foreground": 2, "background": 1})
+    release = threading.Event()
+    calls = []
+
+    def provider(model_name, *args):
+        calls.append(model_name)
+        if threading.current_thread().name.startswith("llm-background"):
+            release.wait(1)
+        return Completion(f"ok from {model_name}")
+
+    llm.PROVIDERS["gemini"] = provider
+    try:
+        with llm.background():
+            with pytest.raises(DeadlineExceeded):
+                generate_content("prompt", "recipe", time.monotonic() + 0.05)
+            # The only background worker is still busy, so this one is not queued
+            with pytest.raises(DeadlineExceeded):
+                generate_content("prompt", "recipe", time.monotonic() + 2)
+
+        started = time.monotonic()
+        response = generate_content("prompt", "recipe", time.monotonic() + 2)
+    finally:
+        release.set()
+
+    assert response.text == "ok from gemini-1.5-flash"
+    assert time.monotonic() - started < 0.5
+    assert len(calls) == 2
@@ -0,0 +1,96 @@
+# test_nutrition.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrition import ACTIVITY_FACTORS, GOAL_SIGNS, calculate_bmr, calculate_bmr_batch, calculate_target, \
+    energy_needs, iter_scored_chunks, score_file, score_frame
+
+
+def cohort(size=500, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "weight": rng.uniform(40, 140, size).round(1),
+        "height": rng.uniform(140, 200, size).round(1),
+        "age": rng.integers(18, 90, size),
+        "gender": rng.choice(["Male", "Female"], size),
+        "activity": rng.choice(list(ACTIVITY_FACTORS), size),
+        "goal": rng.choice(list(GOAL_SIGNS), size),
+        "adjustment": rng.choice([250.0, 500.0, 750.0], size),
+    })
+
+
+def test_energy_needs_matches_the_scalar_formulas():
+    users = cohort()
+
+    needs = energy_needs(users["weight"], users["height"], users["age"], users["gender"], users["activity"],
+                         users["goal"], users["adjustment"])
+
+    # Plain Python numbers, as the planner's inputs give calculate_target
+    rows = users.to_dict("records")
+    expected_tdee = [calculate_bmr(u["weight"], u["height"], u["age"], u["gender"], u["activity"]) for u in rows]
+    expected_target = [calculate_target(u["weight"], u["height"], u["age"], u["gender"], u["activity"], u["goal"],
+                                        u["adjustment"]) for u in rows]
+    np.testing.assert_allclose(needs["tdee"], expected_tdee, rtol=1e-12)
+    np.testing.assert_allclose(needs["target"], expected_target, rtol=1e-12)
+    np.testing.assert_allclose(needs["tdee"], calculate_bmr_batch(users["weight"], users["height"], users["age"],
+                                                                   users["gender"], users["activity"]))
+
+
+def test_missing_goals_and_adjustments_use_the_defaults():
+    needs = energy_needs([70, 70, 70], [175, 175, 175], [30, 30, 30], ["Male"] * 3, ["Sedentary"] * 3,
+                         ["Lose", None, "Gain"], [np.nan, 300, None])
+
+    maintain = calculate_target(70, 175, 30, "Male", "Sedentary")
+    np.testing.assert_allclose(needs["target"], [maintain - 500, maintain, maintain + 500])
+
+
+def test_without_goals_the_target_is_the_rounded_tdee():
+    needs = energy_needs([60], [165], [45], ["Female"], ["Very Active"])
+
+    assert needs["target"][0] == calculate_target(60, 165, 45, "Female", "Very Active")
+
+
+def test_unknown_values_raise():
+    with pytest.raises(KeyError):
+        energy_needs([70], [175], [30], ["Male"], ["Sedentary"], ["Bulk"])
+    with pytest.raises(KeyError):
+        energy_needs([70], [175], [30], ["Male"], ["Couch"])
+
+
+def test_score_frame_adds_columns_and_checks_inputs():
+    users = cohort(size=20)
+
+    scored = score_frame(users)
+
+    assert list(scored.columns) == list(users.columns) + ["bmr", "tdee", "target"]
+    with pytest.raises(ValueError, match="activity"):
+        score_frame(users.drop(columns=["activity"]))
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_score_file_writes_every_chunk(tmp_path, suffix):
+    users = cohort(size=25)
+    source = tmp_path / f"users{suffix}"
+    if suffix == ".csv":
+        users.to_csv(source, index=False)
+    else:
+        users.to_parquet(source, index=False)
+    output = tmp_path / "scored.csv"
+
+    assert score_file(str(source), str(output), chunksize=10) == 25
+
+    scored = pd.read_csv(output)
+    pd.testing.assert_frame_equal(scored, score_frame(users), check_dtype=False)
+
+
+def test_iter_scored_chunks_is_lazy(tmp_path):
+    chunks = iter_scored_chunks(str(tmp_path / "missing.csv"))
+
+    with pytest.raises(FileNotFoundError):
+        next(chunks)
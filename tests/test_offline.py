@@ -0,0 +1,83 @@
+# test_offline.py
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from offline import compose_recipe, default_catalogs, fill_missing_recipes, run_with_deadline
+
+
+def test_answer_in_time_is_used():
+    assert run_with_deadline(lambda a, b=0: a + b, 1, lambda: "fallback", 1, b=2) == (3, False)
+
+
+def test_slow_call_falls_back_and_keeps_running():
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.3)
+        finished.set()
+        return "late"
+
+    started = time.monotonic()
+    result = run_with_deadline(slow, 0.05, lambda: "fallback")
+
+    assert result == ("fallback", True)
+    assert time.monotonic() - started < 0.25
+    # The abandoned call still finishes, e.g. to fill a cache for the next rerun
+    assert finished.wait(1)
+
+
+def test_error_falls_back():
+    def broken():
+        raise RuntimeError("503 unavailable")
+
+    assert run_with_deadline(broken, 1, lambda: "fallback") == ("fallback", True)
+
+
+def test_none_is_a_valid_answer():
+    assert run_with_deadline(lambda: None, 1, lambda: "fallback") == (None, False)
+
+
+def test_default_catalogs_leave_out_what_the_diet_rules_out():
+    catalogs = default_catalogs(["breakfast", "lunch"], ["Vegetarian"])
+
+    items = {item for catalog in catalogs.values() for foods in catalog.values() for item in foods}
+    assert set(catalogs) == {"breakfast", "lunch"}
+    assert {"eggs", "greek_yogurt"} <= items
+    assert not {"smoked_salmon", "turkey_slices", "grilled_chicken_breast", "shrimp"} & items
+    assert all(foods for catalog in catalogs.values() for foods in catalog.values())
+
+
+def test_missing_recipes_are_filled_from_templates():
+    meals = {
+        "Breakfast": ("breakfast", ["oatmeal", "berries"], (1, 2)),
+        "Lunch": ("lunch", ["tofu"], (1,)),
+    }
+    recipes = {"Breakfast": {"recipe": "kept"}, "Lunch": {"error": "timed out"}}
+
+    filled = fill_missing_recipes(recipes, meals, "Asha")
+
+    assert filled["Breakfast"] == {"recipe": "kept"}
+    lunch = filled["Lunch"]["recipe"]
+    assert [item.name for item in lunch.ingredients] == ["tofu"]
+    assert lunch.steps and "Asha" in lunch.introduction
+
+
+def test_template_quantities_scale_with_servings_and_household():
+    recipe = compose_recipe(["cottage_cheese", "berries", "oatmeal"], "breakfast", "Asha",
+                            household=(("Asha", 1.0), ("Ravi", 1.25)), servings=(2, 0.5, 1))["recipe"]
+
+    assert recipe.servings == 2
+    assert [item.to_markdown() for item in recipe.ingredients] == [
+        "4 servings cottage cheese", "1 serving berries", "2 servings oatmeal"]
+    assert recipe.portion_guide == ["Asha: 1.00 portion", "Ravi: 1.25 portions"]
+
+
+def test_template_quantities_for_one_person():
+    recipe = compose_recipe(["cottage_cheese", "berries"], "breakfast", "Asha", servings=(2, 0.5))["recipe"]
+
+    assert recipe.servings == 1
+    assert [item.to_markdown() for item in recipe.ingredients] == ["2 servings cottage cheese", "0.5 servings berries"]
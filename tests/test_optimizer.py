@@ -0,0 +1,127 @@
+# test_optimizer.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizer import SERVING_SIZES, group_limits, prepare_day, resolve_day, serving_calories, solve_day
+
+CATALOGS = {
+    "breakfast": {
+        "protein": {"eggs": 140, "greek_yogurt": 100, "paneer": 260},
+        "whole_grains": {"oatmeal": 150, "whole_wheat_toast": 80, "poha": 180},
+        "fruits": {"banana": 105, "apple": 95},
+        "vegetables": {"spinach": 10, "tomato": 20},
+        "healthy_fats": {"almonds": 160, "chia_seeds": 60},
+    },
+    "lunch": {
+        "protein": {"chicken_breast": 165, "tofu": 145, "rajma": 210},
+        "whole_grains": {"brown_rice": 215, "roti": 120, "quinoa": 220},
+        "vegetables": {"broccoli": 55, "bhindi": 35, "carrot": 25},
+        "legumes": {"moong_dal": 105, "chana": 160},
+        "dairy_or_dairy_alternatives": {"curd": 100},
+    },
+    "dinner": {
+        "protein": {"fish": 200, "dal": 180, "soya_chunks": 170},
+        "whole_grains": {"millet_roti": 110, "jeera_rice": 200},
+        "vegetables": {"cauliflower": 25, "palak": 20, "lauki": 15},
+        "healthy_fats": {"ghee": 45},
+    },
+}
+
+SNACKS = {
+    "Morning Snack": {"fruits": {"orange": 60, "papaya": 55, "guava": 68}, "nuts_seeds": {"walnuts": 185, "peanuts": 160},
+                      "beverages": {"buttermilk": 40, "green_tea": 2}},
+}
+
+
+def calories_of(catalog):
+    return {item: calories for foods in catalog.values() for item, calories in foods.items()}
+
+
+def groups_of(catalog):
+    return {item: group for group, foods in catalog.items() for item in foods}
+
+
+def test_resolve_day_matches_a_full_solve_without_the_item():
+    state = prepare_day(2000, CATALOGS)
+    plan = solve_day(2000, CATALOGS)
+    item = next(item for item in plan["lunch"][0] if item in calories_of(CATALOGS["lunch"]))
+
+    resolved, _ = resolve_day(state, "lunch", item)
+
+    expected = solve_day(2000, CATALOGS, exclude=[item])
+    assert item not in resolved["lunch"][0]
+    assert {meal: total for meal, (_, total, _) in resolved.items()} == \
+           {meal: total for meal, (_, total, _) in expected.items()}
+
+
+def test_resolve_day_matches_a_full_solve_with_the_item_kept():
+    state = prepare_day(2000, CATALOGS)
+    plan = solve_day(2000, CATALOGS)
+    item = next(item for item in calories_of(CATALOGS["dinner"]) if item not in plan["dinner"][0])
+
+    resolved, _ = resolve_day(state, "dinner", item, keep=True)
+
+    expected = solve_day(2000, CATALOGS, include=[item])
+    assert resolved["dinner"][2][item] == 1
+    assert {meal: total for meal, (_, total, _) in resolved.items()} == \
+           {meal: total for meal, (_, total, _) in expected.items()}
+
+
+def test_resolve_day_rejects_an_item_the_meal_does_not_offer():
+    with pytest.raises(ValueError):
+        resolve_day(prepare_day(2000, CATALOGS), "breakfast", "fish")
+
+
+@pytest.mark.parametrize("target", [1400, 2000, 2600])
+def test_plans_respect_group_limits_and_serving_sizes(target):
+    plan = solve_day(target, CATALOGS)
+
+    for meal, (items, total, servings) in plan.items():
+        catalog = CATALOGS[meal]
+        calories, groups = calories_of(catalog), groups_of(catalog)
+        assert set(items) == set(servings)
+        assert all(servings[item] in SERVING_SIZES for item in items)
+        assert total == sum(serving_calories(calories[item], servings[item]) for item in items)
+        for group in catalog:
+            low, high = group_limits(group, meal)
+            assert low <= sum(groups[item] == group for item in items) <= high
+
+
+def test_snacks_take_at_most_one_item_per_group():
+    catalogs = {**CATALOGS, **SNACKS}
+    meal_types = {"Morning Snack": "snack"}
+    bands = {"breakfast": (0.2, 0.3), "Morning Snack": (0.05, 0.15), "lunch": (0.3, 0.4), "dinner": (0.2, 0.3)}
+
+    plan = solve_day(2000, catalogs, bands, meal_types=meal_types)
+
+    groups = groups_of(SNACKS["Morning Snack"])
+    items = plan["Morning Snack"][0]
+    assert items
+    for group in SNACKS["Morning Snack"]:
+        assert group_limits(group, "snack") == (0, 1)
+        assert sum(groups[item] == group for item in items) <= 1
+
+
+def test_empty_catalogs():
+    assert solve_day(2000, {}) == {}
+    assert solve_day(2000, {"breakfast": {}, "lunch": {}, "dinner": {}}) == {
+        "breakfast": ([], 0, {}), "lunch": ([], 0, {}), "dinner": ([], 0, {})}
+
+
+def test_zero_target_plans_nothing():
+    plan = solve_day(0, CATALOGS)
+
+    assert {meal: (items, total) for meal, (items, total, _) in plan.items()} == {
+        "breakfast": ([], 0), "lunch": ([], 0), "dinner": ([], 0)}
+
+
+def test_string_calories_solve_like_numbers():
+    as_strings = {meal: {group: {item: str(calories) for item, calories in foods.items()}
+                         for group, foods in catalog.items()}
+                  for meal, catalog in CATALOGS.items()}
+
+    assert solve_day(2000, as_strings) == solve_day(2000, CATALOGS)
@@ -0,0 +1,80 @@
+# test_substitution.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizer import SERVING_SIZES, serving_calories
+from substitution import SubstitutionIndex
+
+CATALOG = {
+    "protein": {"eggs": 140, "paneer": 265, "tofu": 145, "chicken_breast": 165, "rajma": "210", "moong_sprouts": 30},
+    "vegetables": {"spinach": 10, "broccoli": 55},
+}
+
+
+def distances(results, target):
+    return [abs(new_total - target) for _, _, _, new_total in results]
+
+
+def brute_force(item, meal_items, meal_calories, target, servings=1, allowed=None):
+    """Distance to target of each other item's best serving, closest first"""
+    group, calories = SubstitutionIndex(CATALOG).group_of(item)
+    rest = meal_calories - serving_calories(calories, servings)
+    best = []
+    for candidate, candidate_calories in CATALOG[group].items():
+        if candidate in meal_items or (allowed is not None and candidate not in allowed):
+            continue
+        portions = [serving_calories(int(candidate_calories), size) for size in SERVING_SIZES]
+        best.append(min(abs(rest + portion - target) for portion in portions if portion > 0))
+    return sorted(best)
+
+
+def test_alternatives_are_the_closest_to_target_one_per_item():
+    index = SubstitutionIndex(CATALOG)
+    meal = ["eggs", "spinach"]
+
+    results = index.alternatives("eggs", meal, 150, 400, limit=10)
+
+    assert len({candidate for candidate, _, _, _ in results}) == len(results)
+    assert distances(results, 400) == brute_force("eggs", meal, 150, 400)
+    assert all(candidate not in meal for candidate, _, _, _ in results)
+
+
+def test_alternatives_scale_with_the_serving_being_replaced():
+    index = SubstitutionIndex(CATALOG)
+
+    results = index.alternatives("paneer", ["paneer"], 530, 530, limit=10, servings=2)
+
+    assert distances(results, 530) == brute_force("paneer", ["paneer"], 530, 530, servings=2)
+    assert results[0] == ("rajma", 2, 420, 420)
+
+
+def test_alternatives_respect_allowed_and_limit():
+    index = SubstitutionIndex(CATALOG)
+    allowed = {"tofu", "rajma"}
+
+    results = index.alternatives("eggs", ["eggs"], 140, 140, allowed=allowed)
+
+    assert {candidate for candidate, _, _, _ in results} == allowed
+    assert distances(results, 140) == brute_force("eggs", ["eggs"], 140, 140, allowed=allowed)
+    assert len(index.alternatives("eggs", ["eggs"], 140, 140, limit=2)) == 2
+
+
+def test_unknown_items_have_no_alternatives():
+    index = SubstitutionIndex(CATALOG)
+
+    assert index.group_of("quinoa") is None
+    assert index.alternatives("quinoa", [], 0, 400) == []
+    assert index.group_of("rajma") == ("protein", 210)
+
+
+def test_swap_updates_items_total_and_servings():
+    index = SubstitutionIndex(CATALOG)
+    meal = (["eggs", "spinach"], 300, {"eggs": 2, "spinach": 1})
+
+    items, total, servings = index.swap(meal, "eggs", "tofu", 1.5)
+
+    assert items == ["tofu", "spinach"]
+    assert total == 300 - 280 + serving_calories(145, 1.5)
+    assert servings == {"tofu": 1.5, "spinach": 1}